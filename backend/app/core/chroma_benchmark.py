@@ -0,0 +1,87 @@
+# app/core/chroma_benchmark.py
+"""
+Compares Chroma throughput in embedded and server mode (see CHROMA_MODE).
+
+Server mode needs a running server, e.g. `chroma run --path /tmp/chroma-bench --port 8000`:
+
+    python -m app.core.chroma_benchmark --mode embedded --mode server [--records 2000] [--queries 500] [--threads 8]
+
+Random vectors are added to and queried from a scratch collection by several
+threads at once, like concurrent requests in one API worker. The scratch
+collection is deleted afterwards.
+"""
+import time
+import uuid
+import random
+import argparse
+import logging
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+
+from .chroma_db import ChromaDBManager
+
+logger = logging.getLogger(__name__)
+
+
+def benchmark(
+    mode: str,
+    records: int = 2000,
+    queries: int = 500,
+    threads: int = 8,
+    dimensions: int = 768,
+    batch_size: int = 100,
+    seed: int = 0,
+) -> Dict[str, float]:
+    """Runs the add and query workload against one mode. Returns throughput and query latency."""
+    rng = random.Random(seed)
+    client = ChromaDBManager._create_client(mode)
+    collection = client.get_or_create_collection(name=f"benchmark_{uuid.uuid4().hex[:12]}")
+
+    def vector():
+        return [rng.random() for _ in range(dimensions)]
+
+    batches = [
+        ([f"doc-{i}" for i in range(start, min(start + batch_size, records))],
+         [vector() for _ in range(start, min(start + batch_size, records))])
+        for start in range(0, records, batch_size)
+    ]
+    query_vectors = [vector() for _ in range(queries)]
+
+    def timed_query(query_vector):
+        started = time.perf_counter()
+        collection.query(query_embeddings=[query_vector], n_results=5, include=["distances"])
+        return time.perf_counter() - started
+
+    try:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            started = time.perf_counter()
+            list(pool.map(lambda batch: collection.add(ids=batch[0], embeddings=batch[1]), batches))
+            add_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            latencies = sorted(pool.map(timed_query, query_vectors))
+            query_seconds = time.perf_counter() - started
+    finally:
+        client.delete_collection(name=collection.name)
+
+    return {
+        "mode": mode,
+        "adds_per_second": round(records / add_seconds, 1),
+        "queries_per_second": round(queries / query_seconds, 1),
+        "query_p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "query_p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 2),
+    }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Compare embedded and server Chroma throughput.")
+    parser.add_argument("--mode", action="append", choices=["embedded", "server"], help="Repeat to compare modes")
+    parser.add_argument("--records", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+    for mode in args.mode or ["embedded", "server"]:
+        result = benchmark(mode, records=args.records, queries=args.queries, threads=args.threads)
+        logger.info(", ".join(f"{key}={value}" for key, value in result.items()))
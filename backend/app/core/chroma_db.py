@@ -1,21 +1,283 @@
 # app/core/database.py
 import os
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional
+from typing import Optional, List, Dict
 import chromadb
+import chromadb.errors
 from chromadb.config import Settings
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from langchain_core.embeddings import Embeddings
 from dotenv import load_dotenv,find_dotenv
+from .embedding_providers import create_embeddings
 
 load_dotenv(find_dotenv())
 
+logger = logging.getLogger(__name__)
+
 # Database-specific constants
-CHROMA_DB_PATH = Path("./chroma_db")
+# Local data: the embedded index, and the SQLite files (embedding cache, knowledge
+# write queue, search cache, transcript store) every API worker on the host shares
+CHROMA_DB_PATH = Path(os.getenv("CHROMA_DB_PATH", "./chroma_db"))
+EMBEDDING_CACHE_PATH = CHROMA_DB_PATH / "embedding_cache.sqlite"
+EMBEDDING_CACHE_MEMORY_SIZE = int(os.getenv("EMBEDDING_CACHE_MEMORY_SIZE", "2048"))
+EMBEDDING_CACHE_DISK_SIZE = int(os.getenv("EMBEDDING_CACHE_DISK_SIZE", "100000"))
+# "embedded": PersistentClient on CHROMA_DB_PATH, inside this process (one process only)
+# "server": HttpClient talking to a separate `chroma run` server, shared by all API workers.
+#   The SQLite files under CHROMA_DB_PATH run in WAL mode and are safe to share between the
+#   workers of one host; run several hosts only with separate CHROMA_DB_PATHs.
+CHROMA_MODE = os.getenv("CHROMA_MODE", "embedded")
+CHROMA_HOST = os.getenv("CHROMA_HOST", "localhost")
+CHROMA_PORT = int(os.getenv("CHROMA_PORT", "8000"))
+CHROMA_SSL = os.getenv("CHROMA_SSL", "false").lower() == "true"
+# "per_user": one collection per user (user_{id}_knowledge)
+# "shared": all users in CHROMA_KNOWLEDGE_SHARDS collections, filtered by user_id metadata
+CHROMA_KNOWLEDGE_LAYOUT = os.getenv("CHROMA_KNOWLEDGE_LAYOUT", "per_user")
+CHROMA_KNOWLEDGE_SHARDS = int(os.getenv("CHROMA_KNOWLEDGE_SHARDS", "16"))
+# Collection handles kept by get_collection; each hit saves a get_or_create round-trip
+CHROMA_COLLECTION_CACHE_SIZE = int(os.getenv("CHROMA_COLLECTION_CACHE_SIZE", "256"))
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embedding wrapper that remembers every vector it has computed.
+
+    Vectors are keyed by (model, task, sha256(text)) and looked up first in an
+    in-memory LRU, then in a SQLite table that survives restarts. Only texts
+    missing from both tiers are sent to the remote model, in one batch.
+    Both tiers are size-bounded and evict the least recently used entries.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model_name: str,
+        db_path: Path,
+        memory_size: int = EMBEDDING_CACHE_MEMORY_SIZE,
+        disk_size: int = EMBEDDING_CACHE_DISK_SIZE,
+    ):
+        self._embeddings = embeddings
+        self._model_name = model_name
+        self._memory_size = memory_size
+        self._disk_size = disk_size
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        # Shared by all API workers of the host: WAL plus a busy timeout instead of "database is locked"
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        self._conn.commit()
+
+    def _key(self, task: str, text: str) -> str:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{self._model_name}:{task}:{digest}"
+
+    def _remember(self, key: str, vector: List[float]):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._memory_size:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Returns cached vectors for the given keys, promoting disk hits into memory."""
+        found: Dict[str, List[float]] = {}
+        disk_keys = []
+        for key in keys:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                found[key] = vector
+                self._stats["memory_hits"] += 1
+            else:
+                disk_keys.append(key)
+
+        if disk_keys:
+            placeholders = ",".join("?" * len(disk_keys))
+            rows = self._conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", disk_keys
+            ).fetchall()
+            for key, blob in rows:
+                vector = array("f", blob).tolist()
+                found[key] = vector
+                self._remember(key, vector)
+            if rows:
+                self._stats["disk_hits"] += len(rows)
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(time.time(), key) for key, _ in rows],
+                )
+                self._conn.commit()
+        return found
+
+    def _store(self, items: Dict[str, List[float]]):
+        now = time.time()
+        for key, vector in items.items():
+            self._remember(key, vector)
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+            [(key, array("f", vector).tobytes(), now) for key, vector in items.items()],
+        )
+        count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if count > self._disk_size:
+            excess = count - self._disk_size
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN ("
+                "SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+            self._stats["evictions"] += excess
+        self._conn.commit()
+
+    def _embed_cached(self, task: str, texts: List[str], embed_fn) -> List[List[float]]:
+        keys = [self._key(task, text) for text in texts]
+        with self._lock:
+            found = self._lookup(keys)
+
+        # Embed each distinct missing text once, even if it repeats within the batch
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        if missing:
+            vectors = embed_fn(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            with self._lock:
+                self._stats["misses"] += len(computed)
+                self._store(computed)
+            found.update(computed)
+
+        return [found[key] for key in keys]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed_cached("document", texts, self._embeddings.embed_documents)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed_cached(
+            "query", [text], lambda batch: [self._embeddings.embed_query(batch[0])]
+        )[0]
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "memory_entries": len(self._memory)}
+
+    @property
+    def provider_stats(self) -> Optional[Dict[str, float]]:
+        """Stats of the wrapped embeddings, if they keep any (the local ONNX provider does)."""
+        return getattr(self._embeddings, "stats", None)
+
+# Raised when a collection no longer exists (the name changed between chromadb versions)
+_COLLECTION_NOT_FOUND = tuple(
+    getattr(chromadb.errors, name)
+    for name in ("NotFoundError", "InvalidCollectionException")
+    if hasattr(chromadb.errors, name)
+)
+
+
+class CachedCollection:
+    """
+    Cached collection handle that survives the collection being deleted (and
+    recreated) by another worker or the migration script. A call failing
+    because the collection is gone drops the cached handle, fetches the
+    collection again and retries the call once.
+    """
+
+    def __init__(self, manager: "ChromaDBManager", name: str, metadata: Optional[dict], collection):
+        self._manager = manager
+        self._name = name
+        self._metadata = metadata
+        self._collection = collection
+
+    def __getattr__(self, attr):
+        value = getattr(self._collection, attr)
+        if not callable(value):
+            return value
+
+        def call(*args, **kwargs):
+            try:
+                return getattr(self._collection, attr)(*args, **kwargs)
+            except _COLLECTION_NOT_FOUND:
+                logger.info(f"Collection '{self._name}' is gone, fetching it again")
+                self._manager.invalidate_collection(self._name)
+                self._collection = self._manager._client.get_or_create_collection(name=self._name, metadata=self._metadata)
+                return getattr(self._collection, attr)(*args, **kwargs)
+
+        return call
+
+
+class UserKnowledgeCollection:
+    """
+    One user's slice of a shared knowledge shard, with the collection API the
+    call sites use (add, upsert, get, query, delete, count).
+
+    Every record gets a `user_id` metadata field and every read is filtered on
+    it. Ids are stored as "<user_id>:<id>" so users can't collide inside a
+    shard; callers only ever see their own ids.
+    """
+
+    def __init__(self, shard, user_id: int):
+        self._shard = shard
+        self._user_id = int(user_id)
+        self._prefix = f"{self._user_id}:"
+
+    @property
+    def name(self) -> str:
+        return self._shard.name
+
+    def _ids(self, ids):
+        return [self._prefix + str(doc_id) for doc_id in ids] if ids is not None else None
+
+    def _strip(self, ids):
+        return [doc_id[len(self._prefix):] for doc_id in ids]
+
+    def _where(self, where: Optional[dict]) -> dict:
+        user_filter = {"user_id": self._user_id}
+        return {"$and": [user_filter, where]} if where else user_filter
+
+    def _metadatas(self, metadatas, count: int):
+        return [{**(metadata or {}), "user_id": self._user_id} for metadata in (metadatas or [None] * count)]
+
+    def add(self, ids, documents=None, embeddings=None, metadatas=None):
+        self._shard.add(ids=self._ids(ids), documents=documents, embeddings=embeddings,
+                        metadatas=self._metadatas(metadatas, len(ids)))
+
+    def upsert(self, ids, documents=None, embeddings=None, metadatas=None):
+        self._shard.upsert(ids=self._ids(ids), documents=documents, embeddings=embeddings,
+                           metadatas=self._metadatas(metadatas, len(ids)))
+
+    def get(self, ids=None, where: Optional[dict] = None, **kwargs):
+        results = self._shard.get(ids=self._ids(ids), where=self._where(where), **kwargs)
+        results["ids"] = self._strip(results["ids"])
+        return results
+
+    def query(self, where: Optional[dict] = None, **kwargs):
+        results = self._shard.query(where=self._where(where), **kwargs)
+        results["ids"] = [self._strip(ids) for ids in results["ids"]]
+        return results
+
+    def delete(self, ids=None, where: Optional[dict] = None):
+        self._shard.delete(ids=self._ids(ids), where=self._where(where))
+
+    def count(self) -> int:
+        return len(self._shard.get(where=self._where(None), include=[])["ids"])
+
 
 class ChromaDBManager:
     _instance: Optional['ChromaDBManager'] = None
-    _client: Optional[chromadb.PersistentClient] = None
-    _embedding_model: Optional[GoogleGenerativeAIEmbeddings] = None
+    _client: Optional[chromadb.ClientAPI] = None
+    _embedding_model: Optional[CachedEmbeddings] = None
     
     def __new__(cls):
         if cls._instance is None:
@@ -28,39 +290,148 @@ class ChromaDBManager:
     
     def _initialize(self):
         """Initialize ChromaDB and embeddings."""
-        # Get API key
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY not found")
-        
         # Create directory
         CHROMA_DB_PATH.mkdir(exist_ok=True)
+
+        # LRU of collection handles, shared by all request threads
+        self._collections: "OrderedDict[str, object]" = OrderedDict()
+        self._collections_lock = threading.Lock()
+        self._collection_stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+        self._collection_stats_since = time.time()
         
+        # The embedding provider is created on first use (see embedding_model)
+        self._embedding_lock = threading.Lock()
+
         # Initialize ChromaDB
-        self._client = chromadb.PersistentClient(
+        self._client = self._create_client()
+    
+    @staticmethod
+    def _create_client(mode: str = CHROMA_MODE) -> chromadb.ClientAPI:
+        """
+        Embedded mode keeps the index inside this process, so only one process
+        may use CHROMA_DB_PATH. Server mode sends every call to a Chroma server,
+        so any number of API workers can share a single copy of the index. The
+        HttpClient keeps one keep-alive httpx session (its own connection pool)
+        and the manager is a per-process singleton, so each worker reuses its
+        connections. The local SQLite files are shared by the workers of one
+        host (see CHROMA_MODE).
+        """
+        if mode == "server":
+            logger.info(f"Connecting to Chroma server at {CHROMA_HOST}:{CHROMA_PORT}")
+            return chromadb.HttpClient(
+                host=CHROMA_HOST,
+                port=CHROMA_PORT,
+                ssl=CHROMA_SSL,
+                settings=Settings(anonymized_telemetry=False),
+            )
+        return chromadb.PersistentClient(
             path=str(CHROMA_DB_PATH),
             settings=Settings(
                 anonymized_telemetry=False,
                 allow_reset=True
             )
         )
-        
-        # Initialize embedding model
-        self._embedding_model = GoogleGenerativeAIEmbeddings(
-            model="models/embedding-001",
-            google_api_key=api_key
-        )
-    
+
     @property
-    def client(self) -> chromadb.PersistentClient:
+    def client(self) -> chromadb.ClientAPI:
         return self._client
     
     @property
-    def embedding_model(self) -> GoogleGenerativeAIEmbeddings:
+    def embedding_model(self) -> CachedEmbeddings:
+        """
+        The embedding provider selected by EMBEDDING_PROVIDER (remote Gemini or
+        local ONNX) behind the content-hash cache. Built on first use rather
+        than at import, so providers registered after this module was
+        imported can still be selected.
+        """
+        if self._embedding_model is None:
+            with self._embedding_lock:
+                if self._embedding_model is None:
+                    model_name, embeddings = create_embeddings()
+                    self._embedding_model = CachedEmbeddings(
+                        embeddings,
+                        model_name=model_name,
+                        db_path=EMBEDDING_CACHE_PATH,
+                    )
         return self._embedding_model
+
+    @property
+    def embedding_cache_stats(self) -> Dict[str, int]:
+        return self.embedding_model.stats
+
+    @property
+    def embedding_provider_stats(self) -> Optional[Dict[str, float]]:
+        return self.embedding_model.provider_stats
     
-    def get_collection(self, name: str ):
-        return self._client.get_or_create_collection(name=name)
+    def get_collection(self, name: str, metadata: Optional[dict] = None):
+        """
+        Returns the collection, creating it if needed. Handles are cached (up
+        to CHROMA_COLLECTION_CACHE_SIZE, least recently used evicted), so only
+        the first call for a name asks Chroma's system database. `metadata`
+        is only applied when the collection is created. A handle whose
+        collection was deleted elsewhere refetches it on its next use.
+        """
+        with self._collections_lock:
+            collection = self._collections.get(name)
+            if collection is not None:
+                self._collections.move_to_end(name)
+                self._collection_stats["hits"] += 1
+                return collection
+            self._collection_stats["misses"] += 1
+
+        collection = CachedCollection(
+            self, name, metadata, self._client.get_or_create_collection(name=name, metadata=metadata)
+        )
+
+        with self._collections_lock:
+            self._collections[name] = collection
+            self._collections.move_to_end(name)
+            while len(self._collections) > CHROMA_COLLECTION_CACHE_SIZE:
+                self._collections.popitem(last=False)
+                self._collection_stats["evictions"] += 1
+        return collection
+
+    def invalidate_collection(self, name: str):
+        """Drops the cached handle, e.g. after the collection was deleted or recreated."""
+        with self._collections_lock:
+            if self._collections.pop(name, None) is not None:
+                self._collection_stats["invalidations"] += 1
+
+    def delete_collection(self, name: str):
+        self.invalidate_collection(name)
+        self._client.delete_collection(name=name)
+
+    @property
+    def collection_cache_stats(self) -> Dict[str, float]:
+        with self._collections_lock:
+            minutes = max((time.time() - self._collection_stats_since) / 60, 1e-9)
+            return {
+                **self._collection_stats,
+                "cached_handles": len(self._collections),
+                "round_trips_saved_per_minute": round(self._collection_stats["hits"] / minutes, 2),
+            }
+
+    @staticmethod
+    def knowledge_collection_name(user_id: int) -> str:
+        """Name of the user's own collection in the per-user layout."""
+        return f"user_{user_id}_knowledge"
+
+    @staticmethod
+    def knowledge_shard_name(user_id: int, shards: int = CHROMA_KNOWLEDGE_SHARDS) -> str:
+        """Shared collection holding the user's knowledge in the shared layout."""
+        return f"knowledge_shard_{int(user_id) % max(1, shards):03d}"
+
+    def get_knowledge_collection(self, user_id: int, layout: str = CHROMA_KNOWLEDGE_LAYOUT):
+        """
+        Returns the user's knowledge collection in the configured layout.
+        "per_user" gives every user their own collection (and HNSW index);
+        "shared" keeps all users in a fixed number of shard collections and
+        returns a view filtered to this user.
+        """
+        if layout == "shared":
+            shard = self.get_collection(name=self.knowledge_shard_name(user_id))
+            return UserKnowledgeCollection(shard, user_id)
+        return self.get_collection(name=self.knowledge_collection_name(user_id))
 
 # Singleton instance
 chroma_manager = ChromaDBManager()
\ No newline at end of file
@@ -0,0 +1,77 @@
+# app/core/chroma_migration.py
+"""
+Moves knowledge from the per-user layout (one user_{id}_knowledge collection
+per user) into the shared, sharded layout (see CHROMA_KNOWLEDGE_LAYOUT).
+
+Run it before switching CHROMA_KNOWLEDGE_LAYOUT to "shared":
+
+    python -m app.core.chroma_migration [--delete-source] [--batch-size 500]
+
+Stored embeddings are copied as they are, so nothing is re-embedded. Records
+are upserted, so an interrupted migration can simply be run again.
+"""
+import re
+import argparse
+import logging
+from typing import Dict
+
+from .chroma_db import chroma_manager, UserKnowledgeCollection
+
+logger = logging.getLogger(__name__)
+
+_PER_USER_PATTERN = re.compile(r"^user_(\d+)_knowledge$")
+
+
+def _collection_names():
+    # Depending on the chromadb version list_collections returns names or collection objects
+    return [getattr(c, "name", c) for c in chroma_manager.client.list_collections()]
+
+
+def migrate_user(user_id: int, batch_size: int = 500, delete_source: bool = False) -> int:
+    """Copies one user's collection into their shard. Returns the number of records copied."""
+    source = chroma_manager.get_collection(name=chroma_manager.knowledge_collection_name(user_id))
+    target = chroma_manager.get_knowledge_collection(user_id, layout="shared")
+    assert isinstance(target, UserKnowledgeCollection)
+
+    copied = 0
+    while True:
+        page = source.get(limit=batch_size, offset=copied, include=["documents", "metadatas", "embeddings"])
+        if not page["ids"]:
+            break
+        target.upsert(
+            ids=page["ids"],
+            documents=page["documents"],
+            embeddings=page["embeddings"],
+            metadatas=page["metadatas"],
+        )
+        copied += len(page["ids"])
+
+    if target.count() < copied:
+        raise RuntimeError(f"User {user_id}: copied {copied} records but the shard only holds {target.count()}")
+
+    if delete_source:
+        chroma_manager.delete_collection(source.name)
+    return copied
+
+
+def migrate_all(batch_size: int = 500, delete_source: bool = False) -> Dict[int, int]:
+    """Migrates every per-user knowledge collection. Returns records copied per user."""
+    report = {}
+    for name in _collection_names():
+        match = _PER_USER_PATTERN.match(name)
+        if not match:
+            continue
+        user_id = int(match.group(1))
+        report[user_id] = migrate_user(user_id, batch_size=batch_size, delete_source=delete_source)
+        logger.info(f"Migrated {report[user_id]} records of user {user_id}")
+    logger.info(f"Migration finished: {len(report)} users, {sum(report.values())} records")
+    return report
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Migrate per-user Chroma knowledge collections to shared shards.")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--delete-source", action="store_true", help="Drop each per-user collection once it is copied")
+    args = parser.parse_args()
+    migrate_all(batch_size=args.batch_size, delete_source=args.delete_source)
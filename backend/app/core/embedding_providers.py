@@ -0,0 +1,219 @@
+# app/core/embedding_providers.py
+import os
+import time
+import hashlib
+import queue
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from langchain_core.embeddings import Embeddings
+from dotenv import load_dotenv, find_dotenv
+
+load_dotenv(find_dotenv())
+
+logger = logging.getLogger(__name__)
+
+# Which backend computes embeddings: "gemini" (remote API) or "onnx" (local CPU).
+# Vectors of different providers are not comparable: collections written with
+# one provider have to be re-ingested after switching.
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "gemini")
+GEMINI_EMBEDDING_MODEL = "models/embedding-001"
+
+# Directory with model.onnx and tokenizer.json of a sentence-transformers model
+ONNX_EMBEDDING_MODEL_PATH = Path(os.getenv("ONNX_EMBEDDING_MODEL_PATH", "./models/all-MiniLM-L6-v2"))
+ONNX_MAX_SEQ_LENGTH = int(os.getenv("ONNX_MAX_SEQ_LENGTH", "256"))
+# Texts per inference call; requests arriving together are merged up to this size
+ONNX_MAX_BATCH_SIZE = int(os.getenv("ONNX_MAX_BATCH_SIZE", "32"))
+# How long the batcher waits for more requests before running a partial batch
+ONNX_BATCH_WAIT_MS = float(os.getenv("ONNX_BATCH_WAIT_MS", "5"))
+# Batches running at the same time, and CPU threads each of them may use
+ONNX_INFERENCE_WORKERS = int(os.getenv("ONNX_INFERENCE_WORKERS", "2"))
+ONNX_INTRA_OP_THREADS = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))  # 0 lets onnxruntime decide
+
+
+class OnnxSentenceEmbeddings(Embeddings):
+    """
+    Local sentence embeddings with ONNX Runtime on CPU (mean pooling, L2 normalized).
+
+    Calls from many threads are batched dynamically: each request's texts are
+    queued, a collector thread merges whatever is waiting (up to
+    ONNX_MAX_BATCH_SIZE texts, waiting at most ONNX_BATCH_WAIT_MS for more)
+    into one inference call, and runs it on a pool of ONNX_INFERENCE_WORKERS
+    threads. Each caller blocks only until its own texts are done.
+    """
+
+    def __init__(
+        self,
+        model_path: Path = ONNX_EMBEDDING_MODEL_PATH,
+        max_seq_length: int = ONNX_MAX_SEQ_LENGTH,
+        max_batch_size: int = ONNX_MAX_BATCH_SIZE,
+        batch_wait_ms: float = ONNX_BATCH_WAIT_MS,
+        workers: int = ONNX_INFERENCE_WORKERS,
+        intra_op_threads: int = ONNX_INTRA_OP_THREADS,
+    ):
+        # Imported here so the default (Gemini) setup doesn't need them
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        model_file = model_path / "model.onnx"
+        tokenizer_file = model_path / "tokenizer.json"
+        if not model_file.exists() or not tokenizer_file.exists():
+            raise FileNotFoundError(f"ONNX embedding model needs {model_file} and {tokenizer_file}")
+
+        options = onnxruntime.SessionOptions()
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self._session = onnxruntime.InferenceSession(str(model_file), options, providers=["CPUExecutionProvider"])
+        self._input_names = {model_input.name for model_input in self._session.get_inputs()}
+
+        self._tokenizer = Tokenizer.from_file(str(tokenizer_file))
+        self._tokenizer.enable_truncation(max_length=max_seq_length)
+        self._tokenizer.enable_padding()
+
+        self._max_batch_size = max(1, max_batch_size)
+        self._batch_wait = batch_wait_ms / 1000
+        self._requests: "queue.Queue[Tuple[List[str], Future]]" = queue.Queue()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="onnx-embed")
+        self._stats = {"requests": 0, "batches": 0, "texts": 0}
+        self._stats_lock = threading.Lock()  # updated by callers' threads and the collector
+        threading.Thread(target=self._collect, name="onnx-embed-batcher", daemon=True).start()
+        logger.info(f"ONNX embedding model loaded from {model_path}")
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        """One inference call for a batch of texts."""
+        import numpy as np
+
+        encodings = self._tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        token_embeddings = self._session.run(None, feeds)[0]
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        normalized = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return normalized.tolist()
+
+    def _run_batch(self, batch: List[Tuple[List[str], Future]]):
+        texts = [text for request_texts, _ in batch for text in request_texts]
+        try:
+            vectors = self._encode(texts)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        start = 0
+        for request_texts, future in batch:
+            future.set_result(vectors[start:start + len(request_texts)])
+            start += len(request_texts)
+
+    def _collect(self):
+        carried = None
+        while True:
+            batch = [carried or self._requests.get()]
+            carried = None
+            size = len(batch[0][0])
+            deadline = time.monotonic() + self._batch_wait
+            while size < self._max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if size + len(request[0]) > self._max_batch_size:
+                    # Starts the next batch instead, so no batch exceeds the cap
+                    carried = request
+                    break
+                batch.append(request)
+                size += len(request[0])
+            with self._stats_lock:
+                self._stats["batches"] += 1
+                self._stats["texts"] += size
+            self._pool.submit(self._run_batch, batch)
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        with self._stats_lock:
+            self._stats["requests"] += 1
+        # Large requests are split so one upload can't monopolize a batch
+        futures = []
+        for i in range(0, len(texts), self._max_batch_size):
+            future = Future()
+            self._requests.put((texts[i:i + self._max_batch_size], future))
+            futures.append(future)
+        return [vector for future in futures for vector in future.result()]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text])[0]
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        batches = stats["batches"]
+        return {**stats, "avg_batch_size": round(stats["texts"] / batches, 2) if batches else 0.0}
+
+
+def _gemini_provider() -> Tuple[str, Embeddings]:
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY not found")
+    return GEMINI_EMBEDDING_MODEL, GoogleGenerativeAIEmbeddings(model=GEMINI_EMBEDDING_MODEL, google_api_key=api_key)
+
+
+def _model_fingerprint(model_path: Path) -> str:
+    """Short hash of the model and tokenizer files, so two different models never share cache keys."""
+    digest = hashlib.sha256()
+    for name in ("model.onnx", "tokenizer.json"):
+        with open(model_path / name, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def _onnx_provider() -> Tuple[str, Embeddings]:
+    embeddings = OnnxSentenceEmbeddings()
+    return f"onnx/{ONNX_EMBEDDING_MODEL_PATH.name}/{_model_fingerprint(ONNX_EMBEDDING_MODEL_PATH)}", embeddings
+
+
+# Name -> factory returning (model name used in cache keys, embeddings)
+EMBEDDING_PROVIDERS: Dict[str, Callable[[], Tuple[str, Embeddings]]] = {
+    "gemini": _gemini_provider,
+    "onnx": _onnx_provider,
+}
+# Providers create_embeddings has already built; replacing one of them would have no effect
+_created_providers = set()
+
+
+def register_embedding_provider(name: str, factory: Callable[[], Tuple[str, Embeddings]]):
+    """
+    Makes another embeddings backend selectable through EMBEDDING_PROVIDER.
+    The embeddings are created on first use (see ChromaDBManager.embedding_model),
+    so registering must happen before that, e.g. at import time of the app.
+    """
+    if name in _created_providers:
+        raise RuntimeError(f"Embedding provider '{name}' is already in use; register it before the first embedding request")
+    EMBEDDING_PROVIDERS[name] = factory
+
+
+def create_embeddings(provider: str = EMBEDDING_PROVIDER) -> Tuple[str, Embeddings]:
+    factory = EMBEDDING_PROVIDERS.get(provider)
+    if factory is None:
+        raise ValueError(f"Unknown EMBEDDING_PROVIDER '{provider}', expected one of {sorted(EMBEDDING_PROVIDERS)}")
+    model_name, embeddings = factory()
+    _created_providers.add(provider)
+    logger.info(f"Using '{provider}' embeddings ({model_name})")
+    return model_name, embeddings
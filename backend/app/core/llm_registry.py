@@ -0,0 +1,112 @@
+# app/core/llm_registry.py
+import os
+import logging
+import threading
+from typing import Optional, Type, Tuple
+
+from pydantic import BaseModel
+from langchain_core.runnables import Runnable
+from langchain_google_genai import ChatGoogleGenerativeAI
+from dotenv import load_dotenv, find_dotenv
+
+load_dotenv(find_dotenv())
+
+logger = logging.getLogger(__name__)
+
+# (model name, temperature, output schema or None for the raw chat model, json mode)
+RegistryKey = Tuple[str, float, Optional[Type[BaseModel]], bool]
+
+
+class LLMRegistry:
+    """
+    Process-wide pool of long-lived chat model clients.
+
+    Building a ChatGoogleGenerativeAI (and its structured-output wrapper) on every
+    node call means a new transport, a new schema conversion and a new HTTP
+    connection per turn. The registry builds each (model, temperature, schema,
+    json_mode) combination (see RegistryKey) once and hands out the same runnable
+    afterwards, so the underlying client keeps its connections alive between turns.
+    """
+    _instance: Optional['LLMRegistry'] = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._runnables = {}
+            cls._instance._lock = threading.Lock()
+            cls._instance._max_retries = 2
+        return cls._instance
+
+    def _build_chat_model(self, model: str, temperature: float) -> ChatGoogleGenerativeAI:
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY not found")
+
+        return ChatGoogleGenerativeAI(
+            model=model,
+            temperature=temperature,
+            max_retries=self._max_retries,
+            api_key=api_key,
+        )
+
+    def get(
+        self,
+        model: str,
+        temperature: float,
+        schema: Optional[Type[BaseModel]] = None,
+        json_mode: bool = False,
+    ) -> Runnable:
+        """
+        Return the shared runnable for this key, building it on first use.
+        With a schema the runnable is `llm.with_structured_output(schema)`.
+        With json_mode the runnable is the raw chat model constrained to emit the
+        schema as JSON text, so callers can stream and parse the tokens themselves.
+        """
+        key: RegistryKey = (model, float(temperature), schema, json_mode)
+        runnable = self._runnables.get(key)
+        if runnable is not None:
+            return runnable
+
+        with self._lock:
+            runnable = self._runnables.get(key)
+            if runnable is None:
+                # The raw chat model is shared by all schemas of the same (model, temperature)
+                base_key: RegistryKey = (model, float(temperature), None, False)
+                llm = self._runnables.get(base_key)
+                if llm is None:
+                    llm = self._build_chat_model(model, temperature)
+                    self._runnables[base_key] = llm
+                    logger.info(f"LLM client created for model={model}, temperature={temperature}")
+
+                if schema is None:
+                    runnable = llm
+                elif json_mode:
+                    runnable = llm.bind(
+                        response_mime_type="application/json",
+                        response_schema=schema.model_json_schema(),
+                    )
+                else:
+                    runnable = llm.with_structured_output(schema)
+                self._runnables[key] = runnable
+        return runnable
+
+    def warm_up(self, specs: list) -> None:
+        """Eagerly build runnables for a list of (model, temperature, schema[, json_mode]) tuples."""
+        for spec in specs:
+            self.get(*spec)
+        logger.info(f"LLM registry warmed up with {len(self._runnables)} runnables.")
+
+    def set_runnable(self, key: RegistryKey, runnable: Runnable) -> None:
+        """Install a pre-built runnable for a key (e.g. a fake model in local benchmarks)."""
+        model, temperature, schema, json_mode = key
+        with self._lock:
+            self._runnables[(model, float(temperature), schema, json_mode)] = runnable
+
+    def clear(self) -> None:
+        """Drop every pooled client. Called on application shutdown."""
+        with self._lock:
+            self._runnables.clear()
+
+
+# Singleton instance
+llm_registry = LLMRegistry()
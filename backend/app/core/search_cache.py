@@ -0,0 +1,145 @@
+# app/core/search_cache.py
+import os
+import re
+import time
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CACHE_PATH = Path(os.getenv("SEARCH_CACHE_PATH", "./chroma_db/search_cache.sqlite"))
+SEARCH_CACHE_TTL_SECONDS = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+# Expired entries nobody looks up again are deleted on a write at most this often
+SEARCH_CACHE_PURGE_INTERVAL = int(os.getenv("SEARCH_CACHE_PURGE_INTERVAL", "3600"))
+
+
+def normalize(text: str) -> str:
+    """Lowercases, drops punctuation and collapses whitespace so trivial variations share a key."""
+    return " ".join(re.sub(r"[^\w\s]", " ", (text or "").lower()).split())
+
+
+class SearchSummaryCache:
+    """
+    TTL-bounded cache of grounded online search summaries shared by all users.
+
+    Entries are keyed on normalized (target concept, focus, model) and persisted
+    in SQLite so they survive restarts. Concurrent lookups of the same key are
+    coalesced (single-flight): only the first one runs the search, the others
+    await its result. Each entry remembers how long the search took, so hits
+    can report the latency they saved.
+    """
+
+    def __init__(
+        self,
+        db_path: Path = SEARCH_CACHE_PATH,
+        ttl_seconds: int = SEARCH_CACHE_TTL_SECONDS,
+        purge_interval: int = SEARCH_CACHE_PURGE_INTERVAL,
+    ):
+        self._ttl_seconds = ttl_seconds
+        self._purge_interval = purge_interval
+        self._last_purge = time.time()
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "saved_seconds": 0.0}
+
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Shared by all API workers of the host
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS search_summaries ("
+            "key TEXT PRIMARY KEY, summary TEXT NOT NULL, latency REAL NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(target: str, focus: str, model: str) -> str:
+        raw = "\x1f".join([normalize(target), normalize(focus), model])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _get(self, key: str) -> Optional[tuple]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary, latency, created_at FROM search_summaries WHERE key = ?", (key,)
+            ).fetchone()
+            if row and time.time() - row[2] > self._ttl_seconds:
+                self._conn.execute("DELETE FROM search_summaries WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            return row
+
+    def _put(self, key: str, summary: str, latency: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_summaries (key, summary, latency, created_at) VALUES (?, ?, ?, ?)",
+                (key, summary, latency, time.time()),
+            )
+            self._conn.commit()
+        if time.time() - self._last_purge > self._purge_interval:
+            self.purge_expired()
+
+    def purge_expired(self) -> int:
+        """Deletes every expired entry. Returns how many were deleted."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM search_summaries WHERE created_at < ?", (time.time() - self._ttl_seconds,)
+            )
+            self._conn.commit()
+            self._last_purge = time.time()
+            return cursor.rowcount
+
+    async def _compute_and_store(self, key: str, compute: Callable[[], Awaitable[Optional[str]]]) -> Optional[str]:
+        try:
+            started = time.perf_counter()
+            summary = await compute()
+            latency = time.perf_counter() - started
+            # Failed searches return nothing and are not cached
+            if summary:
+                await asyncio.to_thread(self._put, key, summary, latency)
+            return summary
+        finally:
+            self._inflight.pop(key, None)
+
+    async def get_or_compute(
+        self,
+        target: str,
+        focus: str,
+        model: str,
+        compute: Callable[[], Awaitable[Optional[str]]],
+    ) -> Optional[str]:
+        key = self.make_key(target, focus, model)
+
+        cached = await asyncio.to_thread(self._get, key)
+        if cached:
+            summary, latency, _ = cached
+            self._stats["hits"] += 1
+            self._stats["saved_seconds"] += latency
+            logger.info(f"Search cache hit for '{target}' (saved ~{latency:.2f}s, {self.stats})")
+            return summary
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self._stats["coalesced"] += 1
+            logger.info(f"Joining in-flight search for '{target}'")
+        else:
+            self._stats["misses"] += 1
+            task = asyncio.ensure_future(self._compute_and_store(key, compute))
+            self._inflight[key] = task
+
+        # shield: a client disconnecting must not cancel a search other requests wait on
+        return await asyncio.shield(task)
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        lookups = self._stats["hits"] + self._stats["misses"] + self._stats["coalesced"]
+        hit_rate = (self._stats["hits"] + self._stats["coalesced"]) / lookups if lookups else 0.0
+        return {**self._stats, "saved_seconds": round(self._stats["saved_seconds"], 2), "hit_rate": round(hit_rate, 3)}
+
+
+# Singleton instance
+search_cache = SearchSummaryCache()
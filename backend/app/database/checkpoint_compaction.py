@@ -0,0 +1,208 @@
+# backend/app/database/checkpoint_compaction.py
+
+import os
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from .checkpointer import AsyncpgCheckpointSaver
+
+logger = logging.getLogger(__name__)
+
+# How many of the newest checkpoints to keep for every thread
+CHECKPOINT_KEEP_LAST = int(os.getenv("CHECKPOINT_KEEP_LAST", "20"))
+# Additionally keep every Nth checkpoint (counted from the thread's start) as a snapshot; 0 disables
+CHECKPOINT_SNAPSHOT_EVERY = int(os.getenv("CHECKPOINT_SNAPSHOT_EVERY", "0"))
+# Seconds between background compaction runs; 0 disables the background job
+CHECKPOINT_COMPACTION_INTERVAL = int(os.getenv("CHECKPOINT_COMPACTION_INTERVAL", "0"))
+# SQLite pages given back to the file system per vacuum step; the saver lock is released between steps
+CHECKPOINT_VACUUM_STEP_PAGES = int(os.getenv("CHECKPOINT_VACUUM_STEP_PAGES", "2000"))
+
+
+# Every checkpoint stores the full channel values (including the whole
+# history_messages list), so old checkpoints of a thread are pure overhead
+# for resuming it: only the latest one is read by aget_state.
+_SQLITE_PRUNE_CHECKPOINTS = """
+    DELETE FROM checkpoints WHERE rowid IN (
+        SELECT rowid FROM (
+            SELECT rowid,
+                ROW_NUMBER() OVER (PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC) AS newest_rank,
+                ROW_NUMBER() OVER (PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id ASC) AS oldest_rank
+            FROM checkpoints {where}
+        )
+        WHERE newest_rank > ? AND (? = 0 OR oldest_rank % ? != 0)
+    )
+"""
+
+_SQLITE_PRUNE_WRITES = """
+    DELETE FROM writes WHERE NOT EXISTS (
+        SELECT 1 FROM checkpoints c
+        WHERE c.thread_id = writes.thread_id
+          AND c.checkpoint_ns = writes.checkpoint_ns
+          AND c.checkpoint_id = writes.checkpoint_id
+    ) {and_where}
+"""
+
+_POSTGRES_PRUNE_CHECKPOINTS = """
+    DELETE FROM checkpoints c USING (
+        SELECT thread_id, checkpoint_ns, checkpoint_id,
+            ROW_NUMBER() OVER (PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC) AS newest_rank,
+            ROW_NUMBER() OVER (PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id ASC) AS oldest_rank
+        FROM checkpoints {where}
+    ) ranked
+    WHERE c.thread_id = ranked.thread_id
+      AND c.checkpoint_ns = ranked.checkpoint_ns
+      AND c.checkpoint_id = ranked.checkpoint_id
+      AND ranked.newest_rank > $1
+      AND ($2 = 0 OR ranked.oldest_rank % $3 <> 0)
+"""
+
+_POSTGRES_PRUNE_WRITES = """
+    DELETE FROM checkpoint_writes w WHERE NOT EXISTS (
+        SELECT 1 FROM checkpoints c
+        WHERE c.thread_id = w.thread_id
+          AND c.checkpoint_ns = w.checkpoint_ns
+          AND c.checkpoint_id = w.checkpoint_id
+    ) {and_where}
+"""
+
+
+async def _sqlite_pragma(conn, name: str) -> int:
+    async with conn.execute(f"PRAGMA {name}") as cursor:
+        return (await cursor.fetchone())[0]
+
+
+async def _sqlite_size(conn) -> int:
+    return await _sqlite_pragma(conn, "page_count") * await _sqlite_pragma(conn, "page_size")
+
+
+async def _vacuum_sqlite(saver):
+    """
+    Gives freed pages back to the file system in small incremental steps, so
+    graph turns waiting for the saver lock are only held up for one step
+    instead of a whole VACUUM.
+    """
+    conn = saver.conn
+    if await _sqlite_pragma(conn, "auto_vacuum") != 2:
+        logger.warning("Checkpoint database is not in incremental auto-vacuum mode (see open_checkpointer); not vacuuming.")
+        return
+
+    while await _sqlite_pragma(conn, "freelist_count"):
+        async with saver.lock:
+            # executescript steps the pragma to completion; execute frees a single page
+            await conn.executescript(f"PRAGMA incremental_vacuum({CHECKPOINT_VACUUM_STEP_PAGES})")
+
+
+async def _compact_sqlite(saver, keep_last: int, snapshot_every: int, thread_id: Optional[str], vacuum: bool) -> Dict[str, Any]:
+    conn = saver.conn
+    thread_params = (thread_id,) if thread_id else ()
+    async with saver.lock:
+        size_before = await _sqlite_size(conn)
+
+        cursor = await conn.execute(
+            _SQLITE_PRUNE_CHECKPOINTS.format(where="WHERE thread_id = ?" if thread_id else ""),
+            (*thread_params, keep_last, snapshot_every, snapshot_every or 1),
+        )
+        checkpoints_deleted = cursor.rowcount
+        cursor = await conn.execute(
+            _SQLITE_PRUNE_WRITES.format(and_where="AND writes.thread_id = ?" if thread_id else ""),
+            thread_params,
+        )
+        writes_deleted = cursor.rowcount
+        await conn.commit()
+
+    if vacuum:
+        await _vacuum_sqlite(saver)
+    size_after = await _sqlite_size(conn)
+
+    return {
+        "backend": "sqlite",
+        "checkpoints_deleted": checkpoints_deleted,
+        "writes_deleted": writes_deleted,
+        "size_before_bytes": size_before,
+        "size_after_bytes": size_after,
+    }
+
+
+async def _postgres_size(connection) -> int:
+    return await connection.fetchval(
+        "SELECT pg_total_relation_size('checkpoints') + pg_total_relation_size('checkpoint_writes')"
+    )
+
+
+async def _compact_postgres(saver: AsyncpgCheckpointSaver, keep_last: int, snapshot_every: int, thread_id: Optional[str], vacuum: bool) -> Dict[str, Any]:
+    async with saver.pool.acquire() as connection:
+        size_before = await _postgres_size(connection)
+
+        async with connection.transaction():
+            if thread_id:
+                checkpoints_status = await connection.execute(
+                    _POSTGRES_PRUNE_CHECKPOINTS.format(where="WHERE thread_id = $4"),
+                    keep_last, snapshot_every, snapshot_every or 1, thread_id,
+                )
+                writes_status = await connection.execute(
+                    _POSTGRES_PRUNE_WRITES.format(and_where="AND w.thread_id = $1"),
+                    thread_id,
+                )
+            else:
+                checkpoints_status = await connection.execute(
+                    _POSTGRES_PRUNE_CHECKPOINTS.format(where=""),
+                    keep_last, snapshot_every, snapshot_every or 1,
+                )
+                writes_status = await connection.execute(_POSTGRES_PRUNE_WRITES.format(and_where=""))
+
+        if vacuum:
+            # VACUUM can't run inside a transaction block
+            await connection.execute("VACUUM (ANALYZE) checkpoints, checkpoint_writes")
+
+        size_after = await _postgres_size(connection)
+
+    # asyncpg returns the command status, e.g. "DELETE 42"
+    return {
+        "backend": "postgres",
+        "checkpoints_deleted": int(checkpoints_status.split()[-1]),
+        "writes_deleted": int(writes_status.split()[-1]),
+        "size_before_bytes": size_before,
+        "size_after_bytes": size_after,
+    }
+
+
+async def compact_checkpoints(
+    saver,
+    keep_last: int = CHECKPOINT_KEEP_LAST,
+    snapshot_every: int = CHECKPOINT_SNAPSHOT_EVERY,
+    thread_id: Optional[str] = None,
+    vacuum: bool = False,
+) -> Dict[str, Any]:
+    """
+    Deletes all but the newest `keep_last` checkpoints of every thread (or only
+    of `thread_id`), optionally keeping every `snapshot_every`-th checkpoint as a
+    snapshot, removes the pending writes that belonged to deleted checkpoints,
+    and reports the store size before and after.
+
+    `vacuum` reclaims the freed space of the whole database. It is meant for
+    the maintenance job only, never for requests made on behalf of one user.
+    """
+    keep_last = max(1, keep_last)
+    snapshot_every = max(0, snapshot_every)
+
+    if isinstance(saver, AsyncpgCheckpointSaver):
+        report = await _compact_postgres(saver, keep_last, snapshot_every, thread_id, vacuum)
+    elif hasattr(saver, "conn") and hasattr(saver, "lock"):
+        report = await _compact_sqlite(saver, keep_last, snapshot_every, thread_id, vacuum)
+    else:
+        logger.warning(f"Checkpoint compaction is not supported for {type(saver).__name__}")
+        return {"backend": type(saver).__name__, "supported": False}
+
+    logger.info(f"Checkpoint compaction finished: {report}")
+    return report
+
+
+async def run_periodic_compaction(saver, interval: int = CHECKPOINT_COMPACTION_INTERVAL):
+    """Background maintenance task: compacts and vacuums all threads every `interval` seconds until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await compact_checkpoints(saver, vacuum=True)
+        except Exception as e:
+            logger.error(f"Periodic checkpoint compaction failed: {e}")
@@ -0,0 +1,353 @@
+# backend/app/database/checkpointer.py
+
+import os
+import json
+import asyncio
+import random
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence, Tuple
+
+import asyncpg
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from dotenv import load_dotenv, find_dotenv
+
+from .session import get_db_pool
+
+load_dotenv(find_dotenv())
+
+logger = logging.getLogger(__name__)
+
+# sqlite (default) | postgres | redis
+CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "sqlite").lower()
+CHECKPOINT_SQLITE_PATH = os.getenv("CHECKPOINT_SQLITE_PATH", "checkpoints.sqlite")
+CHECKPOINT_REDIS_URL = os.getenv("CHECKPOINT_REDIS_URL", "redis://localhost:6379")
+
+
+class AsyncpgCheckpointSaver(BaseCheckpointSaver[str]):
+    """
+    LangGraph checkpointer that stores checkpoints in Postgres through the
+    application's shared asyncpg pool (see schema.sql for the tables).
+
+    Unlike the single-file SQLite saver, writes from several uvicorn workers
+    go to the same database concurrently, so the API can scale horizontally.
+    The app uses the graphs via astream_events / aget_state. Like LangGraph's
+    own async savers, the sync methods only work from other threads: they run
+    the async version on the event loop the saver was created on.
+    """
+
+    def __init__(self, pool: asyncpg.Pool):
+        super().__init__()
+        self.pool = pool
+        self.loop = asyncio.get_running_loop()
+
+    def _run_sync(self, coro):
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            coro.close()
+            raise asyncio.InvalidStateError(
+                "Synchronous calls to AsyncpgCheckpointSaver are only allowed from a different thread. "
+                "From the main thread, use the async interface (e.g. graph.ainvoke / astream_events / aget_state)."
+            )
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self._run_sync(self.aget_tuple(config))
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        async def collect():
+            return [item async for item in self.alist(config, filter=filter, before=before, limit=limit)]
+
+        yield from self._run_sync(collect())
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return self._run_sync(self.aput(config, checkpoint, metadata, new_versions))
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        return self._run_sync(self.aput_writes(config, writes, task_id, task_path))
+
+    def delete_thread(self, thread_id: str) -> None:
+        return self._run_sync(self.adelete_thread(thread_id))
+
+    def _tuple_from_row(self, row, writes) -> CheckpointTuple:
+        thread_id, checkpoint_ns = row["thread_id"], row["checkpoint_ns"]
+        return CheckpointTuple(
+            {
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": row["checkpoint_id"],
+                }
+            },
+            self.serde.loads_typed((row["type"], row["checkpoint"])),
+            json.loads(row["metadata"]) if row["metadata"] else {},
+            (
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": row["parent_checkpoint_id"],
+                    }
+                }
+                if row["parent_checkpoint_id"]
+                else None
+            ),
+            [
+                (w["task_id"], w["channel"], self.serde.loads_typed((w["type"], w["value"])))
+                for w in writes
+            ],
+        )
+
+    async def _load_writes(self, connection, thread_id: str, checkpoint_ns: str, checkpoint_id: str):
+        return await connection.fetch(
+            """
+            SELECT task_id, channel, type, value FROM checkpoint_writes
+            WHERE thread_id = $1 AND checkpoint_ns = $2 AND checkpoint_id = $3
+            ORDER BY task_id, idx
+            """,
+            thread_id, checkpoint_ns, checkpoint_id,
+        )
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+
+        async with self.pool.acquire() as connection:
+            if checkpoint_id:
+                row = await connection.fetchrow(
+                    """
+                    SELECT * FROM checkpoints
+                    WHERE thread_id = $1 AND checkpoint_ns = $2 AND checkpoint_id = $3
+                    """,
+                    thread_id, checkpoint_ns, checkpoint_id,
+                )
+            else:
+                row = await connection.fetchrow(
+                    """
+                    SELECT * FROM checkpoints
+                    WHERE thread_id = $1 AND checkpoint_ns = $2
+                    ORDER BY checkpoint_id DESC LIMIT 1
+                    """,
+                    thread_id, checkpoint_ns,
+                )
+            if row is None:
+                return None
+
+            writes = await self._load_writes(connection, thread_id, checkpoint_ns, row["checkpoint_id"])
+        return self._tuple_from_row(row, writes)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        clauses, params = [], []
+        if config is not None:
+            params.append(config["configurable"]["thread_id"])
+            clauses.append(f"thread_id = ${len(params)}")
+            checkpoint_ns = config["configurable"].get("checkpoint_ns")
+            if checkpoint_ns is not None:
+                params.append(checkpoint_ns)
+                clauses.append(f"checkpoint_ns = ${len(params)}")
+        if filter:
+            params.append(json.dumps(filter))
+            clauses.append(f"metadata @> ${len(params)}::jsonb")
+        if before is not None:
+            params.append(get_checkpoint_id(before))
+            clauses.append(f"checkpoint_id < ${len(params)}")
+
+        query = "SELECT * FROM checkpoints"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY checkpoint_id DESC"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+
+        async with self.pool.acquire() as connection:
+            rows = await connection.fetch(query, *params)
+            for row in rows:
+                writes = await self._load_writes(
+                    connection, row["thread_id"], row["checkpoint_ns"], row["checkpoint_id"]
+                )
+                yield self._tuple_from_row(row, writes)
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        type_, serialized_checkpoint = self.serde.dumps_typed(checkpoint)
+        serialized_metadata = json.dumps(
+            get_checkpoint_metadata(config, metadata), ensure_ascii=False, default=str
+        )
+
+        async with self.pool.acquire() as connection:
+            await connection.execute(
+                """
+                INSERT INTO checkpoints
+                    (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata)
+                VALUES ($1, $2, $3, $4, $5, $6, $7::jsonb)
+                ON CONFLICT (thread_id, checkpoint_ns, checkpoint_id)
+                DO UPDATE SET checkpoint = EXCLUDED.checkpoint, metadata = EXCLUDED.metadata
+                """,
+                thread_id,
+                checkpoint_ns,
+                checkpoint["id"],
+                config["configurable"].get("checkpoint_id"),
+                type_,
+                serialized_checkpoint,
+                serialized_metadata,
+            )
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        # Special channels (errors, interrupts...) overwrite, regular writes are kept once
+        if all(channel in WRITES_IDX_MAP for channel, _ in writes):
+            conflict = "DO UPDATE SET channel = EXCLUDED.channel, type = EXCLUDED.type, value = EXCLUDED.value"
+        else:
+            conflict = "DO NOTHING"
+
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = [
+            (
+                thread_id,
+                checkpoint_ns,
+                checkpoint_id,
+                task_id,
+                WRITES_IDX_MAP.get(channel, idx),
+                channel,
+                *self.serde.dumps_typed(value),
+            )
+            for idx, (channel, value) in enumerate(writes)
+        ]
+
+        async with self.pool.acquire() as connection:
+            await connection.executemany(
+                f"""
+                INSERT INTO checkpoint_writes
+                    (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+                ON CONFLICT (thread_id, checkpoint_ns, checkpoint_id, task_id, idx) {conflict}
+                """,
+                rows,
+            )
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        async with self.pool.acquire() as connection:
+            async with connection.transaction():
+                await connection.execute("DELETE FROM checkpoints WHERE thread_id = $1", thread_id)
+                await connection.execute("DELETE FROM checkpoint_writes WHERE thread_id = $1", thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        # Same monotonic, lexicographically sortable scheme as the SQLite saver
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        next_v = current_v + 1
+        next_h = random.random()
+        return f"{next_v:032}.{next_h:016}"
+
+
+async def _enable_incremental_vacuum(conn):
+    """
+    Lets checkpoint compaction give space back in small steps instead of a
+    full VACUUM. New files take the setting directly; an existing file is
+    converted once, with a full VACUUM before the app starts serving.
+    """
+    async with conn.execute("PRAGMA auto_vacuum") as cursor:
+        mode = (await cursor.fetchone())[0]
+    if mode == 2:
+        return
+    await conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    async with conn.execute("PRAGMA page_count") as cursor:
+        if (await cursor.fetchone())[0]:
+            logger.info("Converting the checkpoint database to incremental auto-vacuum (one-off VACUUM).")
+            await conn.execute("VACUUM")
+
+
+@asynccontextmanager
+async def open_checkpointer(backend: str = CHECKPOINT_BACKEND):
+    """
+    Opens the LangGraph checkpointer selected by CHECKPOINT_BACKEND and closes
+    it on exit. Postgres reuses the application's asyncpg pool.
+    """
+    if backend == "postgres":
+        logger.info("Using Postgres checkpointer on the shared asyncpg pool.")
+        yield AsyncpgCheckpointSaver(await get_db_pool())
+
+    elif backend == "redis":
+        from langgraph.checkpoint.redis.aio import AsyncRedisSaver
+
+        logger.info(f"Using Redis checkpointer at {CHECKPOINT_REDIS_URL}.")
+        async with AsyncRedisSaver.from_conn_string(CHECKPOINT_REDIS_URL) as saver:
+            await saver.asetup()
+            yield saver
+
+    elif backend == "sqlite":
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+        logger.info(f"Using SQLite checkpointer at {CHECKPOINT_SQLITE_PATH}.")
+        async with AsyncSqliteSaver.from_conn_string(CHECKPOINT_SQLITE_PATH) as saver:
+            await _enable_incremental_vacuum(saver.conn)
+            yield saver
+
+    else:
+        raise ValueError(f"Unknown CHECKPOINT_BACKEND '{backend}', expected sqlite, postgres or redis")
@@ -6,8 +6,10 @@ from dotenv import load_dotenv,find_dotenv
 
 load_dotenv(find_dotenv())
 _pool = None
-#a dependecy to get connection
-async def get_db_session():
+
+
+async def get_db_pool() -> asyncpg.Pool:
+    """Returns the shared asyncpg pool, creating it on first use."""
     global _pool
     if not _pool:
         _pool = await asyncpg.create_pool(
@@ -17,23 +19,20 @@ async def get_db_session():
             password=os.getenv("DB_PASSWORD"),
             database=os.getenv("DB_NAME", "chatbot_db")
         )
-    
-    async with _pool.acquire() as connection:
+    return _pool
+
+
+#a dependecy to get connection
+async def get_db_session():
+    pool = await get_db_pool()
+    async with pool.acquire() as connection:
         yield connection
 
 
 async def get_db_connection():
     """Gets a direct connection from the pool for use in non-FastAPI contexts like the agent."""
-    global _pool
-    if not _pool:
-        _pool = await asyncpg.create_pool(
-            host=os.getenv("DB_HOST", "localhost"),
-            port=int(os.getenv("DB_PORT", "5432")),
-            user=os.getenv("DB_USER", "postgres"),
-            password=os.getenv("DB_PASSWORD"),
-            database=os.getenv("DB_NAME", "chatbot_db")
-        )
-    return await _pool.acquire()
+    pool = await get_db_pool()
+    return await pool.acquire()
 
 
 async def create_tables():
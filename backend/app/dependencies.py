@@ -8,4 +8,8 @@ def get_app_graph():
 
 def get_feynman_graph():
     """Dependency provider for the Feynman agent graph."""
-    return shared_resources.get("feynman_graph")
\ No newline at end of file
+    return shared_resources.get("feynman_graph")
+
+def get_checkpointer():
+    """Dependency provider for the LangGraph checkpointer shared by both graphs."""
+    return shared_resources.get("checkpointer")
\ No newline at end of file
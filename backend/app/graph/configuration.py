@@ -49,6 +49,71 @@ class Configuration(BaseModel):
         metadata={"description": "the simplicity level we consider is simple enough."}
     )
 
+    plan_cache_enabled: bool = Field(
+        default=True,
+        metadata={"description": "Reuse the learning plan of a near-identical earlier opening request."},
+    )
+
+    plan_cache_similarity_threshold: float = Field(
+        default=0.95,
+        metadata={"description": "The minimum cosine similarity for an opening request to reuse a cached learning plan."},
+    )
+
+    direct_checkpoint_queries: bool = Field(
+        default=False,
+        metadata={"description": "Use the learning checkpoints directly as retrieval queries instead of generating queries with the LLM."},
+    )
+
+    results_per_query: int = Field(
+        default=5,
+        metadata={"description": "The number of knowledge chunks retrieved for each search query."},
+    )
+
+    max_context_documents: int = Field(
+        default=8,
+        metadata={"description": "The maximum number of fused knowledge chunks passed to the tutor prompt."},
+    )
+
+    max_context_chars: int = Field(
+        default=6000,
+        metadata={"description": "The character budget for retrieved knowledge in the tutor prompt."},
+    )
+
+    max_research_loops: int = Field(
+        default=2,
+        metadata={"description": "The maximum number of online research loops in one Feynman turn."},
+    )
+
+    research_time_budget_seconds: float = Field(
+        default=30.0,
+        metadata={"description": "The wall-clock budget for online research in one Feynman turn."},
+    )
+
+    knowledge_token_budget: int = Field(
+        default=1500,
+        metadata={"description": "The estimated token budget for background knowledge in a prompt."},
+    )
+
+    verbatim_turns: int = Field(
+        default=6,
+        metadata={"description": "The number of most recent conversation turns sent to the model verbatim."},
+    )
+
+    summary_batch_messages: int = Field(
+        default=4,
+        metadata={"description": "The minimum number of older messages folded into the conversation summary at once."},
+    )
+
+    history_token_budget: int = Field(
+        default=6000,
+        metadata={"description": "The estimated token budget for conversation history in a prompt."},
+    )
+
+    stream_response: bool = Field(
+        default=True,
+        metadata={"description": "Stream the tutor's reply token by token instead of sending it after the node finishes."}
+    )
+
     @classmethod
     def from_runnable_config(
         cls, config: Optional[RunnableConfig] = None
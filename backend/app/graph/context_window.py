@@ -0,0 +1,78 @@
+import logging
+from typing import List, Tuple
+
+from langchain_core.messages import AnyMessage, HumanMessage, SystemMessage
+
+from .configuration import Configuration
+from .prompts import get_summary_prompt
+from .token_budget import estimate_tokens
+from ..core.llm_registry import llm_registry
+
+logger = logging.getLogger(__name__)
+
+
+def message_tokens(messages: List[AnyMessage]) -> int:
+    # A few extra tokens per message for the role/turn framing
+    return sum(estimate_tokens(str(m.content)) + 4 for m in messages)
+
+
+def _fold_point(history: List[AnyMessage], summarized: int, configurable: Configuration) -> int:
+    """
+    Index up to which history should be folded into the summary: everything
+    but the last `verbatim_turns` turns, or more if the rest is still over the
+    token budget. The point is moved forward to a human message so the
+    verbatim window always starts with the student speaking.
+    """
+    fold_until = max(summarized, len(history) - 2 * configurable.verbatim_turns)
+    while fold_until < len(history) - 1 and message_tokens(history[fold_until:]) > configurable.history_token_budget:
+        fold_until += 1
+    while fold_until < len(history) - 1 and not isinstance(history[fold_until], HumanMessage):
+        fold_until += 1
+    return fold_until
+
+
+async def summarize_messages(summary: str, messages: List[AnyMessage], configurable: Configuration) -> str:
+    """Folds `messages` into the running summary with the fast model."""
+    transcript = "\n".join(
+        f"{'Student' if isinstance(m, HumanMessage) else 'Tutor'}: {m.content}" for m in messages
+    )
+    llm = llm_registry.get(configurable.query_generator_model, 0.0)
+    response = await llm.ainvoke([HumanMessage(content=get_summary_prompt(summary, transcript))])
+    return str(response.content).strip()
+
+
+async def build_history_window(state, configurable: Configuration) -> Tuple[List[AnyMessage], dict]:
+    """
+    Returns the messages to send to the model instead of the entire history,
+    and the state update to persist.
+
+    The last `verbatim_turns` turns are kept as they are; older turns are folded
+    into `conversation_summary` in batches of at least `summary_batch_messages`
+    messages, or immediately when the verbatim part exceeds `history_token_budget`.
+    The summary is sent as a system message ahead of the verbatim window.
+    """
+    history = state.get("history_messages", []) or []
+    summary = state.get("conversation_summary") or ""
+    summarized = min(state.get("summarized_message_count") or 0, len(history))
+    update = {}
+
+    fold_until = _fold_point(history, summarized, configurable)
+    over_budget = message_tokens(history[summarized:]) > configurable.history_token_budget
+    window_start = summarized
+    if fold_until > summarized and (fold_until - summarized >= configurable.summary_batch_messages or over_budget):
+        try:
+            summary = await summarize_messages(summary, history[summarized:fold_until], configurable)
+            logger.info(f"Folded {fold_until - summarized} messages into the conversation summary.")
+            update = {"conversation_summary": summary, "summarized_message_count": fold_until}
+            window_start = fold_until
+        except Exception as e:
+            # Keep the old summary; only leave messages out of this prompt if they don't fit
+            logger.error(f"Conversation summarization failed: {e}")
+            if over_budget:
+                window_start = fold_until
+
+    window = history[window_start:]
+    logger.info(f"Prompt history: {len(window)} verbatim messages, ~{message_tokens(window)} tokens")
+    if summary:
+        window = [SystemMessage(content=f"Summary of the earlier conversation:\n{summary}"), *window]
+    return window, update
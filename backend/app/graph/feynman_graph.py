@@ -1,4 +1,5 @@
 import os
+import time
 import asyncio
 import logging
 from typing import Optional
@@ -8,16 +9,20 @@ from google.genai import Client
 
 from langgraph.graph import StateGraph
 from langgraph.graph.message import add_messages
-from langgraph.checkpoint.sqlite import SqliteSaver
 from langchain_core.runnables import RunnableConfig
+from langchain_core.callbacks.manager import adispatch_custom_event
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
 
 from .state import AgentState
 from .schemas import SearchQuery, checkpoints
 from .configuration import Configuration
 from .prompts import feynman_mode_prompt
-from ..core.chroma_db import chroma_manager
+from ..services.knowledge_writer import knowledge_writer
+from ..core.llm_registry import llm_registry
+from ..core.search_cache import search_cache
+from .json_stream import IncrementalJsonParser, chunk_text
+from .context_window import build_history_window
+from .token_budget import fit_to_budget, log_token_accounting
 
 
 logger = logging.getLogger(__name__)
@@ -51,12 +56,7 @@ async def assess_context_need(state: AgentState, config: RunnableConfig):
     """Ask LLM if we need more external context to explain the checkpoints simply."""
     configurable = Configuration.from_runnable_config(config)
 
-    llm = ChatGoogleGenerativeAI(
-        model=configurable.reflection_model,
-        temperature=0.4,
-        max_retries=2,
-        api_key=os.getenv("GEMINI_API_KEY"),
-    )
+    llm = llm_registry.get(configurable.reflection_model, 0.4)
 
     class ContextAssessmentModel:
         # lightweight structured output via JSON-mode prompt
@@ -66,7 +66,9 @@ async def assess_context_need(state: AgentState, config: RunnableConfig):
     known_knowledge = state.get("KnownKnowledge", [])
 
     checkpoints_str = "\n".join(learning_checkpoints)
-    knowledge_str = "\n".join(known_knowledge) if known_knowledge else "<none>"
+    # Only the most relevant knowledge that fits the token budget is shown to the model
+    knowledge_chunks = fit_to_budget(known_knowledge, configurable.knowledge_token_budget, reference=checkpoints_str)
+    knowledge_str = "\n".join(knowledge_chunks) if knowledge_chunks else "<none>"
 
     system = SystemMessage(content="You are a careful tutor. Decide if more online context is needed to explain simply.")
     human = HumanMessage(
@@ -77,6 +79,12 @@ async def assess_context_need(state: AgentState, config: RunnableConfig):
         )
     )
 
+    log_token_accounting(
+        "assess_context_need",
+        f"{system.content}\n{human.content}",
+        {"checkpoints": checkpoints_str, "knowledge": knowledge_str},
+    )
+
     response = await llm.ainvoke([system, human])
     # Best-effort JSON parse
     import json
@@ -100,7 +108,7 @@ async def search_online(state: AgentState, config: RunnableConfig):
 
     if not learning_checkpoints:
         logger.info("No checkpoints to research. Skipping search.")
-        return {}
+        return {"research_iterations": state.get("research_iterations", 0) + 1}
 
     # Craft a concise research prompt
     target = learning_checkpoints[0]
@@ -117,26 +125,57 @@ async def search_online(state: AgentState, config: RunnableConfig):
             tools=[{"google_search": {}}],
         )
 
-    try:
+    async def _search_summary():
         result = await asyncio.to_thread(_run_search)
         # Extract text safely from google-genai SDK response
-        summary_text = ""
         try:
             # responses.generate -> response with .output_text in newer SDKs
-            summary_text = getattr(result, "output_text", "") or ""
+            return getattr(result, "output_text", "") or ""
         except Exception:
-            summary_text = ""
+            return ""
+
+    try:
+        # Shared across users: the same concept/focus is only searched once per TTL
+        summary_text = await search_cache.get_or_compute(
+            target, context_focus, configurable.query_generator_model, _search_summary
+        )
 
         if not summary_text:
             # Fallback: use LC LLM to summarize from empty (no-op)
             summary_text = f"Online summary for {target} could not be retrieved."
 
-        existing = state.get("KnownKnowledge", []) or []
-        updated = existing + [summary_text]
-        return {"KnownKnowledge": updated}
+        # KnownKnowledge is append-only: return just the new summary, the reducer dedups it
+        return {
+            "KnownKnowledge": [summary_text],
+            "research_iterations": state.get("research_iterations", 0) + 1,
+        }
     except Exception as e:
         logger.error(f"Online search failed: {e}")
-        return {}
+        return {"research_iterations": state.get("research_iterations", 0) + 1}
+
+
+async def stream_evaluation(llm, messages, config: RunnableConfig):
+    """
+    Streams the evaluation JSON, forwarding `feedback` to the client as
+    `feedback_delta` custom events while it is generated. is_mastered is
+    decided as soon as that key has been parsed.
+    """
+    parser = IncrementalJsonParser(stream_fields=["feedback"])
+    is_mastered = False
+    streamed = []
+
+    async for chunk in llm.astream(messages, config=config):
+        for kind, key, value in parser.feed(chunk_text(chunk)):
+            if kind == "delta" and key == "feedback":
+                streamed.append(value)
+                await adispatch_custom_event("feedback_delta", {"text": value}, config=config)
+            elif kind == "value" and key == "is_mastered":
+                is_mastered = bool(value)
+                logger.info(f"Feynman evaluation decided is_mastered={is_mastered}")
+
+    # If the stream was cut off mid-feedback, keep what the user already saw
+    feedback = parser.values.get("feedback") or "".join(streamed)
+    return is_mastered, feedback
 
 
 async def evaluate_user_explanation(state: AgentState, config: RunnableConfig):
@@ -147,12 +186,7 @@ async def evaluate_user_explanation(state: AgentState, config: RunnableConfig):
     """
     configurable = Configuration.from_runnable_config(config)
 
-    llm = ChatGoogleGenerativeAI(
-        model=configurable.answer_model,
-        temperature=0.7,
-        max_retries=2,
-        api_key=os.getenv("GEMINI_API_KEY"),
-    )
+    llm = llm_registry.get(configurable.answer_model, 0.7)
 
     history = state.get("history_messages", [])
     checkpoints_list = state.get("learning_checkpoints", [])
@@ -169,19 +203,29 @@ async def evaluate_user_explanation(state: AgentState, config: RunnableConfig):
         )
     )
 
-    response = await llm.ainvoke([system, *history, human_instruction])
+    # Recent turns verbatim, older turns as a rolling summary
+    history_window, summary_update = await build_history_window(state, configurable)
+    messages = [system, *history_window, human_instruction]
 
-    import json
-    try:
-        data = json.loads(response.content if isinstance(response.content, str) else response.content[0]["text"])  # type: ignore[index]
-        is_mastered = bool(data.get("is_mastered", False))
-        feedback = data.get("feedback", "")
-    except Exception:
-        is_mastered = False
+    if configurable.stream_response:
+        is_mastered, feedback = await stream_evaluation(llm, messages, config)
+    else:
+        response = await llm.ainvoke(messages)
+
+        import json
+        try:
+            data = json.loads(response.content if isinstance(response.content, str) else response.content[0]["text"])  # type: ignore[index]
+            is_mastered = bool(data.get("is_mastered", False))
+            feedback = data.get("feedback", "")
+        except Exception:
+            is_mastered = False
+            feedback = ""
+
+    if not feedback:
         feedback = "I couldn't parse your explanation. Could you restate it simply in your own words?"
 
     new_history = history + [AIMessage(content=feedback)]
-    return {"history_messages": new_history, "learning_complete": is_mastered}
+    return {"history_messages": new_history, "learning_complete": is_mastered, **summary_update}
 
 
 async def store_mastered_concept(state: AgentState, config: RunnableConfig):
@@ -210,28 +254,41 @@ async def store_mastered_concept(state: AgentState, config: RunnableConfig):
 
     try:
         combined_content = "\n\n".join(content_list)
-        collection_name = f"user_{user_id}_knowledge"
-        collection = chroma_manager.get_collection(name=collection_name)
-
-        embeddings = await asyncio.to_thread(
-            chroma_manager.embedding_model.embed_documents, [combined_content]
-        )
-
+        # Committed to Chroma by the write-behind queue, off the response path
         await asyncio.to_thread(
-            collection.add,
-            embeddings=embeddings,
-            documents=[combined_content],
-            ids=[topic],
-            metadatas=[{"topic": topic, "source": "feynman_agent"}],
+            knowledge_writer.enqueue,
+            user_id,
+            topic,
+            combined_content,
+            {"topic": topic, "source": "feynman_agent"},
         )
 
-        logger.info(f"Stored mastered concept for user {user_id}: {topic}")
+        logger.info(f"Queued mastered concept for user {user_id}: {topic}")
     except Exception as e:
         logger.error(f"Failed to store mastered concept '{topic}' for user {user_id}: {e}")
 
     return {}
 
 
+async def begin_turn(state: AgentState, config: RunnableConfig):
+    """Resets the research loop bookkeeping at the start of every turn."""
+    return {"research_iterations": 0, "research_started_at": time.time()}
+
+
+def decide_research(state: AgentState, config: RunnableConfig) -> str:
+    """Allows another online search only while the turn's loop and time budgets last."""
+    if not state.get("needs_more_context"):
+        return "enough_context"
+
+    configurable = Configuration.from_runnable_config(config)
+    iterations = state.get("research_iterations", 0)
+    elapsed = time.time() - (state.get("research_started_at") or time.time())
+    if iterations >= configurable.max_research_loops or elapsed >= configurable.research_time_budget_seconds:
+        logger.info(f"Research budget exhausted after {iterations} loops / {elapsed:.1f}s. Evaluating with current context.")
+        return "enough_context"
+    return "needs_context"
+
+
 def should_continue(state: AgentState) -> str:
     if state.get("learning_complete"):
         return "continue_to_store_known_knowledge"
@@ -251,6 +308,7 @@ def get_graph(checkpointer):
     builder = StateGraph(AgentState, config_schema=Configuration)
 
     # Nodes
+    builder.add_node("begin_turn", begin_turn)
     builder.add_node("generate_learning_goals", generate_learning_goals)
     builder.add_node("assess_context_need", assess_context_need)
     builder.add_node("search_online", search_online)
@@ -259,7 +317,9 @@ def get_graph(checkpointer):
     builder.add_node("end_node", lambda state: {})
 
     # Entry
-    builder.set_conditional_entry_point(
+    builder.set_entry_point("begin_turn")
+    builder.add_conditional_edges(
+        "begin_turn",
         decide_entry_point,
         {
             "generate_learning_goals": "generate_learning_goals",
@@ -270,10 +330,10 @@ def get_graph(checkpointer):
     # Initial ramp
     builder.add_edge("generate_learning_goals", "assess_context_need")
 
-    # Research loop
+    # Research loop, bounded by max_research_loops / research_time_budget_seconds
     builder.add_conditional_edges(
         "assess_context_need",
-        lambda s: "needs_context" if s.get("needs_more_context") else "enough_context",
+        decide_research,
         {
             "needs_context": "search_online",
             "enough_context": "evaluate_user_explanation",
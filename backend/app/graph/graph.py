@@ -1,29 +1,23 @@
 import os
-from typing import TypedDict, Annotated
 from dotenv import load_dotenv,find_dotenv
-from pathlib import Path
 from langgraph.graph import StateGraph
-from langgraph.graph.message import add_messages
 from google.genai import Client
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.runnables import RunnableConfig
+from langchain_core.callbacks.manager import adispatch_custom_event
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
 from .state import *
 from .schemas import *
 from .configuration import Configuration
 from .prompts import get_learning_mode_prompt
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-import chromadb
 from ..core.chroma_db import chroma_manager
+from ..core.llm_registry import llm_registry
+from ..services.knowledge_writer import knowledge_writer
+from .json_stream import IncrementalJsonParser, chunk_text
+from .retrieval import multi_query_retrieve
+from .timing import timed_node
+from .context_window import build_history_window
+from .plan_cache import lookup_plan, store_plan
 import logging
-from langgraph.checkpoint.memory import MemorySaver
-
-from langgraph.checkpoint.sqlite import SqliteSaver
-from langgraph.checkpoint.redis import RedisSaver
-import sqlite3
-from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
-import logging
-from langchain_core.runnables import RunnableConfig
 from ..database.session import get_db_connection
 from ..models.operations import check_thread_exists, add_thread
 import asyncio
@@ -69,17 +63,30 @@ async def generate_learning_goals(state: AgentState, config: RunnableConfig):
     logger.info("Generating new learning checkpoints.")
     configurable = Configuration.from_runnable_config(config)
 
-    llm = ChatGoogleGenerativeAI(
-        model=configurable.query_generator_model,
-        temperature=1.0,
-        max_retries=2,
-        api_key=os.getenv("GEMINI_API_KEY"),
+    # Reuse the plan of a near-identical earlier opening request if there is one
+    request_text = "\n".join(
+        str(m.content) for m in state.get('history_messages', []) if isinstance(m, HumanMessage)
     )
-    structured_llm = llm.with_structured_output(checkpoints)
+    if configurable.plan_cache_enabled and request_text:
+        try:
+            cached_goals = await lookup_plan(request_text, configurable.plan_cache_similarity_threshold)
+            if cached_goals:
+                return {"learning_checkpoints": cached_goals}
+        except Exception as e:
+            logger.error(f"Plan cache lookup failed: {e}")
+
+    structured_llm = llm_registry.get(configurable.query_generator_model, 1.0, checkpoints)
     prompt = state.get('history_messages', []) + [
         HumanMessage(content="Based on our conversation, what checkpoints should we establish to achieve the learning goal?")
     ]
     result = await structured_llm.ainvoke(prompt)
+
+    if configurable.plan_cache_enabled and request_text and result.goals:
+        try:
+            await store_plan(request_text, result.goals)
+        except Exception as e:
+            logger.error(f"Failed to store plan in cache: {e}")
+
     return {"learning_checkpoints": result.goals}
 
 
@@ -88,14 +95,15 @@ async def generate_query(state: AgentState, config: RunnableConfig):
     
     configurable = Configuration.from_runnable_config(config)
 
-# init Gemini 2.0 Flash
-    llm = ChatGoogleGenerativeAI(
-        model=configurable.query_generator_model,
-        temperature=1.0,
-        max_retries=2,
-        api_key=os.getenv("GEMINI_API_KEY"),
-    )
-    structured_llm = llm.with_structured_output(SearchQuery)
+    # Fast path: use the checkpoints themselves as the search queries and skip
+    # the LLM round-trip; search_relevant embeds them in one batch
+    if configurable.direct_checkpoint_queries:
+        checkpoint_queries = [c for c in state.get('learning_checkpoints', []) if c.strip()]
+        logger.info(f"Using {len(checkpoint_queries)} learning checkpoints directly as search queries.")
+        return {"search_query": checkpoint_queries}
+
+    # shared Gemini 2.0 Flash client from the registry
+    structured_llm = llm_registry.get(configurable.query_generator_model, 1.0, SearchQuery)
 
     # Format the prompt with system message and user content
     checkpoints_str = "\n".join(state.get('learning_checkpoints', []))
@@ -119,25 +127,17 @@ async def generate_query(state: AgentState, config: RunnableConfig):
 async def search_relevant(state: AgentState, config: RunnableConfig):
     configurable = Configuration.from_runnable_config(config)
     user_id = configurable.user_id
-    collection_name = f"user_{user_id}_knowledge"
-    collection = chroma_manager.get_collection(name=collection_name)
+    collection = chroma_manager.get_knowledge_collection(user_id)
 
     search_queries = state.get('search_query', [])
-    vectorized_queries = await asyncio.to_thread(
-        chroma_manager.embedding_model.embed_documents, search_queries
+    retrieved_docs = await multi_query_retrieve(
+        collection,
+        search_queries,
+        n_results=configurable.results_per_query,
+        max_documents=configurable.max_context_documents,
+        max_chars=configurable.max_context_chars,
     )
 
-    results = await asyncio.to_thread(
-        collection.query,
-        query_embeddings=vectorized_queries,
-        n_results=5
-    )
-    documents = results.get('documents')
-    if not documents:
-        return {"KnownKnowledge": []}
-    
-    retrieved_docs = [doc for doc_list in results['documents'] for doc in doc_list]
-
     return {"KnownKnowledge": retrieved_docs}
 
 
@@ -158,22 +158,17 @@ async def store_known_knowledge(state: AgentState, config: RunnableConfig):
     try: 
         combined_content = "\n\n".join(content_list)
 
-        collection_name = f"user_{user_id}_knowledge"
-        collection = chroma_manager.get_collection(name=collection_name)
-
-        embeddings = await asyncio.to_thread(
-            chroma_manager.embedding_model.embed_documents, [combined_content]
-        )
-
+        # Embedding and the Chroma write happen in the write-behind queue,
+        # so the turn (and the user's stream) ends right after the reply
         await asyncio.to_thread(
-            collection.add,
-            embeddings=embeddings,
-            documents=[combined_content],
-            ids=[topic],
-            metadatas=[{"topic": topic}]
+            knowledge_writer.enqueue,
+            user_id,
+            topic,
+            combined_content,
+            {"topic": topic},
         )
         
-        logger.info(f"Successfully stored knowledge for user {user_id} in topic: {topic}")
+        logger.info(f"Queued knowledge for user {user_id} in topic: {topic}")
 
     except Exception as e: 
         logger.error(f"Failed to store knowledge for user {user_id}, topic '{topic}': {str(e)}")
@@ -184,36 +179,58 @@ async def store_known_knowledge(state: AgentState, config: RunnableConfig):
 
 
 
+async def stream_learning_response(prompt, configurable: Configuration, config: RunnableConfig) -> LearningResponse:
+    """
+    Streams the LearningResponse JSON from the model, forwarding response_text to the
+    client as `response_text_delta` custom events while the tokens arrive.
+    next_action is only known once the model has finished. Raises ValueError if the
+    reply is not a complete JSON object with response_text (malformed or cut off).
+    """
+    llm = llm_registry.get(configurable.query_generator_model, 1.0, LearningResponse, json_mode=True)
+    parser = IncrementalJsonParser(stream_fields=["response_text"])
+
+    async for chunk in llm.astream(prompt, config=config):
+        for kind, key, value in parser.feed(chunk_text(chunk)):
+            if kind == "delta" and key == "response_text":
+                await adispatch_custom_event("response_text_delta", {"text": value}, config=config)
+
+    if not parser.done or "response_text" not in parser.values:
+        raise ValueError("Model reply is not a complete LearningResponse JSON object")
+    return LearningResponse(
+        response_text=parser.values.get("response_text", ""),
+        next_action=parser.values.get("next_action", "continue_learning"),
+    )
+
+
 #the central conversation node 
 async def central_response_node(state: AgentState, config: RunnableConfig):
     configurable = Configuration.from_runnable_config(config)
     
-    # init Gemini (model depends on user choose fast or smart)
-    llm = ChatGoogleGenerativeAI(
-        model=configurable.query_generator_model,
-        temperature=1.0,
-        max_retries=2,
-        api_key=os.getenv("GEMINI_API_KEY"),
-    )
-
-    structured_llm = llm.with_structured_output(LearningResponse)
-
     learning_checkpoints = state.get('learning_checkpoints', [])
     known_knowledge = state.get('KnownKnowledge', [])
     history_messages = state.get('history_messages', [])
-    learning_mode_prompt= get_learning_mode_prompt(learning_checkpoints,known_knowledge)
+    learning_mode_prompt= get_learning_mode_prompt(learning_checkpoints,known_knowledge,configurable.knowledge_token_budget)
+
+    # Recent turns verbatim, older turns as a rolling summary
+    history_window, summary_update = await build_history_window(state, configurable)
 
     prompt = [
         SystemMessage(content=learning_mode_prompt),
-        *history_messages
+        *history_window
     ]
 
     try: 
-        result = await structured_llm.ainvoke(prompt)
+        if configurable.stream_response:
+            result = await stream_learning_response(prompt, configurable, config)
+        else:
+            # shared Gemini client (model depends on user choose fast or smart)
+            structured_llm = llm_registry.get(configurable.query_generator_model, 1.0, LearningResponse)
+            result = await structured_llm.ainvoke(prompt)
         new_history = history_messages + [AIMessage(content=result.response_text)]
         return {
             "history_messages": new_history,
-            "learning_complete": (result.next_action == "store_knowledge")
+            "learning_complete": (result.next_action == "store_knowledge"),
+            **summary_update,
         }
     except Exception as e:
         logger.error(f"Error in central_response_node: {e}")
@@ -221,7 +238,8 @@ async def central_response_node(state: AgentState, config: RunnableConfig):
         new_history = history_messages + [AIMessage(content=error_message)]
         return {
             "history_messages": new_history,
-            "error": str(e)
+            "error": str(e),
+            **summary_update,
         }
 
     
@@ -294,13 +312,13 @@ def get_graph(checkpointer):
     """Builds and compiles a robust agent pipeline with an explicit end state."""
     builder = StateGraph(AgentState, config_schema=Configuration)
 
-    # 1. Add all nodes as before
-    builder.add_node("generate_learning_goals", generate_learning_goals)
-    builder.add_node("store_thread", name_and_store_thread)
-    builder.add_node("generate_query", generate_query)
-    builder.add_node("search_relevant", search_relevant)
-    builder.add_node("central_response_node", central_response_node)
-    builder.add_node("store_known_knowledge", store_known_knowledge)
+    # 1. Add all nodes, each wrapped to log its duration
+    builder.add_node("generate_learning_goals", timed_node(generate_learning_goals))
+    builder.add_node("store_thread", timed_node(name_and_store_thread))
+    builder.add_node("generate_query", timed_node(generate_query))
+    builder.add_node("search_relevant", timed_node(search_relevant))
+    builder.add_node("central_response_node", timed_node(central_response_node))
+    builder.add_node("store_known_knowledge", timed_node(store_known_knowledge))
 
     # --- THE FIX: Add an explicit end node ---
     # This node does nothing and just marks a clean exit point.
@@ -315,11 +333,14 @@ def get_graph(checkpointer):
         }
     )
 
-    # 3. Define the initial setup path as before
+    # 3. Define the initial setup path as a fan-out/fan-in:
+    #    storing the thread (a Postgres write) doesn't depend on query generation
+    #    or retrieval, so it runs concurrently with them
     builder.add_edge("generate_learning_goals", "store_thread")
-    builder.add_edge("store_thread", "generate_query")
+    builder.add_edge("generate_learning_goals", "generate_query")
     builder.add_edge("generate_query", "search_relevant")
-    builder.add_edge("search_relevant", "central_response_node")
+    # central_response_node waits for both branches to finish
+    builder.add_edge(["store_thread", "search_relevant"], "central_response_node")
 
     # 4. Modify the conditional branch to use the new end node
     builder.add_conditional_edges(
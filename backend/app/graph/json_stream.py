@@ -0,0 +1,200 @@
+import json
+from typing import Any, Iterable, List, Tuple
+
+# Parser states
+_BEFORE_OBJECT = "before_object"
+_EXPECT_KEY = "expect_key"
+_IN_KEY = "in_key"
+_EXPECT_COLON = "expect_colon"
+_EXPECT_VALUE = "expect_value"
+_IN_STREAMED_STRING = "in_streamed_string"
+_IN_RAW_VALUE = "in_raw_value"
+_AFTER_VALUE = "after_value"
+_DONE = "done"
+
+_WHITESPACE = " \t\r\n"
+
+# (kind, key, value) where kind is "delta" (partial text of a streamed string field)
+# or "value" (a top-level field whose value is now complete)
+StreamEvent = Tuple[str, str, Any]
+
+
+class IncrementalJsonParser:
+    """
+    Incrementally parses one flat JSON object that arrives in chunks (e.g. LLM tokens).
+
+    Top-level string fields listed in `stream_fields` are decoded as they arrive and
+    reported as "delta" events, so their text can be forwarded before the model has
+    finished. Every top-level field is reported once as a "value" event as soon as its
+    value is complete. Anything before the opening brace (like a ```json fence) and
+    after the closing brace is ignored.
+    """
+
+    def __init__(self, stream_fields: Iterable[str] = ()):
+        self.stream_fields = set(stream_fields)
+        self.values: dict = {}
+        self._state = _BEFORE_OBJECT
+        self._key_raw = ""
+        self._key = ""
+        self._escape = ""
+        self._high_surrogate = ""
+        self._text: List[str] = []
+        self._raw: List[str] = []
+        self._raw_in_string = False
+        self._raw_escape = False
+        self._raw_depth = 0
+
+    @property
+    def done(self) -> bool:
+        return self._state == _DONE
+
+    def feed(self, chunk: str) -> List[StreamEvent]:
+        """Consume a chunk of raw model output and return the events it completed."""
+        events: List[StreamEvent] = []
+        delta: List[str] = []
+        for ch in chunk:
+            self._step(ch, events, delta)
+        if delta:
+            events.append(("delta", self._key, "".join(delta)))
+        return events
+
+    def _finish_value(self, value: Any, events: List[StreamEvent], delta: List[str]):
+        # A streamed field's delta must be reported before its completed value
+        if delta:
+            events.append(("delta", self._key, "".join(delta)))
+            delta.clear()
+        self.values[self._key] = value
+        events.append(("value", self._key, value))
+
+    def _finish_raw_value(self, events: List[StreamEvent], delta: List[str]):
+        raw = "".join(self._raw).strip()
+        self._raw = []
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            # Malformed value: keep the parser going and leave the key unset
+            return
+        self._finish_value(value, events, delta)
+
+    def _decode_escape(self, delta: List[str]):
+        text = json.loads(f'"{self._escape}"')
+        self._escape = ""
+        if self._high_surrogate:
+            text = (self._high_surrogate + text).encode("utf-16", "surrogatepass").decode("utf-16")
+            self._high_surrogate = ""
+        elif "\ud800" <= text <= "\udbff":
+            # Wait for the low surrogate of the pair before emitting anything
+            self._high_surrogate = text
+            return
+        self._text.append(text)
+        delta.append(text)
+
+    def _step(self, ch: str, events: List[StreamEvent], delta: List[str]):
+        state = self._state
+
+        if state == _BEFORE_OBJECT:
+            if ch == "{":
+                self._state = _EXPECT_KEY
+
+        elif state == _EXPECT_KEY:
+            if ch == '"':
+                self._key_raw = ""
+                self._state = _IN_KEY
+            elif ch == "}":
+                self._state = _DONE
+
+        elif state == _IN_KEY:
+            if self._escape:
+                self._key_raw += ch
+                self._escape = ""
+            elif ch == "\\":
+                self._key_raw += ch
+                self._escape = ch
+            elif ch == '"':
+                self._key = json.loads(f'"{self._key_raw}"')
+                self._state = _EXPECT_COLON
+            else:
+                self._key_raw += ch
+
+        elif state == _EXPECT_COLON:
+            if ch == ":":
+                self._state = _EXPECT_VALUE
+
+        elif state == _EXPECT_VALUE:
+            if ch in _WHITESPACE:
+                return
+            if ch == '"' and self._key in self.stream_fields:
+                self._text = []
+                self._state = _IN_STREAMED_STRING
+            else:
+                self._raw = [ch]
+                self._raw_in_string = ch == '"'
+                self._raw_escape = False
+                self._raw_depth = 1 if ch in "{[" else 0
+                self._state = _IN_RAW_VALUE
+
+        elif state == _IN_STREAMED_STRING:
+            if self._escape:
+                self._escape += ch
+                # \uXXXX needs four hex digits, every other escape is one character
+                if self._escape[1] != "u" or len(self._escape) == 6:
+                    self._decode_escape(delta)
+            elif ch == "\\":
+                self._escape = ch
+            elif ch == '"':
+                self._finish_value("".join(self._text), events, delta)
+                self._state = _AFTER_VALUE
+            else:
+                self._text.append(ch)
+                delta.append(ch)
+
+        elif state == _IN_RAW_VALUE:
+            if self._raw_in_string:
+                self._raw.append(ch)
+                if self._raw_escape:
+                    self._raw_escape = False
+                elif ch == "\\":
+                    self._raw_escape = True
+                elif ch == '"':
+                    self._raw_in_string = False
+                    if self._raw_depth == 0:
+                        self._finish_raw_value(events, delta)
+                        self._state = _AFTER_VALUE
+            elif ch == '"':
+                self._raw.append(ch)
+                self._raw_in_string = True
+            elif ch in "{[":
+                self._raw.append(ch)
+                self._raw_depth += 1
+            elif ch in "}]" and self._raw_depth > 0:
+                self._raw.append(ch)
+                self._raw_depth -= 1
+                if self._raw_depth == 0:
+                    self._finish_raw_value(events, delta)
+                    self._state = _AFTER_VALUE
+            elif self._raw_depth == 0 and ch in ",}":
+                # End of a scalar (number, true/false, null)
+                self._finish_raw_value(events, delta)
+                self._state = _EXPECT_KEY if ch == "," else _DONE
+            else:
+                self._raw.append(ch)
+
+        elif state == _AFTER_VALUE:
+            if ch == ",":
+                self._state = _EXPECT_KEY
+            elif ch == "}":
+                self._state = _DONE
+
+
+def chunk_text(chunk) -> str:
+    """Extract the text of a streamed AIMessageChunk (string or list-of-parts content)."""
+    content = getattr(chunk, "content", chunk)
+    if isinstance(content, str):
+        return content
+    parts = []
+    for part in content or []:
+        if isinstance(part, str):
+            parts.append(part)
+        elif isinstance(part, dict) and part.get("type", "text") == "text":
+            parts.append(part.get("text", ""))
+    return "".join(parts)
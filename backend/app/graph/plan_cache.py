@@ -0,0 +1,64 @@
+import json
+import asyncio
+import hashlib
+import logging
+from typing import List, Optional
+
+from ..core.chroma_db import chroma_manager
+
+logger = logging.getLogger(__name__)
+
+# Shared across users: opening requests and the checkpoint plans generated for them
+PLAN_CACHE_COLLECTION = "learning_plan_cache"
+
+
+def _plan_collection():
+    # Cosine space so that 1 - distance is the similarity of two requests
+    return chroma_manager.get_collection(name=PLAN_CACHE_COLLECTION, metadata={"hnsw:space": "cosine"})
+
+
+def _request_id(request_text: str) -> str:
+    normalized = " ".join(request_text.lower().split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+async def lookup_plan(request_text: str, threshold: float) -> Optional[List[str]]:
+    """
+    Returns the checkpoint plan of the most similar earlier opening request, if
+    its cosine similarity is at least `threshold`.
+    """
+    collection = _plan_collection()
+    embeddings = await asyncio.to_thread(chroma_manager.embedding_model.embed_documents, [request_text])
+    results = await asyncio.to_thread(
+        collection.query,
+        query_embeddings=embeddings,
+        n_results=1,
+        include=["metadatas", "distances"],
+    )
+
+    distances = (results.get("distances") or [[]])[0]
+    metadatas = (results.get("metadatas") or [[]])[0]
+    if not distances:
+        return None
+
+    similarity = 1.0 - distances[0]
+    if similarity < threshold:
+        logger.info(f"Plan cache miss (best similarity {similarity:.3f} < {threshold})")
+        return None
+
+    goals = json.loads(metadatas[0]["goals"])
+    logger.info(f"Plan cache hit (similarity {similarity:.3f}), reusing {len(goals)} checkpoints")
+    return goals
+
+
+async def store_plan(request_text: str, goals: List[str]) -> None:
+    """Stores a generated plan under its opening request for later reuse."""
+    collection = _plan_collection()
+    embeddings = await asyncio.to_thread(chroma_manager.embedding_model.embed_documents, [request_text])
+    await asyncio.to_thread(
+        collection.upsert,
+        ids=[_request_id(request_text)],
+        embeddings=embeddings,
+        documents=[request_text],
+        metadatas=[{"goals": json.dumps(goals)}],
+    )
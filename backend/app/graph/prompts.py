@@ -1,4 +1,5 @@
 from langchain_core.messages import SystemMessage
+from .token_budget import fit_to_budget, log_token_accounting
 
 #prompt to make LLM act as an Feynman instructor
 feynman_mode_prompt = SystemMessage(content="""
@@ -41,12 +42,19 @@ Your ultimate objective is to help students achieve the level of understanding w
 """)
 
 
-def get_learning_mode_prompt(learning_checkpoints, known_knowledge):
+def get_learning_mode_prompt(learning_checkpoints, known_knowledge, knowledge_token_budget=1500):
+    checkpoints_section = chr(10).join([f"• {checkpoint}" for checkpoint in learning_checkpoints])
+
+    # Only the most relevant knowledge chunks that fit the token budget go into the prompt
+    knowledge_chunks = fit_to_budget(known_knowledge or [], knowledge_token_budget, reference=checkpoints_section)
+    knowledge_section = chr(10).join([f"- {chunk}" for chunk in knowledge_chunks]) if knowledge_chunks else "No prior knowledge available"
+
     Learning_mode_prompt = f"""
     You are an AI learning tutor helping a student master these learning checkpoints:
-    {chr(10).join([f"• {checkpoint}" for checkpoint in learning_checkpoints])}
+    {checkpoints_section}
         
-    Available background knowledge: {known_knowledge[:] if known_knowledge else "No prior knowledge available"}
+    Available background knowledge:
+    {knowledge_section}
 
     **FORMATTING INSTRUCTIONS:**
     Always format your responses using markdown for better readability:
@@ -88,10 +96,30 @@ def get_learning_mode_prompt(learning_checkpoints, known_knowledge):
     
     Your output should feel less like a lecture and more like a guided discovery, where each concept is connected by an insightful question that sparks curiosity and understanding.
     """
+
+    log_token_accounting(
+        "learning_mode_prompt",
+        Learning_mode_prompt,
+        {"checkpoints": checkpoints_section, "knowledge": knowledge_section},
+    )
     
     return Learning_mode_prompt
 
 
+def get_summary_prompt(existing_summary, transcript):
+    summary_prompt = f"""
+    You are maintaining a running summary of a tutoring conversation so the tutor can keep
+    teaching without re-reading the whole transcript.
 
+    Current summary:
+    {existing_summary if existing_summary else "No summary yet."}
 
+    New conversation turns to fold into the summary:
+    {transcript}
+
+    Write the updated summary in at most 200 words. Keep what the student already understands,
+    their misconceptions, the questions still open, and which learning checkpoints have been covered.
+    Return only the summary text.
+    """
 
+    return summary_prompt
@@ -0,0 +1,82 @@
+import asyncio
+import logging
+from typing import List, Tuple
+
+from ..core.chroma_db import chroma_manager
+
+logger = logging.getLogger(__name__)
+
+# Standard reciprocal rank fusion constant; dampens the weight of top ranks
+RRF_K = 60
+
+
+async def _query_one(collection, embedding: List[float], n_results: int) -> Tuple[List[str], List[str]]:
+    """Runs one nearest-neighbour query and returns its ranked (ids, documents)."""
+    results = await asyncio.to_thread(
+        collection.query,
+        query_embeddings=[embedding],
+        n_results=n_results,
+    )
+    ids = (results.get("ids") or [[]])[0]
+    documents = (results.get("documents") or [[]])[0]
+    return ids, documents
+
+
+def reciprocal_rank_fusion(ranked_lists: List[Tuple[List[str], List[str]]], k: int = RRF_K) -> List[str]:
+    """
+    Fuses several ranked result lists into one, deduplicated by document id.
+    A document's score is the sum of 1 / (k + rank) over every list it appears in.
+    """
+    scores = {}
+    documents = {}
+    for ids, docs in ranked_lists:
+        for rank, (doc_id, doc) in enumerate(zip(ids, docs), start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+            documents.setdefault(doc_id, doc)
+
+    ranked_ids = sorted(scores, key=lambda doc_id: scores[doc_id], reverse=True)
+    return [documents[doc_id] for doc_id in ranked_ids]
+
+
+def cap_context(documents: List[str], max_documents: int, max_chars: int) -> List[str]:
+    """Keeps the best-ranked documents that fit within the document and character budgets."""
+    kept = []
+    used_chars = 0
+    for doc in documents[:max_documents]:
+        if not doc:
+            continue
+        if kept and used_chars + len(doc) > max_chars:
+            break
+        kept.append(doc)
+        used_chars += len(doc)
+    return kept
+
+
+async def multi_query_retrieve(
+    collection,
+    queries: List[str],
+    n_results: int = 5,
+    max_documents: int = 8,
+    max_chars: int = 6000,
+) -> List[str]:
+    """
+    Embeds all queries in one batch, searches them concurrently, and fuses the
+    results with reciprocal rank fusion. Latency is bounded by the slowest
+    query and each document appears at most once in the returned context.
+    """
+    queries = [q for q in queries if q and q.strip()]
+    if not queries:
+        return []
+
+    embeddings = await asyncio.to_thread(chroma_manager.embedding_model.embed_documents, queries)
+    ranked_lists = await asyncio.gather(
+        *(_query_one(collection, embedding, n_results) for embedding in embeddings)
+    )
+
+    fused = reciprocal_rank_fusion(ranked_lists)
+    context = cap_context(fused, max_documents, max_chars)
+    logger.info(
+        f"Retrieved {sum(len(ids) for ids, _ in ranked_lists)} hits for {len(queries)} queries, "
+        f"{len(fused)} unique, {len(context)} kept for the prompt"
+    )
+    return context
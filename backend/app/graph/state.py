@@ -1,12 +1,35 @@
 
 
 from typing import List, Optional, TypedDict, Annotated
+import hashlib
 import operator
 from langgraph.graph import add_messages
 from langchain_core.messages import AnyMessage
 from .schemas import *
 
 
+def _knowledge_digest(chunk: str) -> str:
+    # Whitespace differences (re-chunked or re-stripped text) don't make a chunk new
+    return hashlib.sha256(" ".join(chunk.split()).encode("utf-8")).hexdigest()
+
+
+def add_unique_knowledge(existing: list[str], new: list[str]) -> list[str]:
+    """
+    Append-only reducer for KnownKnowledge: a chunk is only added if no chunk with
+    the same content hash (ignoring whitespace) is already in the state, so
+    re-returning knowledge never grows the state. Order of first appearance is kept.
+    """
+    existing = existing or []
+    seen = {_knowledge_digest(chunk) for chunk in existing}
+    merged = list(existing)
+    for chunk in new or []:
+        digest = _knowledge_digest(chunk)
+        if digest not in seen:
+            seen.add(digest)
+            merged.append(chunk)
+    return merged
+
+
 
 class AgentState(TypedDict):
 
@@ -21,7 +44,12 @@ class AgentState(TypedDict):
     learning_checkpoints: Annotated[list[str], operator.add]
 
     #knowledge can used to explain after perform RAG 
-    KnownKnowledge: Annotated[list[str], operator.add]
+    KnownKnowledge: Annotated[list[str], add_unique_knowledge]
+
+    # rolling summary of the turns that are no longer sent verbatim to the model,
+    # and how many history_messages it already covers
+    conversation_summary: Optional[str]
+    summarized_message_count: int
 
     learning_complete: bool = False
     error: Optional[str]
@@ -29,5 +57,8 @@ class AgentState(TypedDict):
     # Feynman agent specific transient flags
     needs_more_context: bool
     context_focus: Optional[str]
+    # online research loop bookkeeping, reset at the start of every turn
+    research_iterations: int
+    research_started_at: float
 
     
\ No newline at end of file
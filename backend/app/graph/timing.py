@@ -0,0 +1,25 @@
+import time
+import logging
+import functools
+
+from langchain_core.runnables import RunnableConfig
+
+logger = logging.getLogger(__name__)
+
+
+def timed_node(node_fn):
+    """
+    Wraps an async graph node so every run logs its wall-clock duration with the
+    thread id, giving a per-node latency trace of each turn in the app log.
+    """
+    @functools.wraps(node_fn)
+    async def wrapper(state, config: RunnableConfig):
+        started = time.perf_counter()
+        try:
+            return await node_fn(state, config)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            thread_id = ((config or {}).get("configurable") or {}).get("thread_id")
+            logger.info(f"[timing] thread={thread_id} node={node_fn.__name__} took {elapsed_ms:.1f}ms")
+
+    return wrapper
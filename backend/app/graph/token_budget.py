@@ -0,0 +1,84 @@
+import re
+import logging
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Words, numbers and single punctuation marks, roughly how subword tokenizers split text
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_WORD_PATTERN = re.compile(r"[a-z0-9]{3,}")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap local token estimate, no tokenizer model needed.
+    Long words are split into several subword tokens, so every 4 characters of a
+    word count as one token; each punctuation mark is a token of its own.
+    """
+    if not text:
+        return 0
+    return sum((len(piece) + 3) // 4 for piece in _TOKEN_PATTERN.findall(text))
+
+
+def _words(text: str) -> set:
+    return set(_WORD_PATTERN.findall(text.lower()))
+
+
+def rank_by_overlap(chunks: List[str], reference: str) -> List[str]:
+    """
+    Orders chunks by how many words they share with the reference text (e.g. the
+    learning checkpoints). Stable, so ties keep their retrieval order.
+    """
+    reference_words = _words(reference)
+    if not reference_words:
+        return list(chunks)
+    return sorted(chunks, key=lambda chunk: len(_words(chunk) & reference_words), reverse=True)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cuts text down to roughly max_tokens, at a word boundary."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    cut = text[: max_tokens * 4]
+    while cut and estimate_tokens(cut) > max_tokens:
+        cut = cut[: int(len(cut) * 0.9)]
+    return cut.rsplit(" ", 1)[0] + " …"
+
+
+def fit_to_budget(chunks: List[str], budget: int, reference: str = "", min_partial_tokens: int = 50) -> List[str]:
+    """
+    Keeps the most relevant chunks that fit in `budget` tokens. Duplicates are
+    dropped; chunks that don't fit are skipped, and the most relevant of them is
+    truncated into the leftover budget if enough is left to make it useful.
+    """
+    seen = set()
+    unique = []
+    for chunk in chunks:
+        chunk = (chunk or "").strip()
+        if chunk and chunk not in seen:
+            seen.add(chunk)
+            unique.append(chunk)
+
+    kept = []
+    skipped = None
+    remaining = budget
+    for chunk in rank_by_overlap(unique, reference):
+        tokens = estimate_tokens(chunk)
+        if tokens <= remaining:
+            kept.append(chunk)
+            remaining -= tokens
+        elif skipped is None:
+            skipped = chunk
+
+    if skipped is not None and remaining >= min_partial_tokens:
+        kept.append(truncate_to_tokens(skipped, remaining))
+    return kept
+
+
+def log_token_accounting(prompt_name: str, prompt: str, sections: Dict[str, str]) -> None:
+    """Logs the estimated token count of every named section of a prompt; the rest counts as instructions."""
+    counts = {name: estimate_tokens(text) for name, text in sections.items()}
+    total = estimate_tokens(prompt)
+    counts["instructions"] = max(0, total - sum(counts.values()))
+    details = ", ".join(f"{name}={count}" for name, count in counts.items())
+    logger.info(f"[tokens] {prompt_name}: total={total} ({details})")
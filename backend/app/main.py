@@ -1,21 +1,32 @@
 # File: app/main.py
 
+import asyncio
 import logging
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 # --- LangGraph Imports ---
-from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
 from .graph.graph import get_graph
 from .graph.feynman_graph import get_graph as get_feynman_graph
+from .graph.configuration import Configuration
+from .graph.schemas import checkpoints, SearchQuery, LearningResponse
 
 # --- App Module Imports ---
 from app.core.log_config import setup_logging
+from app.core.llm_registry import llm_registry
 # CHANGE: Import the shared resources dictionary from the new dependencies file
 from .dependencies import shared_resources
-from .routers import lecture_transcript_router, google_login_router, logout_router, simpleChat_router, traditional_login_router,get_thread_history_router,get_thread_router, feynman__router
+from .routers import lecture_transcript_router, google_login_router, logout_router, simpleChat_router, traditional_login_router,get_thread_history_router,get_thread_router, feynman__router, checkpoint_router, embed_router
 from .database.session import create_tables
+from .database.checkpointer import open_checkpointer
+from .database.checkpoint_compaction import run_periodic_compaction, CHECKPOINT_COMPACTION_INTERVAL
+from .services.browser_pool import browser_pool
+from .services.caption_fetcher import caption_fetcher
+from .services.transcript_jobs import transcript_jobs
+from .services.knowledge_writer import knowledge_writer
+from .core.search_cache import search_cache
+from .core.chroma_db import chroma_manager
 
 # Run setup functions
 setup_logging()
@@ -32,21 +43,69 @@ async def lifespan(app: FastAPI):
     await create_tables()
     logger.info("Database tables verified.")
 
-    # 2. Set up the checkpointer's database connection
+    # 2. Warm up the shared LLM clients so the first turn doesn't pay for
+    #    client construction and structured-output schema conversion
+    defaults = Configuration()
+    llm_registry.warm_up([
+        (defaults.query_generator_model, 1.0, checkpoints),
+        (defaults.query_generator_model, 1.0, SearchQuery),
+        (defaults.query_generator_model, 1.0, LearningResponse),
+        (defaults.query_generator_model, 1.0, LearningResponse, True),
+        (defaults.query_generator_model, 0.0, None),
+        (defaults.reflection_model, 0.4, None),
+        (defaults.answer_model, 0.7, None),
+    ])
+
+    # 3. Start the shared headless browser used for transcript scraping.
+    #    If Chromium isn't available the pool starts lazily on first use instead.
+    try:
+        await browser_pool.start()
+    except Exception as e:
+        logger.warning(f"Browser pool could not be started at startup: {e}")
+
+    # 4. Start the write-behind queue that commits learned knowledge to Chroma;
+    #    writes left pending by the previous run are committed first
+    knowledge_writer.start()
+
+    # Drop search summaries that expired while the app was down
+    purged = await asyncio.to_thread(search_cache.purge_expired)
+    logger.info(f"Search cache: purged {purged} expired entries.")
+
+    # Build the embedding model now (providers are registered by then), so a
+    # missing ONNX model or API key fails at startup instead of on the first request
+    await asyncio.to_thread(lambda: chroma_manager.embedding_model)
+
+    # 5. Set up the checkpointer selected by CHECKPOINT_BACKEND (sqlite / postgres / redis)
     #    The 'async with' handles connection opening and closing
-    checkpointer = AsyncSqliteSaver.from_conn_string("checkpoints.sqlite")
-    async with checkpointer as db_checkpoint:
+    async with open_checkpointer() as db_checkpoint:
         
-        # 3. Build the graph once using the checkpointer
+        # 6. Build the graph once using the checkpointer
         #    and store it in the shared dictionary from the dependencies module
         shared_resources["graph"] = get_graph(db_checkpoint)
         shared_resources["feynman_graph"] = get_feynman_graph(db_checkpoint)
+        shared_resources["checkpointer"] = db_checkpoint
         logger.info("LangGraph agents (default and feynman) have been built and are ready.")
+
+        # 7. Optionally prune old checkpoints in the background
+        compaction_task = None
+        if CHECKPOINT_COMPACTION_INTERVAL > 0:
+            compaction_task = asyncio.create_task(run_periodic_compaction(db_checkpoint))
+            logger.info(f"Checkpoint compaction scheduled every {CHECKPOINT_COMPACTION_INTERVAL}s.")
         
         yield # The app is now running and accepting requests
 
+        if compaction_task:
+            compaction_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await compaction_task
+
     # --- Code here runs ONCE on shutdown ---
     logger.info("Application shutting down...")
+    llm_registry.clear()
+    await transcript_jobs.stop()
+    await knowledge_writer.stop()
+    await browser_pool.stop()
+    await caption_fetcher.close()
     # The 'async with' block ensures the checkpointer connection is closed gracefully
 
 # Create the FastAPI app instance with our lifespan manager
@@ -77,6 +136,8 @@ app.include_router(feynman__router.router)
 app.include_router(traditional_login_router.router)
 app.include_router(get_thread_history_router.router)
 app.include_router(get_thread_router.router)
+app.include_router(checkpoint_router.router)
+app.include_router(embed_router.router)
 
 
 # CHANGE: The dependency function has been moved to app/dependencies.py
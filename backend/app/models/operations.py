@@ -359,6 +359,24 @@ async def check_thread_exists(
     return await connection.fetchval(query, thread_id)
 
 
+async def get_thread_owner(
+    connection: asyncpg.Connection,
+    thread_id: str
+) -> Optional[int]:
+    """
+    Get the ID of the user who owns a thread.
+    
+    Args:
+        connection: AsyncPG database connection
+        thread_id: Thread ID to look up
+        
+    Returns:
+        The owner's user ID, or None if the thread doesn't exist
+    """
+    query = "SELECT user_id FROM threads WHERE thread_id = $1"
+    return await connection.fetchval(query, thread_id)
+
+
 # Example: Create user with initial thread using transaction
 async def create_user_with_initial_thread(
     connection: asyncpg.Connection,
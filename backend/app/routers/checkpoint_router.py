@@ -0,0 +1,68 @@
+# File: app/routers/checkpoint_router.py
+
+import logging
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Query
+import asyncpg
+
+from ..dependencies import get_checkpointer
+from .auth_dependencies import get_current_user
+from ..database.session import get_db_session
+from ..database.checkpoint_compaction import compact_checkpoints, CHECKPOINT_KEEP_LAST, CHECKPOINT_SNAPSHOT_EVERY
+from ..models.operations import get_thread_owner, get_user_threads
+
+logger = logging.getLogger(__name__)
+
+# Upper bound for keep_last / snapshot_every accepted from clients
+MAX_CHECKPOINTS_KEPT = 1000
+
+router = APIRouter(
+    prefix="/api/checkpoints",
+    tags=["thread"]
+)
+
+
+@router.post("/compact")
+async def compact_thread_checkpoints(
+    thread_id: Optional[str] = None,
+    keep_last: int = Query(CHECKPOINT_KEEP_LAST, ge=1, le=MAX_CHECKPOINTS_KEPT),
+    snapshot_every: int = Query(CHECKPOINT_SNAPSHOT_EVERY, ge=0, le=MAX_CHECKPOINTS_KEPT),
+    current_user: dict = Depends(get_current_user),
+    db_connection: asyncpg.Connection = Depends(get_db_session),
+    checkpointer = Depends(get_checkpointer),
+):
+    """
+    Prunes old checkpoints of one of the current user's threads, or of all of
+    them when no thread_id is given, and returns a size report. The freed
+    space is reclaimed by the periodic maintenance job, not by this request.
+    """
+    user_id = int(current_user['id'])
+
+    if thread_id:
+        owner_id = await get_thread_owner(db_connection, thread_id)
+        if owner_id != user_id:
+            raise HTTPException(status_code=404, detail="Thread not found")
+        thread_ids = [thread_id]
+    else:
+        thread_ids = [thread["thread_id"] for thread in await get_user_threads(db_connection, user_id)]
+
+    try:
+        reports = []
+        for tid in thread_ids:
+            reports.append(await compact_checkpoints(
+                checkpointer,
+                keep_last=keep_last,
+                snapshot_every=snapshot_every,
+                thread_id=tid,
+            ))
+    except Exception as e:
+        logger.error(f"Checkpoint compaction failed for user {user_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Checkpoint compaction failed: {e}")
+
+    return {
+        "threads": len(thread_ids),
+        "checkpoints_deleted": sum(r.get("checkpoints_deleted", 0) for r in reports),
+        "writes_deleted": sum(r.get("writes_deleted", 0) for r in reports),
+        "size_before_bytes": reports[0].get("size_before_bytes") if reports else None,
+        "size_after_bytes": reports[-1].get("size_after_bytes") if reports else None,
+    }
@@ -1,8 +1,13 @@
 # In your router file (e.g., app/api/routers/embed.py)
 from fastapi import FastAPI, HTTPException, Depends, APIRouter, Body
+from fastapi.responses import StreamingResponse
 from ..core.chroma_db import chroma_manager
+from ..services.embedding_pipeline import embed_chunks_in_batches, EMBED_BATCH_SIZE, EMBED_MAX_CONCURRENCY
+from ..services.transcript_ingestion import ingest_transcript
+from ..services.knowledge_writer import knowledge_writer
 from .auth_dependencies import get_current_user
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+import json
 import logging
 import asyncio
 
@@ -18,14 +23,18 @@ async def embed_known_knowledge(
     topic: str,
     chunk_size: int = 1000, # ✅ Optional: Define the size of each text chunk
     chunk_overlap: int = 200,  # ✅ Optional: Define the overlap between chunks
+    batch_size: int = EMBED_BATCH_SIZE,  # ✅ Optional: Chunks per embedding request
+    max_concurrency: int = EMBED_MAX_CONCURRENCY,  # ✅ Optional: Embedding requests in flight
+    stream_progress: bool = False,  # ✅ Optional: Report progress over SSE instead of one JSON reply
     content: str = Body(..., media_type="text/plain"),
     current_user: dict = Depends(get_current_user)
 ):
     """
-    Receives raw text, splits it into chunks, embeds each chunk, and
-    stores them in the user's personal knowledge collection in ChromaDB.
+    Receives raw text, splits it into chunks, embeds the chunks in bounded
+    concurrent batches, and stores each batch in the user's personal knowledge
+    collection in ChromaDB as soon as it is ready.
     """
-    user_id = current_user.get("user_id")
+    user_id = current_user.get("id")
     if not user_id:
         raise HTTPException(status_code=403, detail="User ID not found in token.")
 
@@ -46,31 +55,99 @@ async def embed_known_knowledge(
             raise HTTPException(status_code=400, detail="Content could not be split into chunks.")
 
         # Get the user-specific collection
-        collection_name = f"user_{user_id}_knowledge"
-        collection = chroma_manager.get_collection(name=collection_name)
-
-        # Create embeddings for all chunks at once
-        embeddings = await asyncio.to_thread(
-            chroma_manager.embedding_model.embed_documents, chunks
-        )
+        collection = chroma_manager.get_knowledge_collection(user_id)
 
         # --- MODIFIED: Prepare data for multiple chunks ---
         # Create a unique ID for each chunk (e.g., "my-topic-0", "my-topic-1")
         ids = [f"{topic}-{i}" for i in range(len(chunks))]
         metadatas = [{"topic": topic, "chunk_index": i} for i in range(len(chunks))]
 
-        # Add all chunks, embeddings, and metadatas to the collection
-        await asyncio.to_thread(
-            collection.add,
-            embeddings=embeddings,
-            documents=chunks,
-            ids=ids,
-            metadatas=metadatas
+        pipeline = embed_chunks_in_batches(
+            collection, chunks, ids, metadatas,
+            batch_size=batch_size,
+            max_concurrency=max_concurrency,
         )
 
+        if stream_progress:
+            async def stream_embedding_progress():
+                try:
+                    async for progress in pipeline:
+                        yield f"data: {json.dumps(progress)}\n\n"
+                    logger.info(f"Successfully stored {len(chunks)} chunks for user {user_id} on topic: {topic}")
+                    yield f"data: {json.dumps({'done': True, 'total': len(chunks)})}\n\n"
+                except Exception as e:
+                    logger.error(f"Failed to store knowledge for user {user_id}, topic '{topic}': {str(e)}")
+                    yield f"data: {json.dumps({'error': 'Failed to embed knowledge'})}\n\n"
+
+            return StreamingResponse(stream_embedding_progress(), media_type="text/event-stream")
+
+        async for _ in pipeline:
+            pass
+
         logger.info(f"Successfully stored {len(chunks)} chunks for user {user_id} on topic: {topic}")
         return {"message": f"Knowledge on topic '{topic}' embedded successfully in {len(chunks)} chunks."}
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to store knowledge for user {user_id}, topic '{topic}': {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to embed knowledge: {str(e)}")
+
+
+@router.post("/transcripts/{transcript_id}")
+async def ingest_lecture_transcript(
+    transcript_id: str,
+    batch_size: int = EMBED_BATCH_SIZE,
+    max_concurrency: int = EMBED_MAX_CONCURRENCY,
+    stream_progress: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Ingests an already imported lecture transcript (see /api/transcript) into
+    the user's knowledge collection. Safe to repeat: chunks the user already
+    has are skipped.
+    """
+    user_id = int(current_user["id"])
+    pipeline = ingest_transcript(user_id, transcript_id, batch_size=batch_size, max_concurrency=max_concurrency)
+
+    if stream_progress:
+        async def stream_ingestion_progress():
+            try:
+                async for progress in pipeline:
+                    yield f"data: {json.dumps(progress)}\n\n"
+                yield f"data: {json.dumps({'done': True})}\n\n"
+            except Exception as e:
+                logger.error(f"Failed to ingest transcript {transcript_id} for user {user_id}: {str(e)}")
+                yield f"data: {json.dumps({'error': 'Failed to ingest transcript'})}\n\n"
+
+        return StreamingResponse(stream_ingestion_progress(), media_type="text/event-stream")
+
+    try:
+        progress = {}
+        async for progress in pipeline:
+            pass
+        return {"message": f"Transcript {transcript_id} ingested.", **progress}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to ingest transcript {transcript_id} for user {user_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to ingest transcript: {str(e)}")
+
+
+@router.get("/write-queue")
+async def get_write_queue_stats(current_user: dict = Depends(get_current_user)):
+    """Queue depth and commit lag of the knowledge write-behind queue."""
+    return await asyncio.to_thread(lambda: knowledge_writer.stats)
+
+
+@router.get("/chroma-stats")
+async def get_chroma_stats(current_user: dict = Depends(get_current_user)):
+    """
+    Hit rates of the Chroma collection handle cache and the embedding cache, and
+    the embedding provider's batching stats (null for providers without any).
+    """
+    return {
+        "collection_cache": chroma_manager.collection_cache_stats,
+        "embedding_cache": await asyncio.to_thread(lambda: chroma_manager.embedding_cache_stats),
+        "embedding_provider": await asyncio.to_thread(lambda: chroma_manager.embedding_provider_stats),
+    }
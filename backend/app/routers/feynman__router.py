@@ -5,6 +5,7 @@ from langchain_core.messages import HumanMessage, AIMessage
 
 from ..dependencies import get_feynman_graph
 from .auth_dependencies import *
+from .sse import format_delta_event
 
 
 logger = logging.getLogger(__name__)
@@ -36,10 +37,21 @@ async def chat_with_feynman_agent(
 
             logger.info(f"Starting Feynman graph stream for thread: {thread_id}, user: {current_user['id']}")
 
-            async for event in graph.astream_events(input_payload, config, version="v1"):
+            # Set once the feedback has been streamed token by token,
+            # so it isn't sent a second time when evaluate_user_explanation ends
+            streamed_feedback = False
+
+            async for event in graph.astream_events(input_payload, config, version="v2"):
                 kind = event["event"]
 
-                if kind == "on_chain_end":
+                # Partial feedback streamed from evaluate_user_explanation
+                if kind == "on_custom_event" and event["name"] == "feedback_delta":
+                    delta = (event.get("data") or {}).get("text", "")
+                    if delta:
+                        streamed_feedback = True
+                        yield format_delta_event(delta)
+
+                elif kind == "on_chain_end":
                     node_name = event["name"]
                     node_data = (event.get("data") or {}).get("output") or {}
 
@@ -64,7 +76,10 @@ async def chat_with_feynman_agent(
 
                     elif node_name == "evaluate_user_explanation":
                         messages = node_data.get("history_messages") or []
-                        if messages:
+                        if streamed_feedback:
+                            # The feedback is already on the client, just end it with a line break
+                            yield format_delta_event("\n")
+                        elif messages:
                             latest_message = messages[-1]
                             if isinstance(latest_message, AIMessage):
                                 response_text = latest_message.content or ""
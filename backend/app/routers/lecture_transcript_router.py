@@ -1,13 +1,19 @@
 # File: app/routers/lecture_transcript_router.py
 
 import logging
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
-from ..services.lecture_transcript import *
+from ..services.transcript_jobs import transcript_jobs
+from ..services.transcript_ingestion import schedule_ingestion
+from .auth_dependencies import get_current_user
 
 # Request model for JSON body
 class LectureRequest(BaseModel):
     lecture_url: str
+    # False returns the job right away; poll /api/transcript/jobs/{job_id} for its status
+    wait: bool = True
+    # Add the transcript to the user's knowledge base once it is scraped
+    ingest: bool = True
 
 router = APIRouter(
     prefix="/api",
@@ -16,34 +22,57 @@ router = APIRouter(
 
 
 @router.post("/transcript")
-async def get_transcript_from_url(request: LectureRequest):
+async def get_transcript_from_url(
+    request: LectureRequest,
+    current_user: dict = Depends(get_current_user)
+):
     """
-    This endpoint receives a lecture URL, calls the service to scrape
-    the transcript, and returns success status with filename (no transcript text).
+    This endpoint receives a lecture URL and hands it to the transcript job
+    queue. Lectures that were already scraped are answered from the transcript
+    store, and concurrent requests for the same lecture share one scrape.
+    The transcript is then ingested into the user's knowledge base in the
+    background. Returns success status with filename (no transcript text).
     """
     lecture_url = request.lecture_url
     logging.info("Router received request for URL: %s", lecture_url)
-    
-    
-    try:
-        transcript_text = handle_transcript_request(lecture_url)
 
-        if not transcript_text:
-            # Failed to get transcript
-            return {
-                "success": False
-            }
 
-        # Successfully got transcript, generate filename
-        lecture_filename = handle_lecture_name(lecture_url)
-        
+    try:
+        user_id = int(current_user['id'])
+        job = await transcript_jobs.submit(lecture_url, user_id)
+        if request.ingest:
+            schedule_ingestion(user_id, job)
+        if request.wait:
+            job = await transcript_jobs.wait(job)
+
         return {
-            "success": True,
-            "filename": lecture_filename
+            "success": job.status != "failed",
+            **job.to_dict()
         }
 
     except Exception as e:
         logging.error("Unhandled exception in router for URL %s", lecture_url, exc_info=True)
         return {
             "success": False
-        }
\ No newline at end of file
+        }
+
+
+@router.get("/transcript/jobs/{job_id}")
+async def get_transcript_job(
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Returns the status of one of the current user's transcript jobs (queued, running, done or failed)."""
+    job = transcript_jobs.get_job(job_id, int(current_user['id']))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Transcript job not found")
+    return job.to_dict()
+
+
+@router.get("/transcript/stats")
+async def get_transcript_stats(current_user: dict = Depends(get_current_user)):
+    """
+    Counters of this worker's transcript job queue: store hits, requests that
+    joined an in-flight scrape, scrapes, failures and the current queue depth.
+    """
+    return transcript_jobs.stats
@@ -7,6 +7,7 @@ from langchain_core.messages import HumanMessage, AIMessage
 
 from ..dependencies import get_app_graph
 from .auth_dependencies import *
+from .sse import format_delta_event
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api")
@@ -37,13 +38,24 @@ async def chat_with_agent(
 
             logger.info(f"Starting graph stream for thread: {thread_id}, user: {current_user['id']}")
             
-            # Use graph.astream_events for more granular control
-            async for event in graph.astream_events(input_payload, config, version="v1"):
+            # Set once the tutor reply has been streamed token by token,
+            # so it isn't sent a second time when central_response_node ends
+            streamed_response = False
+
+            # Use graph.astream_events for more granular control (v2 is needed for custom events)
+            async for event in graph.astream_events(input_payload, config, version="v2"):
                 kind = event["event"]
-                
+
+                # Partial tutor reply streamed from central_response_node
+                if kind == "on_custom_event" and event["name"] == "response_text_delta":
+                    delta = (event.get("data") or {}).get("text", "")
+                    if delta:
+                        streamed_response = True
+                        yield format_delta_event(delta)
+
                 # Focus only on events where nodes finish running
-                if kind == "on_chain_end":
-                    node_name = event["name"]  # In v1, the node name is in the 'name' field
+                elif kind == "on_chain_end":
+                    node_name = event["name"]  # The node name is in the 'name' field
                     node_data = (event.get("data") or {}).get("output") or {}
 
                     # Skip if there's no output data
@@ -63,6 +75,9 @@ async def chat_with_agent(
                         error = node_data.get("error")
                         if error:
                             yield f"data: ❌ **Error:** {error}\n\n"
+                        elif streamed_response:
+                            # The reply is already on the client, just end it with a line break
+                            yield format_delta_event("\n")
                         else:
                             messages = node_data.get("history_messages") or []
                             if messages:
@@ -0,0 +1,11 @@
+# File: app/routers/sse.py
+
+import json
+
+# Prefix of SSE lines carrying a JSON-encoded piece of a reply that is still being generated
+DELTA_PREFIX = "__DELTA__"
+
+
+def format_delta_event(text: str) -> str:
+    """Encodes a partial reply as one SSE line; JSON keeps newlines inside the delta intact."""
+    return f"data: {DELTA_PREFIX}{json.dumps({'text': text})}\n\n"
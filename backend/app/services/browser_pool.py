@@ -0,0 +1,116 @@
+# File: app/services/browser_pool.py
+
+import os
+import json
+import asyncio
+import logging
+from pathlib import Path
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+from playwright.async_api import async_playwright, Browser, BrowserContext, Playwright
+
+logger = logging.getLogger(__name__)
+
+BROWSER_MAX_PAGES = int(os.getenv("BROWSER_MAX_PAGES", "3"))
+# Holds the browser's login cookies; keep it out of the repo and readable only by the app
+BROWSER_DATA_DIR = Path(os.getenv("BROWSER_DATA_DIR", "./browser_data"))
+BROWSER_STORAGE_STATE_PATH = Path(os.getenv("BROWSER_STORAGE_STATE_PATH", str(BROWSER_DATA_DIR / "storage_state.json")))
+
+
+class BrowserPool:
+    """
+    One long-lived headless Chromium shared by all transcript requests.
+
+    Pages are opened in a single browser context whose cookies/local storage are
+    persisted to BROWSER_STORAGE_STATE_PATH after a login, so later requests (and
+    later processes) start already authenticated. At most BROWSER_MAX_PAGES pages
+    are open at once; further requests wait for a free slot.
+    """
+
+    def __init__(self, max_pages: int = BROWSER_MAX_PAGES, storage_state_path: Path = BROWSER_STORAGE_STATE_PATH):
+        self._max_pages = max_pages
+        self._storage_state_path = storage_state_path
+        self._playwright: Optional[Playwright] = None
+        self._browser: Optional[Browser] = None
+        self._context: Optional[BrowserContext] = None
+        self._semaphore = asyncio.Semaphore(max_pages)
+        self._start_lock = asyncio.Lock()
+
+    @property
+    def started(self) -> bool:
+        return self._context is not None
+
+    async def start(self):
+        async with self._start_lock:
+            if self.started:
+                return
+            self._playwright = await async_playwright().start()
+            try:
+                self._browser = await self._playwright.chromium.launch(headless=True)
+                self._context = await self._new_context()
+            except Exception:
+                # Don't leave a half-started driver behind; the next call retries
+                if self._browser:
+                    await self._browser.close()
+                await self._playwright.stop()
+                self._browser = self._playwright = None
+                raise
+            logger.info(f"Browser pool started with up to {self._max_pages} concurrent pages.")
+
+    async def _new_context(self) -> BrowserContext:
+        storage_state = str(self._storage_state_path) if self._storage_state_path.exists() else None
+        if storage_state:
+            logger.info("Restoring browser session from %s", storage_state)
+        return await self._browser.new_context(storage_state=storage_state)
+
+    @asynccontextmanager
+    async def page(self):
+        """Yields a fresh page in the shared context, closing it afterwards."""
+        if not self.started:
+            await self.start()
+        async with self._semaphore:
+            page = await self._context.new_page()
+            try:
+                yield page
+            finally:
+                await page.close()
+
+    async def cookies(self, url: str) -> Dict[str, str]:
+        """Returns the session cookies the browser would send to `url`, as name -> value."""
+        if not self.started:
+            await self.start()
+        return {cookie["name"]: cookie["value"] for cookie in await self._context.cookies(url)}
+
+    def _write_storage_state(self, state: dict):
+        # Written to a 0600 temp file and renamed, so the cookies are never
+        # readable by other users, not even for a moment
+        path = self._storage_state_path
+        path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(state, f)
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, path)
+
+    async def save_storage_state(self):
+        """Persists the session (e.g. after a login) so later contexts start authenticated."""
+        state = await self._context.storage_state()
+        await asyncio.to_thread(self._write_storage_state, state)
+        logger.info("Browser session saved to %s", self._storage_state_path)
+
+    async def stop(self):
+        async with self._start_lock:
+            if self._context:
+                await self._context.close()
+            if self._browser:
+                await self._browser.close()
+            if self._playwright:
+                await self._playwright.stop()
+            self._context = self._browser = self._playwright = None
+            logger.info("Browser pool stopped.")
+
+
+# Singleton instance
+browser_pool = BrowserPool()
@@ -0,0 +1,129 @@
+# File: app/services/caption_fetcher.py
+
+import os
+import logging
+from typing import Dict, List, Optional
+
+import httpx
+
+from .webvtt import WebVTTParser
+
+logger = logging.getLogger(__name__)
+
+CAPTION_HTTP_TIMEOUT = float(os.getenv("CAPTION_HTTP_TIMEOUT", "30"))
+CAPTION_HTTP_MAX_CONNECTIONS = int(os.getenv("CAPTION_HTTP_MAX_CONNECTIONS", "10"))
+# Content types a caption file may be served with (parameters like charset are
+# ignored), and the body formats each of them may carry
+CAPTION_CONTENT_TYPES = {
+    "text/vtt": ("webvtt",),
+    "application/x-subrip": ("srt",),
+    "text/plain": ("webvtt", "srt", "text"),
+}
+
+
+class CaptionFetchError(Exception):
+    """The caption URL answered with something that is not a caption file (e.g. a login page)."""
+
+
+class CaptionFetcher:
+    """
+    Downloads caption files over plain HTTP instead of rendering them in a browser.
+
+    One pooled httpx.AsyncClient is shared by all requests so connections (and
+    TLS sessions) to the caption host are reused. Authentication comes from the
+    browser session: the caller passes the cookies the browser pool holds for
+    the caption URL. The response is parsed line by line as it streams in.
+
+    An expired session is typically answered with a redirect to a login page
+    and a 200, so a response is only accepted if it still comes from the
+    requested URL, has a caption content type and its body matches it: a
+    WEBVTT header, an SRT cue (number, then a "-->" timing line) or, for
+    text/plain, plain text. Markup is never accepted.
+    """
+
+    def __init__(self, timeout: float = CAPTION_HTTP_TIMEOUT, max_connections: int = CAPTION_HTTP_MAX_CONNECTIONS):
+        self._timeout = timeout
+        self._limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self._timeout, limits=self._limits, follow_redirects=True)
+        return self._client
+
+    @staticmethod
+    def _check_response(url: str, response: httpx.Response) -> str:
+        """Checks where the response came from and its content type, which is returned."""
+        requested = httpx.URL(url)
+        if (response.url.host, response.url.path) != (requested.host, requested.path):
+            raise CaptionFetchError(f"Caption request for {url} was redirected to {response.url}")
+        content_type = response.headers.get("content-type", "").split(";", 1)[0].strip().lower()
+        if content_type not in CAPTION_CONTENT_TYPES:
+            raise CaptionFetchError(f"Caption response from {url} has content type '{content_type}'")
+        return content_type
+
+    @staticmethod
+    def _body_format(head: List[str]) -> str:
+        """Tells the body format from its first two non-blank lines: webvtt, srt, markup or text."""
+        lines = [line.lstrip("\ufeff").strip() for line in head if line.strip()]
+        first = lines[0] if lines else ""
+        if first.startswith("WEBVTT"):
+            return "webvtt"
+        if first.isdigit() and len(lines) > 1 and "-->" in lines[1]:
+            return "srt"
+        if first.startswith("<"):
+            return "markup"
+        return "text"
+
+    def _check_body(self, url: str, content_type: str, head: List[str]):
+        body_format = self._body_format(head)
+        if body_format not in CAPTION_CONTENT_TYPES[content_type]:
+            raise CaptionFetchError(f"Response from {url} is not a caption file ({body_format} served as {content_type})")
+
+    async def fetch_text(self, url: str, cookies: Optional[Dict[str, str]] = None) -> Optional[str]:
+        """
+        Streams the caption file (WebVTT, SRT or plain text) at `url` through
+        the WebVTT parser and returns its clean text, or None if the file is
+        missing or empty. Raises CaptionFetchError if the response is not a
+        caption file.
+        """
+        headers = {}
+        if cookies:
+            headers["Cookie"] = "; ".join(f"{name}={value}" for name, value in cookies.items())
+
+        parser = WebVTTParser()
+        text_lines = []
+        async with self._get_client().stream("GET", url, headers=headers) as response:
+            if response.status_code != 200:
+                logger.warning(f"Caption download from {url} failed with HTTP {response.status_code}")
+                return None
+            content_type = self._check_response(url, response)
+
+            # The first two non-blank lines tell the format; they are parsed once it is checked
+            head: Optional[List[str]] = []
+            async for line in response.aiter_lines():
+                if head is None:
+                    text_lines.extend(parser.feed_line(line))
+                    continue
+                head.append(line)
+                if sum(1 for buffered in head if buffered.strip()) == 2:
+                    self._check_body(url, content_type, head)
+                    for buffered in head:
+                        text_lines.extend(parser.feed_line(buffered))
+                    head = None
+            if head is not None:
+                self._check_body(url, content_type, head)
+                for buffered in head:
+                    text_lines.extend(parser.feed_line(buffered))
+        text_lines.extend(parser.close())
+
+        return "\n".join(text_lines) or None
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Singleton instance
+caption_fetcher = CaptionFetcher()
@@ -0,0 +1,91 @@
+# File: app/services/embedding_pipeline.py
+
+import os
+import time
+import asyncio
+import logging
+from typing import AsyncIterator, List, Sequence
+
+from ..core.chroma_db import chroma_manager
+
+logger = logging.getLogger(__name__)
+
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+EMBED_MAX_CONCURRENCY = int(os.getenv("EMBED_MAX_CONCURRENCY", "4"))
+
+
+async def _embed_and_store_batch(collection, documents: List[str], ids: List[str], metadatas: List[dict], embedding_model, extra_collections: Sequence = ()) -> int:
+    """Embeds one batch and writes it to the collection(s). Returns the number of chunks stored."""
+    embeddings = await asyncio.to_thread(embedding_model.embed_documents, documents)
+    for target in (collection, *extra_collections):
+        await asyncio.to_thread(
+            target.add,
+            embeddings=embeddings,
+            documents=documents,
+            ids=ids,
+            metadatas=metadatas,
+        )
+    return len(documents)
+
+
+async def embed_chunks_in_batches(
+    collection,
+    chunks: List[str],
+    ids: List[str],
+    metadatas: List[dict],
+    batch_size: int = EMBED_BATCH_SIZE,
+    max_concurrency: int = EMBED_MAX_CONCURRENCY,
+    embedding_model=None,
+    extra_collections: Sequence = (),
+) -> AsyncIterator[dict]:
+    """
+    Embeds chunks in bounded batches and stores each batch as soon as it is ready.
+
+    At most `max_concurrency` batches are in flight; the next batch is only
+    scheduled when one finishes, so a lecture-length upload never turns into
+    one huge request. Yields a progress dict after every stored batch.
+    If a batch fails, the remaining in-flight batches are cancelled and the
+    error is raised; batches already stored stay in the collection.
+    Every batch is also written to `extra_collections`, with the same embeddings.
+    """
+    embedding_model = embedding_model or chroma_manager.embedding_model
+    batch_size = max(1, batch_size)
+    max_concurrency = max(1, max_concurrency)
+
+    total = len(chunks)
+    batches = (
+        (chunks[i:i + batch_size], ids[i:i + batch_size], metadatas[i:i + batch_size])
+        for i in range(0, total, batch_size)
+    )
+
+    started = time.perf_counter()
+    embedded = 0
+    pending = set()
+    try:
+        while True:
+            # Keep the pipeline full, but never more than max_concurrency batches deep
+            while len(pending) < max_concurrency:
+                batch = next(batches, None)
+                if batch is None:
+                    break
+                pending.add(asyncio.create_task(
+                    _embed_and_store_batch(collection, *batch, embedding_model=embedding_model, extra_collections=extra_collections)
+                ))
+
+            if not pending:
+                break
+
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                embedded += task.result()
+                elapsed = time.perf_counter() - started
+                yield {
+                    "embedded": embedded,
+                    "total": total,
+                    "chunks_per_sec": round(embedded / elapsed, 2) if elapsed > 0 else None,
+                }
+    finally:
+        for task in pending:
+            task.cancel()
+
+    logger.info(f"Embedded {embedded} chunks in {time.perf_counter() - started:.2f}s")
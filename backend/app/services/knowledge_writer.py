@@ -0,0 +1,340 @@
+# File: app/services/knowledge_writer.py
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+import sqlite3
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ..core.chroma_db import chroma_manager
+
+logger = logging.getLogger(__name__)
+
+KNOWLEDGE_QUEUE_PATH = Path(os.getenv("KNOWLEDGE_QUEUE_PATH", "./chroma_db/knowledge_queue.sqlite"))
+# Documents embedded together in one request, across users
+KNOWLEDGE_BATCH_SIZE = int(os.getenv("KNOWLEDGE_BATCH_SIZE", "32"))
+# How long the writer waits for more writes before committing a partial batch
+KNOWLEDGE_FLUSH_INTERVAL = float(os.getenv("KNOWLEDGE_FLUSH_INTERVAL", "0.5"))
+# Writes that failed this often are set aside (and logged) until the next restart
+KNOWLEDGE_MAX_ATTEMPTS = int(os.getenv("KNOWLEDGE_MAX_ATTEMPTS", "5"))
+# A claimed batch not finished within this many seconds (e.g. its process died) is taken over by another writer
+KNOWLEDGE_CLAIM_TIMEOUT = float(os.getenv("KNOWLEDGE_CLAIM_TIMEOUT", "120"))
+# How often an idle writer looks for writes enqueued by other processes or released by expired claims
+KNOWLEDGE_POLL_INTERVAL = float(os.getenv("KNOWLEDGE_POLL_INTERVAL", "30"))
+
+
+class KnowledgeWriteQueue:
+    """
+    Write-behind queue for documents going into users' knowledge collections.
+
+    Graph nodes only append a row to a local SQLite file, which takes
+    milliseconds, instead of waiting for an embedding request and a Chroma
+    write before the turn can end. A background writer claims up to
+    KNOWLEDGE_BATCH_SIZE pending rows (from any users), embeds them in one
+    request, upserts them user by user and only then deletes each user's rows,
+    so writes pending at shutdown or a crash are committed after the restart.
+
+    One user's failing write only retries that user's rows. Several writers
+    (uvicorn workers sharing the file) never commit the same rows: a batch is
+    claimed in one transaction, and a claim left by a dead process expires
+    after KNOWLEDGE_CLAIM_TIMEOUT.
+    """
+
+    def __init__(
+        self,
+        db_path: Path = KNOWLEDGE_QUEUE_PATH,
+        batch_size: int = KNOWLEDGE_BATCH_SIZE,
+        flush_interval: float = KNOWLEDGE_FLUSH_INTERVAL,
+        max_attempts: int = KNOWLEDGE_MAX_ATTEMPTS,
+        claim_timeout: float = KNOWLEDGE_CLAIM_TIMEOUT,
+        poll_interval: float = KNOWLEDGE_POLL_INTERVAL,
+    ):
+        self._batch_size = max(1, batch_size)
+        self._flush_interval = flush_interval
+        self._max_attempts = max_attempts
+        self._claim_timeout = claim_timeout
+        self._poll_interval = poll_interval
+        self._owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._flushing: Optional[asyncio.Future] = None
+        self._stats = {"enqueued": 0, "committed": 0, "failed_batches": 0, "last_commit_lag": 0.0, "max_commit_lag": 0.0}
+
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit mode: transactions are opened explicitly where several statements must be atomic
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30, isolation_level=None)
+        # WAL lets other processes enqueue while a writer holds its claim transaction
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pending_writes ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL, doc_id TEXT NOT NULL, "
+            "document TEXT NOT NULL, metadata TEXT NOT NULL, enqueued_at REAL NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, claimed_by TEXT, claimed_until REAL)"
+        )
+        # Queue files written before claims existed
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(pending_writes)")}
+        for column, column_type in (("claimed_by", "TEXT"), ("claimed_until", "REAL")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE pending_writes ADD COLUMN {column} {column_type}")
+
+    def enqueue(self, user_id: int, doc_id: str, document: str, metadata: Dict[str, Any]):
+        """
+        Durably records one document to add to the user's knowledge. Returns
+        once it is on disk. An older write of the same document that no writer
+        is committing right now is replaced.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "DELETE FROM pending_writes WHERE user_id = ? AND doc_id = ? "
+                    "AND (claimed_by IS NULL OR claimed_until < ?)",
+                    (user_id, doc_id, time.time()),
+                )
+                self._conn.execute(
+                    "INSERT INTO pending_writes (user_id, doc_id, document, metadata, enqueued_at) VALUES (?, ?, ?, ?, ?)",
+                    (user_id, doc_id, document, json.dumps(metadata), time.time()),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        self._stats["enqueued"] += 1
+        # Called from worker threads (asyncio.to_thread); asyncio.Event is not thread-safe
+        if self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                pass  # loop already closed; the row is committed after the restart
+
+    def _take_batch(self) -> List[tuple]:
+        """Claims up to batch_size unclaimed (or expired) rows for this writer."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT id, user_id, doc_id, document, metadata, enqueued_at FROM pending_writes "
+                    "WHERE attempts < ? AND (claimed_until IS NULL OR claimed_until < ?) ORDER BY id LIMIT ?",
+                    (self._max_attempts, now, self._batch_size),
+                ).fetchall()
+                if rows:
+                    row_ids = [row[0] for row in rows]
+                    self._conn.execute(
+                        f"UPDATE pending_writes SET claimed_by = ?, claimed_until = ? "
+                        f"WHERE id IN ({','.join('?' * len(row_ids))})",
+                        (self._owner, now + self._claim_timeout, *row_ids),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return rows
+
+    def _finish_rows(self, rows: List[tuple], failed: bool):
+        """
+        Deletes committed rows. Failed rows are released with one more attempt
+        counted and are not claimed again before a backoff of 2^attempts
+        seconds (at most a minute), unless a newer write of the same document
+        has been enqueued meanwhile, which replaces them.
+        """
+        row_ids = [row[0] for row in rows]
+        placeholders = ",".join("?" * len(row_ids))
+        with self._lock:
+            if failed:
+                self._conn.execute(
+                    f"DELETE FROM pending_writes WHERE id IN ({placeholders}) AND EXISTS ("
+                    f"SELECT 1 FROM pending_writes newer WHERE newer.user_id = pending_writes.user_id "
+                    f"AND newer.doc_id = pending_writes.doc_id AND newer.id > pending_writes.id)",
+                    row_ids,
+                )
+                self._conn.execute(
+                    f"UPDATE pending_writes SET attempts = attempts + 1, claimed_by = NULL, "
+                    f"claimed_until = ? + MIN(60, 1 << attempts) WHERE id IN ({placeholders}) AND claimed_by = ?",
+                    (time.time(), *row_ids, self._owner),
+                )
+                given_up = self._conn.execute(
+                    f"SELECT user_id, doc_id FROM pending_writes WHERE id IN ({placeholders}) AND attempts >= ?",
+                    (*row_ids, self._max_attempts),
+                ).fetchall()
+            else:
+                self._conn.execute(f"DELETE FROM pending_writes WHERE id IN ({placeholders})", row_ids)
+                given_up = []
+        for user_id, doc_id in given_up:
+            logger.error(
+                f"Giving up on knowledge write '{doc_id}' of user {user_id} after {self._max_attempts} attempts; "
+                f"it stays in the queue file and is retried after the next restart"
+            )
+
+    def _commit_batch(self, rows: List[tuple]) -> int:
+        """
+        Embeds the whole batch in one request, then upserts each user's
+        documents separately. Returns how many rows were committed; rows of
+        users whose write failed are released for a retry.
+        """
+        # The newest pending write of a document wins; older ones are committed with it
+        latest = {}
+        for row in rows:
+            latest[(row[1], row[2])] = row
+        unique_rows = list(latest.values())
+
+        try:
+            embeddings = chroma_manager.embedding_model.embed_documents([row[3] for row in unique_rows])
+        except Exception:
+            self._finish_rows(rows, failed=True)
+            raise
+
+        by_user = defaultdict(list)
+        for row, embedding in zip(unique_rows, embeddings):
+            by_user[row[1]].append((row, embedding))
+        rows_by_user = defaultdict(list)
+        for row in rows:
+            rows_by_user[row[1]].append(row)
+
+        committed, errors = 0, []
+        for user_id, items in by_user.items():
+            try:
+                collection = chroma_manager.get_knowledge_collection(user_id)
+                # upsert: a retry after a partly committed batch must not fail on existing ids
+                collection.upsert(
+                    ids=[row[2] for row, _ in items],
+                    documents=[row[3] for row, _ in items],
+                    metadatas=[json.loads(row[4]) for row, _ in items],
+                    embeddings=[embedding for _, embedding in items],
+                )
+            except Exception as e:
+                logger.error(f"Knowledge write of {len(items)} documents for user {user_id} failed, will retry: {e}")
+                self._finish_rows(rows_by_user[user_id], failed=True)
+                errors.append(e)
+                continue
+            self._finish_rows(rows_by_user[user_id], failed=False)
+            committed += len(rows_by_user[user_id])
+
+        if errors and not committed:
+            raise errors[0]
+        if errors:
+            self._stats["failed_batches"] += 1
+        return committed
+
+    async def _flush_once(self) -> int:
+        """Commits one batch. Returns how many writes it claimed."""
+        rows = await asyncio.to_thread(self._take_batch)
+        if not rows:
+            return 0
+        try:
+            committed = await asyncio.to_thread(self._commit_batch, rows)
+        except Exception as e:
+            self._stats["failed_batches"] += 1
+            logger.error(f"Knowledge write batch of {len(rows)} failed, will retry: {e}")
+            raise
+
+        if committed:
+            lag = time.time() - min(row[5] for row in rows)
+            self._stats["committed"] += committed
+            self._stats["last_commit_lag"] = round(lag, 3)
+            self._stats["max_commit_lag"] = round(max(self._stats["max_commit_lag"], lag), 3)
+            logger.info(f"Committed {committed} knowledge writes (lag {lag:.2f}s)")
+        return len(rows)
+
+    async def _run(self):
+        backoff = 1.0
+        while True:
+            # The flush runs in its own task so stop() can let it finish instead of cancelling it mid-commit
+            self._flushing = asyncio.ensure_future(self._flush_once())
+            try:
+                claimed = await asyncio.shield(self._flushing)
+                backoff = 1.0
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 60.0)
+                continue
+            finally:
+                if self._flushing.done():
+                    self._flushing = None
+
+            if claimed < self._batch_size:
+                # Queue drained: sleep until new writes arrive (or, for writes of
+                # other processes, until the next poll), then give concurrent
+                # turns a moment to add theirs to the same batch
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self._poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                await asyncio.sleep(self._flush_interval)
+
+    def start(self):
+        if self._worker is not None:
+            return
+        with self._lock:
+            # Writes set aside in the last run get another round of attempts
+            retried = self._conn.execute(
+                "UPDATE pending_writes SET attempts = 0 WHERE attempts >= ?", (self._max_attempts,)
+            ).rowcount
+        if retried:
+            logger.warning(f"Retrying {retried} knowledge writes that failed in the last run.")
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        # Writes left over from the last run are committed right away
+        self._wakeup.set()
+        self._worker = asyncio.create_task(self._run())
+        logger.info(f"Knowledge write-behind queue started ({self.queue_depth()} pending).")
+
+    async def _drain(self):
+        while await self._flush_once():
+            pass
+
+    async def stop(self, drain_timeout: float = 10.0):
+        """
+        Lets the batch being committed finish, tries to commit what is pending,
+        then stops; anything left is committed after the restart.
+        """
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        await asyncio.gather(self._worker, return_exceptions=True)
+        self._worker = None
+        try:
+            if self._flushing is not None:
+                await asyncio.wait_for(asyncio.gather(self._flushing, return_exceptions=True), timeout=drain_timeout)
+            await asyncio.wait_for(self._drain(), timeout=drain_timeout)
+        except Exception as e:
+            logger.warning(f"Knowledge queue not fully drained at shutdown: {e}")
+        finally:
+            self._flushing = None
+            self._loop = None
+        logger.info(f"Knowledge write-behind queue stopped ({self.queue_depth()} pending).")
+
+    def queue_depth(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pending_writes").fetchone()[0]
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            depth, oldest, stuck, claimed = self._conn.execute(
+                "SELECT COUNT(*), MIN(enqueued_at), SUM(attempts >= ?), "
+                "SUM(claimed_by IS NOT NULL AND claimed_until >= ?) FROM pending_writes",
+                (self._max_attempts, time.time()),
+            ).fetchone()
+        return {
+            **self._stats,
+            "queue_depth": depth,
+            "oldest_pending_age": round(time.time() - oldest, 3) if oldest else 0.0,
+            "given_up": stuck or 0,
+            "in_flight": claimed or 0,
+        }
+
+
+# Singleton instance
+knowledge_writer = KnowledgeWriteQueue()
@@ -1,104 +1,100 @@
 # File: app/services/lecture_transcript.py
 
 import logging
-from playwright.sync_api import sync_playwright
 import os
+import re
+from urllib.parse import urlparse
 from dotenv import load_dotenv, find_dotenv
+from .browser_pool import browser_pool
+from .caption_fetcher import caption_fetcher
+from .transcript_store import transcript_id_for
 
 load_dotenv(find_dotenv())
 
 unique_name = os.environ.get("UNIQUE_NAME")
 password = os.environ.get("PASSWORD")
 
-def get_transcript_url(url: str):
-    """Opens the Canvas lecture URL and finds the transcript URL."""
-    with sync_playwright() as p:
-        try:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page()
-            
+async def get_transcript_url(url: str):
+    """Opens the Canvas lecture URL in the shared browser pool and finds the transcript URL."""
+    try:
+        async with browser_pool.page() as page:
             logging.info("Navigating to lecture page: %s", url)
-            page.goto(url, wait_until="networkidle")
+            await page.goto(url, wait_until="networkidle")
 
-            if page.locator('input[name="username"]').count() > 0:
+            if await page.locator('input[name="username"]').count() > 0:
                 logging.info("Login required, attempting to log in.")
-                page.locator('input[name="username"]').first.fill(unique_name)
-                page.locator('input[type="password"]').first.fill(password)
-                page.locator('button[type="submit"]').first.click()
-                page.wait_for_load_state("networkidle")
+                await page.locator('input[name="username"]').first.fill(unique_name)
+                await page.locator('input[type="password"]').first.fill(password)
+                await page.locator('button[type="submit"]').first.click()
+                await page.wait_for_load_state("networkidle")
                 logging.info("Login completed.")
-                page.goto(url, wait_until="networkidle")
+                # Keep the session so later requests skip the login
+                await browser_pool.save_storage_state()
+                await page.goto(url, wait_until="networkidle")
 
             track_element = page.locator('track[kind="captions"]').first
-            transcript_url = track_element.get_attribute('src')
-            browser.close()
-
-            if transcript_url:
-                full_url = f"https://leccap.engin.umich.edu{transcript_url}"
-                logging.info("Transcript URL found: %s", full_url)
-                return full_url
-            else:
-                logging.warning("Transcript <track> element not found on page: %s", url)
-                return None
-
-        except Exception as e:
-            logging.error("Failed while trying to get transcript URL from %s: %s", url, e, exc_info=True)
+            transcript_url = await track_element.get_attribute('src') if await track_element.count() > 0 else None
+
+        if transcript_url:
+            full_url = f"https://leccap.engin.umich.edu{transcript_url}"
+            logging.info("Transcript URL found: %s", full_url)
+            return full_url
+        else:
+            logging.warning("Transcript <track> element not found on page: %s", url)
             return None
 
-def open_trans_url(url: str):
-    """Opens the direct transcript URL and extracts the text."""
-    with sync_playwright() as p:
-        try:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page()
-
-            logging.info("Navigating to transcript file URL: %s", url)
-            page.goto(url, wait_until="networkidle")
-            
-            transcript_element = page.locator('pre').first
-            transcript_text = transcript_element.inner_text()
-            browser.close()
+    except Exception as e:
+        logging.error("Failed while trying to get transcript URL from %s: %s", url, e, exc_info=True)
+        return None
 
-            if transcript_text:
-                logging.info("Successfully extracted transcript text, length: %d", len(transcript_text))
-                return transcript_text
-            else:
-                logging.warning("Could not find transcript text at URL: %s", url)
-                return None
-        except Exception as e:
-            logging.error("Failed while trying to open transcript URL %s: %s", url, e, exc_info=True)
+async def open_trans_url(url: str):
+    """
+    Downloads the caption file directly over HTTP, with the browser session's
+    cookies, and returns it as clean text without cue timings.
+    """
+    try:
+        logging.info("Downloading transcript file: %s", url)
+        cookies = await browser_pool.cookies(url)
+        transcript_text = await caption_fetcher.fetch_text(url, cookies=cookies)
+
+        if transcript_text:
+            logging.info("Successfully extracted transcript text, length: %d", len(transcript_text))
+            return transcript_text
+        else:
+            logging.warning("Could not find transcript text at URL: %s", url)
             return None
+    except Exception as e:
+        logging.error("Failed while trying to download transcript URL %s: %s", url, e, exc_info=True)
+        return None
 
-def handle_transcript_request(lecture_url: str):
+async def handle_transcript_request(lecture_url: str):
     """Orchestrates the process of getting a lecture transcript."""
     try:
-        transcript_file_url = get_transcript_url(lecture_url)
+        transcript_file_url = await get_transcript_url(lecture_url)
         if not transcript_file_url:
             logging.error("Could not find the transcript file URL. Aborting.")
             return None
-        
-        transcript_text = open_trans_url(transcript_file_url)
-        return transcript_text
+
+        return await open_trans_url(transcript_file_url)
 
     except Exception as e:
         logging.critical("An unhandled exception occurred in handle_transcript_request: %s", e, exc_info=True)
         return None
-    
-
-
 
 
 def handle_lecture_name(lecture_url: str) -> str:
     """
-    Placeholder function to extract/generate lecture name from URL.
-    This should be implemented to return an appropriate filename.
+    Generates a filename for the lecture's transcript from its URL.
+    Uses the domain and the last path segment (the recording id on lecture
+    capture links), plus a short id of the canonical URL, so different lectures
+    on the same domain never share a filename.
     """
-    # For now, extract domain and create a simple name
-    # In practice, this might parse the URL or extract title from page
     try:
-        from urllib.parse import urlparse
         parsed = urlparse(lecture_url)
         domain = parsed.netloc.replace('www.', '')
-        return f"{domain}_lecture_transcript.txt"
-    except:
-        return "lecture_transcript.txt"
\ No newline at end of file
+        segments = [segment for segment in parsed.path.split('/') if segment]
+        parts = [domain, segments[-1]] if segments else [domain]
+        slug = re.sub(r'[^A-Za-z0-9._-]+', '_', "_".join(parts)).strip('_')
+        return f"{slug}_{transcript_id_for(lecture_url)[:8]}_lecture_transcript.txt"
+    except Exception:
+        return "lecture_transcript.txt"
@@ -0,0 +1,160 @@
+# File: app/services/transcript_ingestion.py
+
+import os
+import re
+import asyncio
+import hashlib
+import logging
+from typing import AsyncIterator, Dict, List, Tuple
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from ..core.chroma_db import chroma_manager
+from .embedding_pipeline import embed_chunks_in_batches, EMBED_BATCH_SIZE, EMBED_MAX_CONCURRENCY
+from .transcript_jobs import transcript_jobs, TranscriptJob
+from .transcript_store import transcript_store
+
+logger = logging.getLogger(__name__)
+
+TRANSCRIPT_CHUNK_SIZE = int(os.getenv("TRANSCRIPT_CHUNK_SIZE", "1000"))
+TRANSCRIPT_CHUNK_OVERLAP = int(os.getenv("TRANSCRIPT_CHUNK_OVERLAP", "200"))
+# Shared by all users: chunk embeddings of every transcript ingested so far
+TRANSCRIPT_CHUNK_COLLECTION = "transcript_chunk_embeddings"
+
+# Sound cues such as [MUSIC] or (LAUGHTER) carry nothing worth retrieving
+_CUE_PATTERN = re.compile(r"\[[^\]]*\]|\((?:music|laughter|applause|inaudible|silence)\)", re.IGNORECASE)
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+# Running background ingestions per (user, transcript); also keeps the tasks referenced
+_running: Dict[Tuple[int, str], asyncio.Task] = {}
+
+
+def clean_transcript(text: str) -> str:
+    """
+    Turns caption text into prose: sound cues are dropped, the short caption
+    lines are joined, and every sentence starts on its own line so the splitter
+    prefers sentence boundaries.
+    """
+    text = " ".join(_CUE_PATTERN.sub(" ", text).split())
+    return _SENTENCE_END.sub("\n", text)
+
+
+def chunk_transcript(text: str, chunk_size: int = TRANSCRIPT_CHUNK_SIZE, chunk_overlap: int = TRANSCRIPT_CHUNK_OVERLAP) -> List[str]:
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len,
+    )
+    return text_splitter.split_text(clean_transcript(text))
+
+
+def _chunk_ids(transcript_id: str, chunks: List[str]) -> Tuple[List[str], List[str]]:
+    """
+    Content-addressed chunk ids, so the same chunk of the same transcript has
+    the same id in every collection. Repeated chunks are kept once.
+    """
+    ids, unique_chunks, seen = [], [], set()
+    for chunk in chunks:
+        chunk_id = f"transcript-{transcript_id}-{hashlib.sha256(chunk.encode('utf-8')).hexdigest()[:16]}"
+        if chunk_id not in seen:
+            seen.add(chunk_id)
+            ids.append(chunk_id)
+            unique_chunks.append(chunk)
+    return ids, unique_chunks
+
+
+async def ingest_transcript(
+    user_id: int,
+    transcript_id: str,
+    batch_size: int = EMBED_BATCH_SIZE,
+    max_concurrency: int = EMBED_MAX_CONCURRENCY,
+) -> AsyncIterator[dict]:
+    """
+    Writes a stored transcript into the user's knowledge collection, yielding
+    progress as it goes.
+
+    Chunks the user already has are skipped, so an interrupted ingestion
+    resumes where it stopped. Chunks another user already ingested are copied
+    with their stored embeddings from the shared chunk collection; only the
+    rest are embedded, in bounded concurrent batches that are written to the
+    user's collection (and the shared one) as each batch finishes.
+    """
+    # The max age only decides when a lecture is scraped again; an old transcript can still be ingested
+    record = await asyncio.to_thread(transcript_store.get_by_id, transcript_id, True)
+    if record is None:
+        raise ValueError(f"Transcript {transcript_id} not found")
+
+    ids, chunks = _chunk_ids(transcript_id, chunk_transcript(record["content"]))
+    total = len(chunks)
+    metadata_by_id = {
+        chunk_id: {
+            "topic": record["filename"],
+            "source": "lecture_transcript",
+            "transcript_id": transcript_id,
+            "chunk_index": index,
+        }
+        for index, chunk_id in enumerate(ids)
+    }
+    chunk_by_id = dict(zip(ids, chunks))
+
+    collection = chroma_manager.get_knowledge_collection(user_id)
+    shared = chroma_manager.get_collection(name=TRANSCRIPT_CHUNK_COLLECTION)
+
+    existing = set((await asyncio.to_thread(collection.get, ids=ids, include=[]))["ids"]) if ids else set()
+    missing = [chunk_id for chunk_id in ids if chunk_id not in existing]
+
+    reused = 0
+    if missing:
+        shared_hits = await asyncio.to_thread(shared.get, ids=missing, include=["embeddings"])
+        if shared_hits["ids"]:
+            await asyncio.to_thread(
+                collection.add,
+                ids=shared_hits["ids"],
+                embeddings=shared_hits["embeddings"],
+                documents=[chunk_by_id[chunk_id] for chunk_id in shared_hits["ids"]],
+                metadatas=[metadata_by_id[chunk_id] for chunk_id in shared_hits["ids"]],
+            )
+            reused = len(shared_hits["ids"])
+            reused_ids = set(shared_hits["ids"])
+            missing = [chunk_id for chunk_id in missing if chunk_id not in reused_ids]
+
+    done = len(existing) + reused
+    yield {"ingested": done, "total": total, "already_present": len(existing), "reused": reused}
+
+    if missing:
+        async for progress in embed_chunks_in_batches(
+            collection,
+            [chunk_by_id[chunk_id] for chunk_id in missing],
+            missing,
+            [metadata_by_id[chunk_id] for chunk_id in missing],
+            batch_size=batch_size,
+            max_concurrency=max_concurrency,
+            extra_collections=(shared,),
+        ):
+            yield {**progress, "ingested": done + progress["embedded"], "total": total}
+
+    logger.info(
+        f"Ingested transcript {transcript_id} for user {user_id}: {total} chunks "
+        f"({len(existing)} already present, {reused} reused, {len(missing)} embedded)"
+    )
+
+
+async def _ingest_after_job(user_id: int, job: TranscriptJob):
+    try:
+        job = await transcript_jobs.wait(job)
+        if job.status != "done":
+            return
+        async for _ in ingest_transcript(user_id, job.transcript_id):
+            pass
+    except Exception as e:
+        logger.error(f"Failed to ingest transcript {job.transcript_id} for user {user_id}: {e}", exc_info=True)
+    finally:
+        _running.pop((user_id, job.transcript_id), None)
+
+
+def schedule_ingestion(user_id: int, job: TranscriptJob) -> None:
+    """Ingests the job's transcript for the user in the background once the job is done."""
+    key = (user_id, job.transcript_id)
+    if key in _running:
+        return
+    _running[key] = asyncio.create_task(_ingest_after_job(user_id, job))
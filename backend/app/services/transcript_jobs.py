@@ -0,0 +1,177 @@
+# File: app/services/transcript_jobs.py
+
+import os
+import time
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+from .lecture_transcript import handle_transcript_request, handle_lecture_name
+from .transcript_store import transcript_store, transcript_id_for
+
+logger = logging.getLogger(__name__)
+
+# Scrapes running at the same time; each one holds a browser page
+TRANSCRIPT_WORKERS = int(os.getenv("TRANSCRIPT_WORKERS", "2"))
+# Finished jobs kept around for status polling
+TRANSCRIPT_JOB_HISTORY = int(os.getenv("TRANSCRIPT_JOB_HISTORY", "1000"))
+
+
+@dataclass
+class TranscriptJob:
+    job_id: str
+    lecture_url: str
+    transcript_id: str
+    status: str = "queued"  # queued -> running -> done | failed
+    filename: Optional[str] = None
+    error: Optional[str] = None
+    from_cache: bool = False
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    future: Optional[asyncio.Future] = field(default=None, repr=False)
+    # Users who submitted (or joined) this job; only they may read its status
+    requesters: Set[int] = field(default_factory=set, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "transcript_id": self.transcript_id,
+            "status": self.status,
+            "filename": self.filename,
+            "error": self.error,
+            "from_cache": self.from_cache,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class TranscriptJobQueue:
+    """
+    Background queue that scrapes lecture transcripts once per lecture.
+
+    A request for a lecture already in the transcript store completes
+    immediately. Otherwise a job is queued, unless one for the same canonical
+    URL is already queued or running, in which case that job is returned
+    (single-flight), so a whole class importing the same lecture costs one
+    scrape. A fixed number of workers drain the queue.
+
+    Jobs live in the memory of the API worker that accepted them: with several
+    uvicorn workers, poll a job's status through the same worker (sticky
+    sessions) or submit with wait=True. Finished transcripts are shared by
+    all workers through the transcript store.
+    """
+
+    def __init__(self, workers: int = TRANSCRIPT_WORKERS, history: int = TRANSCRIPT_JOB_HISTORY):
+        self._worker_count = max(1, workers)
+        self._history = history
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._jobs: "OrderedDict[str, TranscriptJob]" = OrderedDict()
+        self._active: Dict[str, TranscriptJob] = {}
+        self._stats = {"submitted": 0, "store_hits": 0, "deduplicated": 0, "scrapes": 0, "failed": 0}
+
+    def start(self):
+        if self._workers:
+            return
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self._worker_count)]
+        logger.info(f"Transcript job queue started with {self._worker_count} workers.")
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info("Transcript job queue stopped.")
+
+    def _remember(self, job: TranscriptJob):
+        self._jobs[job.job_id] = job
+        while len(self._jobs) > self._history:
+            self._jobs.popitem(last=False)
+
+    async def submit(self, lecture_url: str, user_id: int) -> TranscriptJob:
+        """Returns a job for the lecture: finished (from the store), shared (in flight) or newly queued."""
+        self._stats["submitted"] += 1
+        transcript_id = transcript_id_for(lecture_url)
+
+        stored = await asyncio.to_thread(transcript_store.get, lecture_url)
+        if stored:
+            self._stats["store_hits"] += 1
+            job = TranscriptJob(
+                job_id=uuid.uuid4().hex, lecture_url=lecture_url, transcript_id=transcript_id,
+                status="done", filename=stored["filename"], from_cache=True, finished_at=time.time(),
+                requesters={user_id},
+            )
+            job.future = asyncio.get_running_loop().create_future()
+            job.future.set_result(job)
+            self._remember(job)
+            return job
+
+        active = self._active.get(transcript_id)
+        if active is not None:
+            self._stats["deduplicated"] += 1
+            active.requesters.add(user_id)
+            logger.info(f"Joining in-flight transcript job {active.job_id} for {lecture_url}")
+            return active
+
+        self.start()
+        job = TranscriptJob(
+            job_id=uuid.uuid4().hex, lecture_url=lecture_url, transcript_id=transcript_id, requesters={user_id},
+        )
+        job.future = asyncio.get_running_loop().create_future()
+        self._active[transcript_id] = job
+        self._remember(job)
+        await self._queue.put(job)
+        logger.info(f"Queued transcript job {job.job_id} for {lecture_url} (queue depth {self._queue.qsize()})")
+        return job
+
+    async def wait(self, job: TranscriptJob) -> TranscriptJob:
+        # shield: one client disconnecting must not cancel a job others wait on
+        return await asyncio.shield(job.future)
+
+    def get_job(self, job_id: str, user_id: int) -> Optional[TranscriptJob]:
+        """Returns the job if it exists and `user_id` is one of its requesters."""
+        job = self._jobs.get(job_id)
+        if job is None or user_id not in job.requesters:
+            return None
+        return job
+
+    async def _run(self, job: TranscriptJob):
+        job.status = "running"
+        self._stats["scrapes"] += 1
+        transcript_text = await handle_transcript_request(job.lecture_url)
+        if not transcript_text:
+            job.status, job.error = "failed", "Transcript could not be retrieved"
+            self._stats["failed"] += 1
+            return
+        record = await asyncio.to_thread(
+            transcript_store.put, job.lecture_url, handle_lecture_name(job.lecture_url), transcript_text
+        )
+        job.status, job.filename = "done", record["filename"]
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            except Exception as e:
+                logger.error(f"Transcript job {job.job_id} failed: {e}", exc_info=True)
+                job.status, job.error = "failed", str(e)
+                self._stats["failed"] += 1
+            finally:
+                job.finished_at = time.time()
+                self._active.pop(job.transcript_id, None)
+                if not job.future.done():
+                    job.future.set_result(job)
+                self._queue.task_done()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {**self._stats, "queued": self._queue.qsize() if self._queue else 0, "in_flight": len(self._active)}
+
+
+# Singleton instance
+transcript_jobs = TranscriptJobQueue()
@@ -0,0 +1,115 @@
+# File: app/services/transcript_store.py
+
+import os
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+TRANSCRIPT_STORE_PATH = Path(os.getenv("TRANSCRIPT_STORE_PATH", "./chroma_db/transcripts.sqlite"))
+# Transcripts older than this are scraped again; 0 keeps them forever
+TRANSCRIPT_MAX_AGE_SECONDS = int(os.getenv("TRANSCRIPT_MAX_AGE_SECONDS", "0"))
+
+
+def canonical_lecture_url(url: str) -> str:
+    """
+    Normalizes a lecture URL so links copied from different places map to the
+    same transcript: lowercase scheme/host, no fragment, no trailing slash,
+    tracking parameters dropped and the remaining query sorted.
+    """
+    parts = urlsplit(url.strip())
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_")
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(query), ""))
+
+
+def transcript_id_for(url: str) -> str:
+    """Stable id of a lecture transcript, derived from its canonical URL."""
+    return hashlib.sha256(canonical_lecture_url(url).encode("utf-8")).hexdigest()[:16]
+
+
+class TranscriptStore:
+    """
+    Persistent store of scraped lecture transcripts, keyed by canonical lecture URL.
+
+    Every row keeps the transcript text, its filename, a sha256 of the content
+    and when it was fetched, so repeated imports of the same lecture are served
+    without scraping it again.
+    """
+
+    def __init__(self, db_path: Path = TRANSCRIPT_STORE_PATH, max_age_seconds: int = TRANSCRIPT_MAX_AGE_SECONDS):
+        self._max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Shared by all API workers of the host
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS transcripts ("
+            "transcript_id TEXT PRIMARY KEY, canonical_url TEXT NOT NULL, filename TEXT NOT NULL, "
+            "content TEXT NOT NULL, content_hash TEXT NOT NULL, fetched_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, lecture_url: str) -> Optional[Dict[str, Any]]:
+        """Returns the stored transcript for `lecture_url`, or None if missing or too old."""
+        return self.get_by_id(transcript_id_for(lecture_url))
+
+    def get_by_id(self, transcript_id: str, include_expired: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Returns the stored transcript, or None if missing. Transcripts past the
+        max age are only returned with include_expired: they are due for a new
+        scrape, but their text is still the lecture's transcript.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT transcript_id, canonical_url, filename, content, content_hash, fetched_at "
+                "FROM transcripts WHERE transcript_id = ?",
+                (transcript_id,),
+            ).fetchone()
+        if not row:
+            return None
+        if not include_expired and self._max_age_seconds and time.time() - row[5] > self._max_age_seconds:
+            return None
+        return {
+            "transcript_id": row[0],
+            "canonical_url": row[1],
+            "filename": row[2],
+            "content": row[3],
+            "content_hash": row[4],
+            "fetched_at": row[5],
+        }
+
+    def put(self, lecture_url: str, filename: str, content: str) -> Dict[str, Any]:
+        record = {
+            "transcript_id": transcript_id_for(lecture_url),
+            "canonical_url": canonical_lecture_url(lecture_url),
+            "filename": filename,
+            "content": content,
+            "content_hash": hashlib.sha256(content.encode("utf-8")).hexdigest(),
+            "fetched_at": time.time(),
+        }
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO transcripts "
+                "(transcript_id, canonical_url, filename, content, content_hash, fetched_at) "
+                "VALUES (:transcript_id, :canonical_url, :filename, :content, :content_hash, :fetched_at)",
+                record,
+            )
+            self._conn.commit()
+        logger.info(f"Stored transcript {record['transcript_id']} ({len(content)} chars) for {record['canonical_url']}")
+        return record
+
+
+# Singleton instance
+transcript_store = TranscriptStore()
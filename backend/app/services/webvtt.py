@@ -0,0 +1,70 @@
+# File: app/services/webvtt.py
+
+import re
+import html
+from typing import Iterable, List, Optional
+
+# Inline cue markup: <v Speaker>, <c.classname>, <i>, </b>, <00:01:02.500> ...
+_TAG_PATTERN = re.compile(r"<[^>]*>")
+# Metadata blocks that never carry spoken text
+_SKIPPED_BLOCKS = ("WEBVTT", "NOTE", "STYLE", "REGION")
+
+
+def clean_cue_line(line: str) -> str:
+    """Removes inline tags and timestamps from one cue line and unescapes entities."""
+    return " ".join(html.unescape(_TAG_PATTERN.sub("", line)).split())
+
+
+class WebVTTParser:
+    """
+    Incremental WebVTT (and SRT) to plain text parser.
+
+    Lines are fed as they arrive from the network; text is only buffered per
+    cue block, never for the whole file. Headers, NOTE/STYLE/REGION blocks, cue
+    identifiers and timing lines are dropped, and a cue line identical to the
+    previous one (rolling captions repeat the last line) is emitted only once.
+    Blocks without a timing line are kept as they are, so a plain-text
+    transcript passes through unchanged.
+    """
+
+    def __init__(self):
+        self._block: List[str] = []
+        self._last_line: Optional[str] = None
+
+    def feed_line(self, line: str) -> List[str]:
+        """Feeds one line (without its newline). Returns the text lines completed by it."""
+        line = line.rstrip("\r\n").lstrip("\ufeff")
+        if line.strip():
+            self._block.append(line)
+            return []
+        return self._flush_block()
+
+    def close(self) -> List[str]:
+        """Flushes the last block once the input has ended."""
+        return self._flush_block()
+
+    def _flush_block(self) -> List[str]:
+        block, self._block = self._block, []
+        if not block or block[0].split(" ", 1)[0].split("\t", 1)[0] in _SKIPPED_BLOCKS:
+            return []
+
+        timing_index = next((i for i, line in enumerate(block) if "-->" in line), None)
+        text_lines = block if timing_index is None else block[timing_index + 1:]
+
+        output = []
+        for line in text_lines:
+            cleaned = clean_cue_line(line)
+            if cleaned and cleaned != self._last_line:
+                output.append(cleaned)
+                self._last_line = cleaned
+        return output
+
+
+def parse_webvtt(lines: Iterable[str]) -> str:
+    """Parses a whole caption file given as lines and returns its clean text."""
+    parser = WebVTTParser()
+    text_lines = []
+    for line in lines:
+        text_lines.extend(parser.feed_line(line))
+    text_lines.extend(parser.close())
+    return "\n".join(text_lines)
@@ -0,0 +1,17 @@
+# File: tests/conftest.py
+
+import os
+import tempfile
+
+# Several modules open their SQLite stores when they are imported; keep the
+# tests' copies out of the working tree. Must run before any app import.
+_DATA_DIR = tempfile.mkdtemp(prefix="learning-chatbot-tests-")
+for _name, _file in (
+    ("KNOWLEDGE_QUEUE_PATH", "knowledge_queue.sqlite"),
+    ("TRANSCRIPT_STORE_PATH", "transcripts.sqlite"),
+    ("SEARCH_CACHE_PATH", "search_cache.sqlite"),
+    ("CHECKPOINT_SQLITE_PATH", "checkpoints.sqlite"),
+):
+    os.environ.setdefault(_name, os.path.join(_DATA_DIR, _file))
+os.environ.setdefault("CHROMA_DB_PATH", os.path.join(_DATA_DIR, "chroma_db"))
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
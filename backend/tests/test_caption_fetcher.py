@@ -0,0 +1,103 @@
+# File: tests/test_caption_fetcher.py
+
+import asyncio
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from app.services.caption_fetcher import CaptionFetcher, CaptionFetchError
+
+CAPTION_URL = "https://media.example.edu/captions/lecture-3.vtt"
+LOGIN_PAGE = "<!DOCTYPE html><html><body><form>Sign in</form></body></html>"
+VTT = "WEBVTT\n\n00:00:00.000 --> 00:00:02.000\n<v Lee>Hello &amp; welcome\n\n00:00:02.000 --> 00:00:04.000\nto thermodynamics\n"
+
+
+def _fetch(handler, url=CAPTION_URL, cookies=None):
+    fetcher = CaptionFetcher()
+    fetcher._client = httpx.AsyncClient(transport=httpx.MockTransport(handler), follow_redirects=True)
+
+    async def run():
+        try:
+            return await fetcher.fetch_text(url, cookies=cookies)
+        finally:
+            await fetcher.close()
+
+    return asyncio.run(run())
+
+
+def test_caption_file_is_parsed_with_session_cookies():
+    seen = {}
+
+    def handler(request):
+        seen["cookie"] = request.headers.get("cookie")
+        return httpx.Response(200, text=VTT, headers={"content-type": "text/vtt; charset=utf-8"})
+
+    assert _fetch(handler, cookies={"session": "abc", "csrf": "x"}) == "Hello & welcome\nto thermodynamics"
+    assert seen["cookie"] == "session=abc; csrf=x"
+
+
+def test_redirect_to_a_login_page_is_rejected():
+    def handler(request):
+        if request.url.host == "media.example.edu":
+            return httpx.Response(302, headers={"location": "https://sso.example.edu/login?next=/captions"})
+        return httpx.Response(200, text="WEBVTT\n\nlooks like captions", headers={"content-type": "text/vtt"})
+
+    with pytest.raises(CaptionFetchError, match="redirected"):
+        _fetch(handler)
+
+
+def test_html_response_is_rejected():
+    def handler(request):
+        return httpx.Response(200, text=LOGIN_PAGE, headers={"content-type": "text/html"})
+
+    with pytest.raises(CaptionFetchError, match="content type"):
+        _fetch(handler)
+
+
+def test_login_page_served_as_plain_text_is_rejected():
+    def handler(request):
+        return httpx.Response(200, text=LOGIN_PAGE, headers={"content-type": "text/plain"})
+
+    with pytest.raises(CaptionFetchError, match="not a caption file"):
+        _fetch(handler)
+
+
+def test_vtt_content_type_needs_a_webvtt_header():
+    def handler(request):
+        return httpx.Response(200, text="Hello and welcome", headers={"content-type": "text/vtt"})
+
+    with pytest.raises(CaptionFetchError, match="not a caption file"):
+        _fetch(handler)
+
+
+@pytest.mark.parametrize("content_type", ["application/x-subrip", "text/plain"])
+def test_srt_file_is_accepted(content_type):
+    srt = "1\n00:00:00,000 --> 00:00:02,000\nHello & welcome\n\n2\n00:00:02,000 --> 00:00:04,000\nto thermodynamics\n"
+
+    def handler(request):
+        return httpx.Response(200, text=srt, headers={"content-type": content_type})
+
+    assert _fetch(handler) == "Hello & welcome\nto thermodynamics"
+
+
+def test_plain_text_transcript_is_accepted():
+    def handler(request):
+        return httpx.Response(200, text="Hello and welcome\nto thermodynamics\n", headers={"content-type": "text/plain"})
+
+    assert _fetch(handler) == "Hello and welcome\nto thermodynamics"
+
+
+def test_srt_needs_its_content_type_or_text_plain():
+    def handler(request):
+        return httpx.Response(200, text="Hello and welcome", headers={"content-type": "application/x-subrip"})
+
+    with pytest.raises(CaptionFetchError, match="not a caption file"):
+        _fetch(handler)
+
+
+def test_missing_file_returns_none():
+    def handler(request):
+        return httpx.Response(404, text="not found", headers={"content-type": "text/plain"})
+
+    assert _fetch(handler) is None
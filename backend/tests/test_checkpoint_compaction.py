@@ -0,0 +1,139 @@
+# File: tests/test_checkpoint_compaction.py
+
+import asyncio
+import sqlite3
+
+import pytest
+
+pytest.importorskip("asyncpg")
+pytest.importorskip("langgraph")
+
+from app.database import checkpoint_compaction
+from app.database.checkpoint_compaction import (
+    _SQLITE_PRUNE_CHECKPOINTS,
+    _SQLITE_PRUNE_WRITES,
+    compact_checkpoints,
+)
+
+# Same tables as langgraph.checkpoint.sqlite creates
+SCHEMA = """
+    CREATE TABLE checkpoints (
+        thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL DEFAULT '', checkpoint_id TEXT NOT NULL,
+        parent_checkpoint_id TEXT, type TEXT, checkpoint BLOB, metadata BLOB,
+        PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+    );
+    CREATE TABLE writes (
+        thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL DEFAULT '', checkpoint_id TEXT NOT NULL,
+        task_id TEXT NOT NULL, idx INTEGER NOT NULL, channel TEXT NOT NULL, type TEXT, value BLOB,
+        PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+    );
+"""
+
+
+def _populate(conn, threads, per_thread=10, payload=b""):
+    for thread_id in threads:
+        for n in range(1, per_thread + 1):
+            checkpoint_id = f"{n:04d}"
+            conn.execute(
+                "INSERT INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, checkpoint) VALUES (?, '', ?, ?)",
+                (thread_id, checkpoint_id, payload),
+            )
+            conn.execute(
+                "INSERT INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, value) "
+                "VALUES (?, '', ?, 'task', 0, 'history_messages', ?)",
+                (thread_id, checkpoint_id, payload),
+            )
+    conn.commit()
+
+
+def _prune(conn, keep_last, snapshot_every, thread_id=None):
+    thread_params = (thread_id,) if thread_id else ()
+    conn.execute(
+        _SQLITE_PRUNE_CHECKPOINTS.format(where="WHERE thread_id = ?" if thread_id else ""),
+        (*thread_params, keep_last, snapshot_every, snapshot_every or 1),
+    )
+    conn.execute(
+        _SQLITE_PRUNE_WRITES.format(and_where="AND writes.thread_id = ?" if thread_id else ""),
+        thread_params,
+    )
+    conn.commit()
+
+
+def _ids(conn, table, thread_id):
+    rows = conn.execute(f"SELECT checkpoint_id FROM {table} WHERE thread_id = ? ORDER BY checkpoint_id", (thread_id,))
+    return [int(row[0]) for row in rows]
+
+
+@pytest.fixture
+def conn():
+    connection = sqlite3.connect(":memory:")
+    connection.executescript(SCHEMA)
+    yield connection
+    connection.close()
+
+
+def test_prune_keeps_the_newest_checkpoints_and_their_writes(conn):
+    _populate(conn, ["a", "b"])
+    _prune(conn, keep_last=3, snapshot_every=0)
+
+    for thread_id in ("a", "b"):
+        assert _ids(conn, "checkpoints", thread_id) == [8, 9, 10]
+        assert _ids(conn, "writes", thread_id) == [8, 9, 10]
+
+
+def test_prune_keeps_snapshots(conn):
+    _populate(conn, ["a"])
+    _prune(conn, keep_last=2, snapshot_every=4)
+
+    assert _ids(conn, "checkpoints", "a") == [4, 8, 9, 10]
+    assert _ids(conn, "writes", "a") == [4, 8, 9, 10]
+
+
+def test_prune_only_touches_the_given_thread(conn):
+    _populate(conn, ["a", "b"])
+    _prune(conn, keep_last=1, snapshot_every=0, thread_id="a")
+
+    assert _ids(conn, "checkpoints", "a") == [10]
+    assert _ids(conn, "writes", "a") == [10]
+    assert _ids(conn, "checkpoints", "b") == list(range(1, 11))
+    assert _ids(conn, "writes", "b") == list(range(1, 11))
+
+
+def test_prune_keeps_everything_when_threads_are_short(conn):
+    _populate(conn, ["a"], per_thread=3)
+    _prune(conn, keep_last=5, snapshot_every=0)
+    assert _ids(conn, "checkpoints", "a") == [1, 2, 3]
+
+
+class _SqliteSaver:
+    """The two attributes of AsyncSqliteSaver that compaction uses."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.lock = asyncio.Lock()
+
+
+def test_compact_checkpoints_vacuums_only_when_asked(tmp_path, monkeypatch):
+    aiosqlite = pytest.importorskip("aiosqlite")
+    monkeypatch.setattr(checkpoint_compaction, "CHECKPOINT_VACUUM_STEP_PAGES", 5)
+    path = tmp_path / "checkpoints.sqlite"
+    with sqlite3.connect(path) as conn:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.executescript(SCHEMA)
+        _populate(conn, ["a", "b"], per_thread=20, payload=b"x" * 4000)
+
+    async def run():
+        async with aiosqlite.connect(path) as conn:
+            saver = _SqliteSaver(conn)
+            report = await compact_checkpoints(saver, keep_last=2, thread_id="a")
+            assert report["checkpoints_deleted"] == 18
+            assert report["writes_deleted"] == 18
+            assert report["size_after_bytes"] == report["size_before_bytes"]
+
+            report = await compact_checkpoints(saver, keep_last=2, vacuum=True)
+            assert report["checkpoints_deleted"] == 18
+            assert report["size_after_bytes"] < report["size_before_bytes"]
+            async with conn.execute("PRAGMA freelist_count") as cursor:
+                assert (await cursor.fetchone())[0] == 0
+
+    asyncio.run(run())
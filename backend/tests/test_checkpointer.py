@@ -0,0 +1,117 @@
+# File: tests/test_checkpointer.py
+
+import os
+import asyncio
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("asyncpg")
+pytest.importorskip("langgraph.checkpoint.sqlite.aio")
+
+import asyncpg
+from langgraph.checkpoint.base import empty_checkpoint
+
+from app.database import checkpointer as checkpointer_module
+from app.database.checkpointer import AsyncpgCheckpointSaver, open_checkpointer
+
+# Postgres round trips run only when a disposable database is configured
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+SCHEMA_SQL = Path(__file__).resolve().parents[1] / "app" / "database" / "schema.sql"
+
+
+def _checkpoint(messages):
+    checkpoint = empty_checkpoint()
+    checkpoint["channel_values"] = {"history_messages": messages}
+    return checkpoint
+
+
+async def _round_trip(saver, thread_id: str):
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+
+    first = await saver.aput(config, _checkpoint(["hi"]), {"source": "input", "step": 0}, {})
+    await saver.aput_writes(first, [("history_messages", "pending"), ("learning_complete", False)], task_id="task-1")
+    second = await saver.aput(first, _checkpoint(["hi", "hello"]), {"source": "loop", "step": 1}, {})
+
+    latest = await saver.aget_tuple(config)
+    assert latest.config["configurable"]["checkpoint_id"] == second["configurable"]["checkpoint_id"]
+    assert latest.checkpoint["channel_values"] == {"history_messages": ["hi", "hello"]}
+    assert latest.metadata["step"] == 1
+    assert latest.parent_config["configurable"]["checkpoint_id"] == first["configurable"]["checkpoint_id"]
+
+    earlier = await saver.aget_tuple(first)
+    assert earlier.checkpoint["channel_values"] == {"history_messages": ["hi"]}
+    assert earlier.parent_config is None
+    assert [(task, channel, value) for task, channel, value in earlier.pending_writes] == [
+        ("task-1", "history_messages", "pending"),
+        ("task-1", "learning_complete", False),
+    ]
+
+    listed = [item async for item in saver.alist(config)]
+    assert [item.metadata["step"] for item in listed] == [1, 0]
+    assert [item.metadata["step"] async for item in saver.alist(config, limit=1)] == [1]
+    assert [item.metadata["step"] async for item in saver.alist(config, before=second)] == [0]
+    assert [item.metadata["step"] async for item in saver.alist(config, filter={"source": "input"})] == [0]
+
+    await saver.adelete_thread(thread_id)
+    assert await saver.aget_tuple(config) is None
+    assert [item async for item in saver.alist(config)] == []
+
+
+def test_sqlite_checkpointer_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(checkpointer_module, "CHECKPOINT_SQLITE_PATH", str(tmp_path / "checkpoints.sqlite"))
+
+    async def run():
+        async with open_checkpointer("sqlite") as saver:
+            await _round_trip(saver, "sqlite-thread")
+
+    asyncio.run(run())
+
+
+def test_unknown_backend_is_rejected():
+    async def run():
+        async with open_checkpointer("mongo"):
+            pass
+
+    with pytest.raises(ValueError, match="CHECKPOINT_BACKEND"):
+        asyncio.run(run())
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+def test_asyncpg_checkpointer_round_trip():
+    async def run():
+        pool = await asyncpg.create_pool(TEST_DATABASE_URL)
+        try:
+            async with pool.acquire() as connection:
+                await connection.execute(SCHEMA_SQL.read_text())
+            saver = AsyncpgCheckpointSaver(pool)
+            await _round_trip(saver, "asyncpg-thread")
+        finally:
+            await pool.close()
+
+    asyncio.run(run())
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+def test_asyncpg_checkpointer_sync_api():
+    async def run():
+        pool = await asyncpg.create_pool(TEST_DATABASE_URL)
+        try:
+            saver = AsyncpgCheckpointSaver(pool)
+            config = {"configurable": {"thread_id": "asyncpg-sync-thread", "checkpoint_ns": ""}}
+
+            # From another thread the sync API runs on the saver's loop
+            saved = await asyncio.to_thread(saver.put, config, _checkpoint(["hi"]), {"step": 0}, {})
+            await asyncio.to_thread(saver.put_writes, saved, [("history_messages", "x")], "task-1")
+            found = await asyncio.to_thread(saver.get_tuple, config)
+            assert found.checkpoint["channel_values"] == {"history_messages": ["hi"]}
+            assert len(await asyncio.to_thread(lambda: list(saver.list(config)))) == 1
+            await asyncio.to_thread(saver.delete_thread, "asyncpg-sync-thread")
+
+            # On the loop's own thread it would deadlock, so it fails clearly instead
+            with pytest.raises(asyncio.InvalidStateError, match="different thread"):
+                saver.get_tuple(config)
+        finally:
+            await pool.close()
+
+    asyncio.run(run())
@@ -0,0 +1,168 @@
+# File: tests/test_chroma_db.py
+
+import shutil
+import socket
+import subprocess
+import time
+
+import pytest
+
+chromadb = pytest.importorskip("chromadb")
+pytest.importorskip("langchain_google_genai")
+
+from app.core import chroma_db
+from app.core.chroma_benchmark import benchmark
+from app.core.chroma_db import CachedCollection, ChromaDBManager, UserKnowledgeCollection, _COLLECTION_NOT_FOUND
+
+
+@pytest.fixture(scope="module")
+def chroma_server(tmp_path_factory):
+    """A local `chroma run` on a free port."""
+    if shutil.which("chroma") is None:
+        pytest.skip("chroma CLI not installed")
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        port = sock.getsockname()[1]
+    process = subprocess.Popen(
+        ["chroma", "run", "--path", str(tmp_path_factory.mktemp("chroma-server")), "--port", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                chromadb.HttpClient(host="localhost", port=port).heartbeat()
+                break
+            except Exception:
+                if time.monotonic() > deadline or process.poll() is not None:
+                    pytest.skip("chroma server did not start")
+                time.sleep(0.2)
+        yield port
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+class FakeCollection:
+    def __init__(self, name, generation):
+        self.name = name
+        self.generation = generation
+        self.deleted = False
+        self.records = {}
+
+    def upsert(self, ids, documents=None, embeddings=None, metadatas=None):
+        if self.deleted:
+            raise _COLLECTION_NOT_FOUND[0](f"Collection {self.name} does not exist.")
+        for doc_id, metadata in zip(ids, metadatas):
+            self.records[doc_id] = metadata
+
+
+class FakeClient:
+    def __init__(self):
+        self.created = []
+
+    def get_or_create_collection(self, name, metadata=None):
+        collection = FakeCollection(name, len(self.created))
+        self.created.append(collection)
+        return collection
+
+
+class FakeManager:
+    def __init__(self):
+        self._client = FakeClient()
+        self.invalidated = []
+
+    def invalidate_collection(self, name):
+        self.invalidated.append(name)
+
+
+def test_cached_handle_refetches_a_collection_deleted_elsewhere():
+    manager = FakeManager()
+    handle = CachedCollection(manager, "knowledge_shard_001", None, manager._client.get_or_create_collection("knowledge_shard_001"))
+    handle.upsert(ids=["a"], metadatas=[{}])
+
+    # Another worker deletes (and later recreates) the collection
+    manager._client.created[0].deleted = True
+    handle.upsert(ids=["b"], metadatas=[{}])
+
+    assert manager.invalidated == ["knowledge_shard_001"]
+    assert handle.generation == 1
+    assert handle.records == {"b": {}}
+    assert handle.name == "knowledge_shard_001"
+
+
+def test_user_view_keeps_working_after_a_refetch():
+    manager = FakeManager()
+    shard = CachedCollection(manager, "knowledge_shard_007", None, manager._client.get_or_create_collection("knowledge_shard_007"))
+    view = UserKnowledgeCollection(shard, user_id=7)
+    manager._client.created[0].deleted = True
+
+    view.upsert(ids=["entropy"], metadatas=[{"topic": "entropy"}])
+    assert manager._client.created[1].records == {"7:entropy": {"topic": "entropy", "user_id": 7}}
+
+
+def test_server_mode_client_reads_and_writes(chroma_server, monkeypatch):
+    monkeypatch.setattr(chroma_db, "CHROMA_HOST", "localhost")
+    monkeypatch.setattr(chroma_db, "CHROMA_PORT", chroma_server)
+    client = ChromaDBManager._create_client("server")
+
+    collection = client.get_or_create_collection(name="server_mode_test")
+    collection.add(ids=["a", "b"], embeddings=[[1.0, 0.0], [0.0, 1.0]], documents=["first", "second"])
+    results = collection.query(query_embeddings=[[0.9, 0.1]], n_results=1)
+    assert results["ids"] == [["a"]]
+    client.delete_collection(name="server_mode_test")
+
+
+def test_benchmark_runs_in_both_modes(chroma_server, monkeypatch):
+    monkeypatch.setattr(chroma_db, "CHROMA_HOST", "localhost")
+    monkeypatch.setattr(chroma_db, "CHROMA_PORT", chroma_server)
+    for mode in ("embedded", "server"):
+        result = benchmark(mode, records=50, queries=20, threads=4, dimensions=8, batch_size=10)
+        assert result["mode"] == mode
+        assert result["adds_per_second"] > 0 and result["queries_per_second"] > 0
+
+
+@pytest.fixture
+def two_users(tmp_path):
+    client = chromadb.PersistentClient(path=str(tmp_path / "chroma"))
+    shard = client.get_or_create_collection(name="knowledge_shard_000")
+    alice, bob = UserKnowledgeCollection(shard, user_id=16), UserKnowledgeCollection(shard, user_id=32)
+    # Both users store a record with the same id
+    alice.add(ids=["entropy", "carnot"], embeddings=[[1.0, 0.0], [0.9, 0.1]],
+              documents=["alice entropy", "alice carnot"], metadatas=[{"topic": "entropy"}, {"topic": "engines"}])
+    bob.add(ids=["entropy"], embeddings=[[1.0, 0.0]], documents=["bob entropy"], metadatas=[{"topic": "entropy"}])
+    return shard, alice, bob
+
+
+def test_shared_shard_prefixes_ids_and_tags_user_id(two_users):
+    shard, alice, bob = two_users
+    raw = shard.get(include=["metadatas"])
+    assert sorted(raw["ids"]) == ["16:carnot", "16:entropy", "32:entropy"]
+    assert {metadata["user_id"] for metadata in raw["metadatas"]} == {16, 32}
+    assert alice.count() == 2 and bob.count() == 1
+
+
+def test_reads_only_return_the_users_own_records(two_users):
+    _, alice, bob = two_users
+    assert bob.get(include=["documents"])["documents"] == ["bob entropy"]
+    assert bob.get(ids=["entropy", "carnot"], include=["documents"])["ids"] == ["entropy"]
+    # Caller filters are combined with the user filter
+    topic = alice.get(where={"topic": "entropy"}, include=["documents"])
+    assert topic["ids"] == ["entropy"] and topic["documents"] == ["alice entropy"]
+
+    results = bob.query(query_embeddings=[[1.0, 0.0]], n_results=3, include=["documents"])
+    assert results["ids"] == [["entropy"]] and results["documents"] == [["bob entropy"]]
+    results = alice.query(query_embeddings=[[1.0, 0.0]], n_results=3, where={"topic": "engines"})
+    assert results["ids"] == [["carnot"]]
+
+
+def test_deletes_never_touch_another_users_records(two_users):
+    shard, alice, bob = two_users
+    bob.delete(ids=["entropy", "carnot"])
+    assert bob.count() == 0
+    assert sorted(alice.get()["ids"]) == ["carnot", "entropy"]
+
+    alice.delete(where={"topic": "entropy"})
+    assert alice.get()["ids"] == ["carnot"]
+    assert shard.count() == 1
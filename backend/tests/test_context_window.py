@@ -0,0 +1,109 @@
+# File: tests/test_context_window.py
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("langchain_core")
+pytest.importorskip("langchain_google_genai")
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from app.graph import context_window
+from app.graph.configuration import Configuration
+from app.graph.context_window import build_history_window, message_tokens
+
+
+class FakeSummaryModel:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.prompts = []
+
+    async def ainvoke(self, messages):
+        self.prompts.append(messages[0].content)
+        if self.fail:
+            raise RuntimeError("model unavailable")
+        return AIMessage(content=f"summary #{len(self.prompts)}")
+
+
+@pytest.fixture
+def summary_model(monkeypatch):
+    model = FakeSummaryModel()
+    monkeypatch.setattr(context_window.llm_registry, "get", lambda *args, **kwargs: model)
+    return model
+
+
+def _history(turns, words=3):
+    messages = []
+    for turn in range(turns):
+        messages.append(HumanMessage(content=f"question {turn} " + "word " * words))
+        messages.append(AIMessage(content=f"answer {turn} " + "word " * words))
+    return messages
+
+
+def _window(state, **config):
+    return asyncio.run(build_history_window(state, Configuration(**config)))
+
+
+def test_older_turns_are_folded_only_in_batches(summary_model):
+    config = {"verbatim_turns": 2, "summary_batch_messages": 4}
+
+    # One turn beyond the verbatim window: too few messages for a batch
+    history = _history(3)
+    window, update = _window({"history_messages": history}, **config)
+    assert window == history and update == {} and summary_model.prompts == []
+
+    # Two turns beyond it: folded at once
+    history = _history(4)
+    window, update = _window(
+        {"history_messages": history, "conversation_summary": "earlier summary"}, **config
+    )
+    assert update == {"conversation_summary": "summary #1", "summarized_message_count": 4}
+    assert "earlier summary" in summary_model.prompts[0] and "question 1" in summary_model.prompts[0]
+    assert isinstance(window[0], SystemMessage) and "summary #1" in window[0].content
+    assert window[1:] == history[4:]
+
+
+def test_history_over_the_token_budget_is_folded_right_away(summary_model):
+    history = _history(4, words=40)
+    budget = message_tokens(history[-3:])
+
+    window, update = _window(
+        {"history_messages": history},
+        verbatim_turns=10, summary_batch_messages=100, history_token_budget=budget,
+    )
+
+    assert update["summarized_message_count"] == 6
+    verbatim = window[1:]
+    assert verbatim == history[6:]
+    assert isinstance(verbatim[0], HumanMessage)
+    assert message_tokens(verbatim) <= budget
+
+
+def test_failed_summary_keeps_the_previous_summary(monkeypatch):
+    monkeypatch.setattr(context_window.llm_registry, "get", lambda *args, **kwargs: FakeSummaryModel(fail=True))
+    history = _history(6)
+    state = {"history_messages": history, "conversation_summary": "earlier summary", "summarized_message_count": 2}
+
+    window, update = _window(state, verbatim_turns=2, summary_batch_messages=4)
+
+    # Nothing is persisted, so the fold is retried next turn
+    assert update == {}
+    assert "earlier summary" in window[0].content
+    # Under budget: the messages that failed to fold are still sent verbatim
+    assert window[1:] == history[2:]
+
+
+def test_failed_summary_over_budget_still_fits_the_window(monkeypatch):
+    monkeypatch.setattr(context_window.llm_registry, "get", lambda *args, **kwargs: FakeSummaryModel(fail=True))
+    history = _history(4, words=40)
+    budget = message_tokens(history[-3:])
+
+    window, update = _window(
+        {"history_messages": history, "conversation_summary": "earlier summary"},
+        verbatim_turns=10, summary_batch_messages=100, history_token_budget=budget,
+    )
+
+    assert update == {}
+    assert "earlier summary" in window[0].content
+    assert window[1:] == history[6:]
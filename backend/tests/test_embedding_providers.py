@@ -0,0 +1,87 @@
+# File: tests/test_embedding_providers.py
+
+import pytest
+
+pytest.importorskip("langchain_core")
+pytest.importorskip("dotenv")
+
+from langchain_core.embeddings import FakeEmbeddings
+
+from app.core import embedding_providers
+from app.core.embedding_providers import create_embeddings, register_embedding_provider, _model_fingerprint
+
+
+def _write_model(path, weights):
+    path.mkdir(parents=True)
+    (path / "model.onnx").write_bytes(weights)
+    (path / "tokenizer.json").write_text("{}")
+
+
+def test_registered_provider_is_selectable_until_first_use(monkeypatch):
+    monkeypatch.setattr(embedding_providers, "EMBEDDING_PROVIDERS", dict(embedding_providers.EMBEDDING_PROVIDERS))
+    monkeypatch.setattr(embedding_providers, "_created_providers", set())
+
+    register_embedding_provider("fake", lambda: ("fake/v1", FakeEmbeddings(size=4)))
+    model_name, embeddings = create_embeddings("fake")
+    assert model_name == "fake/v1"
+    assert len(embeddings.embed_query("hello")) == 4
+
+    with pytest.raises(RuntimeError):
+        register_embedding_provider("fake", lambda: ("fake/v2", FakeEmbeddings(size=4)))
+    # Other names can still be added
+    register_embedding_provider("other", lambda: ("other/v1", FakeEmbeddings(size=4)))
+
+
+def test_model_fingerprint_tells_same_named_models_apart(tmp_path):
+    _write_model(tmp_path / "a" / "all-MiniLM-L6-v2", b"weights-a")
+    _write_model(tmp_path / "b" / "all-MiniLM-L6-v2", b"weights-b")
+    _write_model(tmp_path / "c" / "all-MiniLM-L6-v2", b"weights-a")
+
+    first = _model_fingerprint(tmp_path / "a" / "all-MiniLM-L6-v2")
+    assert first != _model_fingerprint(tmp_path / "b" / "all-MiniLM-L6-v2")
+    assert first == _model_fingerprint(tmp_path / "c" / "all-MiniLM-L6-v2")
+
+
+def _batching_embeddings(max_batch_size):
+    """OnnxSentenceEmbeddings with only its batching parts set up; _encode records batch sizes."""
+    import queue
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    embeddings = embedding_providers.OnnxSentenceEmbeddings.__new__(embedding_providers.OnnxSentenceEmbeddings)
+    embeddings._max_batch_size = max_batch_size
+    embeddings._batch_wait = 0.05
+    embeddings._requests = queue.Queue()
+    embeddings._pool = ThreadPoolExecutor(max_workers=1)
+    embeddings._stats = {"requests": 0, "batches": 0, "texts": 0}
+    embeddings._stats_lock = threading.Lock()
+    embeddings.batch_sizes = []
+
+    def encode(texts):
+        embeddings.batch_sizes.append(len(texts))
+        return [[float(len(text))] for text in texts]
+
+    embeddings._encode = encode
+    return embeddings
+
+
+def test_merged_batches_never_exceed_the_cap():
+    import threading
+    from concurrent.futures import Future
+
+    embeddings = _batching_embeddings(max_batch_size=4)
+    # Queue the requests before the collector starts, so all of them are waiting at once
+    futures = []
+    for texts in (["a", "bb", "ccc"], ["dd", "e", "f"], ["g"], ["hhhh", "i", "j"]):
+        future = Future()
+        embeddings._requests.put((texts, future))
+        futures.append(future)
+    threading.Thread(target=embeddings._collect, daemon=True).start()
+
+    assert [future.result(timeout=5) for future in futures] == [
+        [[1.0], [2.0], [3.0]], [[2.0], [1.0], [1.0]], [[1.0]], [[4.0], [1.0], [1.0]],
+    ]
+    assert max(embeddings.batch_sizes) <= 4
+    assert sum(embeddings.batch_sizes) == 10
+    stats = embeddings.stats
+    assert stats["texts"] == 10 and stats["batches"] == len(embeddings.batch_sizes)
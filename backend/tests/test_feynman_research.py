@@ -0,0 +1,60 @@
+# File: tests/test_feynman_research.py
+
+import pytest
+
+pytest.importorskip("langgraph")
+pytest.importorskip("google.genai")
+
+from app.graph import feynman_graph
+from app.graph.feynman_graph import decide_research
+from app.graph.state import add_unique_knowledge
+
+
+def test_reducer_drops_duplicates_and_keeps_order():
+    merged = add_unique_knowledge(["entropy", "enthalpy"], ["enthalpy", "free energy", "entropy", "free energy"])
+    assert merged == ["entropy", "enthalpy", "free energy"]
+
+
+def test_reducer_treats_whitespace_variants_as_duplicates():
+    merged = add_unique_knowledge(["Entropy always\nincreases."], ["  Entropy always increases. ", "Entropy  increases."])
+    assert merged == ["Entropy always\nincreases.", "Entropy  increases."]
+
+
+def test_reducer_handles_empty_sides():
+    assert add_unique_knowledge(None, ["a"]) == ["a"]
+    assert add_unique_knowledge(["a"], None) == ["a"]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = {"t": 1000.0}
+    monkeypatch.setattr(feynman_graph.time, "time", lambda: now["t"])
+    return now
+
+
+def _config(**configurable):
+    return {"configurable": {"max_research_loops": 2, "research_time_budget_seconds": 30.0, **configurable}}
+
+
+def test_research_continues_within_budget(clock):
+    state = {"needs_more_context": True, "research_iterations": 1, "research_started_at": 990.0}
+    assert decide_research(state, _config()) == "needs_context"
+
+
+def test_research_stops_when_enough_context(clock):
+    state = {"needs_more_context": False, "research_iterations": 0, "research_started_at": clock["t"]}
+    assert decide_research(state, _config()) == "enough_context"
+
+
+def test_research_stops_after_max_loops(clock):
+    state = {"needs_more_context": True, "research_iterations": 2, "research_started_at": clock["t"]}
+    assert decide_research(state, _config()) == "enough_context"
+    assert decide_research(state, _config(max_research_loops=3)) == "needs_context"
+
+
+def test_research_stops_when_time_budget_runs_out(clock):
+    state = {"needs_more_context": True, "research_iterations": 0, "research_started_at": clock["t"]}
+    clock["t"] += 29.9
+    assert decide_research(state, _config()) == "needs_context"
+    clock["t"] += 0.1
+    assert decide_research(state, _config()) == "enough_context"
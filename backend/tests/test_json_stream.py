@@ -0,0 +1,107 @@
+# File: tests/test_json_stream.py
+
+import json
+import random
+
+import pytest
+
+from app.graph.json_stream import IncrementalJsonParser, chunk_text
+
+
+def _random_chunks(text, rng):
+    chunks, i = [], 0
+    while i < len(text):
+        size = rng.randint(1, 7)
+        chunks.append(text[i:i + size])
+        i += size
+    return chunks
+
+
+def _feed_all(parser, chunks):
+    events = []
+    for chunk in chunks:
+        events.extend(parser.feed(chunk))
+    return events
+
+
+PAYLOADS = [
+    {"response_text": "Hello world", "next_action": "continue_learning"},
+    {"response_text": 'Quotes "inside", back\\slash, tab\there\nnew line', "next_action": "store_knowledge"},
+    {"response_text": "Unicode: café, 中文, emoji \U0001F600 and \U0001F9E0", "next_action": "continue_learning"},
+    {"feedback": "Close, but “F = ma” needs units.", "is_mastered": False, "gaps": ["units", {"n": [1, 2]}]},
+    {"next_action": "continue_learning", "response_text": "", "score": -1.5e3, "extra": None},
+]
+
+
+@pytest.mark.parametrize("payload", PAYLOADS)
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+def test_random_chunk_splits_reproduce_the_object(payload, ensure_ascii):
+    text = "```json\n" + json.dumps(payload, ensure_ascii=ensure_ascii) + "\n```"
+    rng = random.Random(f"{sorted(payload)}-{ensure_ascii}")
+    stream_fields = [key for key in ("response_text", "feedback") if key in payload]
+
+    for _ in range(50):
+        parser = IncrementalJsonParser(stream_fields=stream_fields)
+        events = _feed_all(parser, _random_chunks(text, rng))
+
+        assert parser.done
+        assert parser.values == payload
+        for field in stream_fields:
+            deltas = [value for kind, key, value in events if kind == "delta" and key == field]
+            assert "".join(deltas) == payload[field]
+        assert {key for kind, key, _ in events if kind == "value"} == set(payload)
+
+
+def test_surrogate_pair_split_across_chunks_is_emitted_whole():
+    text = json.dumps({"response_text": "a\U0001F600b"})  # "a😀b"
+    split = text.index("\\ude00") + 3
+    parser = IncrementalJsonParser(stream_fields=["response_text"])
+
+    first = parser.feed(text[:split])
+    assert [value for kind, _, value in first if kind == "delta"] == ["a"]
+
+    rest = parser.feed(text[split:])
+    assert [value for kind, _, value in rest if kind == "delta"] == ["\U0001F600b"]
+    assert parser.values["response_text"] == "a\U0001F600b"
+
+
+def test_delta_is_reported_before_the_completed_value():
+    parser = IncrementalJsonParser(stream_fields=["response_text"])
+    events = parser.feed('{"response_text": "hi", "next_action": "continue_learning"}')
+    assert events == [
+        ("delta", "response_text", "hi"),
+        ("value", "response_text", "hi"),
+        ("value", "next_action", "continue_learning"),
+    ]
+
+
+def test_escaped_keys_and_non_streamed_strings():
+    parser = IncrementalJsonParser(stream_fields=["text"])
+    events = parser.feed('{"we\\"ird": "x\\"}y", "text": "\\u00e9"}')
+    assert parser.values == {'we"ird': 'x"}y', "text": "é"}
+    assert ("delta", "text", "é") in events
+
+
+def test_malformed_value_is_skipped():
+    parser = IncrementalJsonParser()
+    parser.feed('{"a": tru, "b": 1}')
+    assert parser.done
+    assert parser.values == {"b": 1}
+
+
+def test_text_after_the_object_is_ignored():
+    parser = IncrementalJsonParser(stream_fields=["response_text"])
+    events = parser.feed('{"response_text": "done"} {"response_text": "again"}')
+    assert parser.done
+    assert [value for kind, _, value in events if kind == "delta"] == ["done"]
+
+
+def test_chunk_text_handles_string_and_part_lists():
+    class Chunk:
+        def __init__(self, content):
+            self.content = content
+
+    assert chunk_text("raw") == "raw"
+    assert chunk_text(Chunk("plain")) == "plain"
+    assert chunk_text(Chunk(["a", {"type": "text", "text": "b"}, {"type": "image_url", "image_url": "x"}])) == "ab"
+    assert chunk_text(Chunk(None)) == ""
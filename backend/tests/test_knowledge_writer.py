@@ -0,0 +1,169 @@
+# File: tests/test_knowledge_writer.py
+
+import time
+import asyncio
+
+import pytest
+
+pytest.importorskip("chromadb")
+pytest.importorskip("langchain_google_genai")
+
+from app.services import knowledge_writer as knowledge_writer_module
+from app.services.knowledge_writer import KnowledgeWriteQueue
+
+
+class FakeCollection:
+    def __init__(self, fail=False, delay=0.0):
+        self.fail = fail
+        self.delay = delay
+        self.records = {}
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("collection unavailable")
+        for doc_id, document in zip(ids, documents):
+            self.records[doc_id] = document
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+
+class FakeChromaManager:
+    def __init__(self):
+        self.embedding_model = FakeEmbeddings()
+        self.collections = {}
+
+    def get_knowledge_collection(self, user_id):
+        return self.collections.setdefault(user_id, FakeCollection())
+
+
+@pytest.fixture
+def chroma(monkeypatch):
+    manager = FakeChromaManager()
+    monkeypatch.setattr(knowledge_writer_module, "chroma_manager", manager)
+    return manager
+
+
+def _queue(tmp_path, **kwargs):
+    return KnowledgeWriteQueue(db_path=tmp_path / "queue.sqlite", flush_interval=0, **kwargs)
+
+
+def _rows(queue):
+    return queue._conn.execute(
+        "SELECT user_id, doc_id, attempts, claimed_by, claimed_until FROM pending_writes ORDER BY id"
+    ).fetchall()
+
+
+def test_one_users_failure_does_not_block_other_users(tmp_path, chroma):
+    chroma.collections[2] = FakeCollection(fail=True)
+    queue = _queue(tmp_path)
+    queue.enqueue(1, "entropy", "Entropy measures disorder", {"topic": "entropy"})
+    queue.enqueue(2, "enthalpy", "Enthalpy is heat content", {"topic": "enthalpy"})
+    queue.enqueue(1, "gibbs", "Gibbs free energy", {"topic": "gibbs"})
+
+    assert asyncio.run(queue._flush_once()) == 3
+
+    assert chroma.collections[1].records == {"entropy": "Entropy measures disorder", "gibbs": "Gibbs free energy"}
+    [(user_id, doc_id, attempts, claimed_by, retry_at)] = _rows(queue)
+    assert (user_id, doc_id, attempts, claimed_by) == (2, "enthalpy", 1, None)
+    # Released with a backoff, so it isn't retried right away
+    assert retry_at > time.time()
+    assert queue._take_batch() == []
+
+
+def test_newest_write_of_a_document_wins(tmp_path, chroma):
+    queue = _queue(tmp_path)
+    queue.enqueue(1, "entropy", "first draft", {})
+    queue.enqueue(1, "entropy", "second draft", {})
+    assert queue.queue_depth() == 1
+
+    # A newer write arriving while the older one is claimed is queued next to it
+    claimed = queue._take_batch()
+    queue.enqueue(1, "entropy", "third draft", {})
+    assert queue.queue_depth() == 2
+    queue._finish_rows(claimed, failed=True)
+
+    # The failed older write is dropped in favour of the newer one
+    assert queue.queue_depth() == 1
+    queue._conn.execute("UPDATE pending_writes SET claimed_until = NULL")
+    asyncio.run(queue._flush_once())
+    assert chroma.collections[1].records == {"entropy": "third draft"}
+    assert chroma.embedding_model.calls == [["third draft"]]
+
+
+def test_duplicate_rows_in_one_batch_are_committed_once(tmp_path, chroma):
+    queue = _queue(tmp_path)
+    for text in ("v1", "v2"):
+        queue._conn.execute(
+            "INSERT INTO pending_writes (user_id, doc_id, document, metadata, enqueued_at) VALUES (1, 'd', ?, '{}', ?)",
+            (text, time.time()),
+        )
+
+    assert asyncio.run(queue._flush_once()) == 2
+    assert chroma.collections[1].records == {"d": "v2"}
+    assert chroma.embedding_model.calls == [["v2"]]
+    assert queue.queue_depth() == 0
+
+
+def test_writers_sharing_a_file_never_claim_the_same_rows(tmp_path, chroma):
+    first, second = _queue(tmp_path, batch_size=2), _queue(tmp_path, batch_size=2)
+    for n in range(3):
+        first.enqueue(1, f"doc-{n}", f"text {n}", {})
+
+    batch_a, batch_b = first._take_batch(), second._take_batch()
+    assert [row[2] for row in batch_a] == ["doc-0", "doc-1"]
+    assert [row[2] for row in batch_b] == ["doc-2"]
+    assert second._take_batch() == []
+
+    # An expired claim (its writer died) is taken over
+    first._conn.execute("UPDATE pending_writes SET claimed_until = ? WHERE doc_id = 'doc-0'", (time.time() - 1,))
+    assert [row[2] for row in second._take_batch()] == ["doc-0"]
+
+
+def test_enqueue_from_threads_wakes_the_writer_and_stop_waits_for_the_commit(tmp_path, chroma):
+    chroma.collections[1] = FakeCollection(delay=0.3)
+    queue = _queue(tmp_path, poll_interval=60)
+
+    async def run():
+        queue.start()
+        await asyncio.sleep(0.05)  # startup flush finds nothing
+        await asyncio.gather(*(
+            asyncio.to_thread(queue.enqueue, 1, f"doc-{n}", f"text {n}", {}) for n in range(4)
+        ))
+        # The wakeup is delivered on the loop thread; the commit is then under way
+        for _ in range(100):
+            if queue._flushing is not None and queue.stats["in_flight"]:
+                break
+            await asyncio.sleep(0.01)
+        await queue.stop(drain_timeout=5)
+
+    asyncio.run(run())
+    assert queue.queue_depth() == 0
+    assert sorted(chroma.collections[1].records) == [f"doc-{n}" for n in range(4)]
+
+
+def test_given_up_writes_are_retried_after_a_restart(tmp_path, chroma):
+    chroma.collections[1] = FakeCollection(fail=True)
+    queue = _queue(tmp_path, max_attempts=1)
+    queue.enqueue(1, "doc", "text", {})
+    with pytest.raises(RuntimeError):
+        asyncio.run(queue._flush_once())
+    assert queue.stats["given_up"] == 1
+
+    chroma.collections[1].fail = False
+    restarted = _queue(tmp_path, max_attempts=1)
+    restarted._conn.execute("UPDATE pending_writes SET claimed_until = NULL")
+
+    async def run():
+        restarted.start()
+        await restarted.stop()
+
+    asyncio.run(run())
+    assert chroma.collections[1].records == {"doc": "text"}
@@ -0,0 +1,51 @@
+# File: tests/test_retrieval.py
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("chromadb")
+pytest.importorskip("langchain_google_genai")
+
+from app.graph import retrieval
+from app.graph.retrieval import cap_context, multi_query_retrieve, reciprocal_rank_fusion
+
+
+def _ranked(*ids):
+    return list(ids), [f"doc {doc_id}" for doc_id in ids]
+
+
+def test_rrf_ranks_overlapping_lists_by_summed_reciprocal_rank():
+    fused = reciprocal_rank_fusion([_ranked("a", "b", "c"), _ranked("b", "c", "d"), _ranked("d", "b")])
+    # b: 1/62 + 1/61 + 1/62, d: 1/63 + 1/61, c: 1/63 + 1/62, a: 1/61
+    assert fused == ["doc b", "doc d", "doc c", "doc a"]
+
+
+def test_rrf_keeps_first_seen_order_on_ties_and_dedupes():
+    assert reciprocal_rank_fusion([_ranked("x"), _ranked("y")]) == ["doc x", "doc y"]
+    assert reciprocal_rank_fusion([_ranked("x", "y"), _ranked("x", "y")]) == ["doc x", "doc y"]
+    assert reciprocal_rank_fusion([]) == []
+
+
+def test_cap_context_respects_document_and_character_budgets():
+    documents = ["a" * 40, "", "b" * 40, "c" * 40, "d" * 10]
+    assert cap_context(documents, max_documents=10, max_chars=100) == ["a" * 40, "b" * 40]
+    assert cap_context(documents, max_documents=3, max_chars=1000) == ["a" * 40, "b" * 40]
+    # The best document is kept even if it alone exceeds the character budget
+    assert cap_context(["x" * 500, "y"], max_documents=5, max_chars=100) == ["x" * 500]
+
+
+def test_multi_query_retrieve_fuses_concurrent_queries(monkeypatch):
+    hits = {1.0: _ranked("a", "b"), 2.0: _ranked("b", "c")}
+
+    class FakeCollection:
+        def query(self, query_embeddings, n_results):
+            ids, docs = hits[query_embeddings[0][0]]
+            return {"ids": [ids[:n_results]], "documents": [docs[:n_results]]}
+
+    embedding_model = SimpleNamespace(embed_documents=lambda queries: [[float(len(q))] for q in queries])
+    monkeypatch.setattr(retrieval, "chroma_manager", SimpleNamespace(embedding_model=embedding_model))
+
+    context = asyncio.run(multi_query_retrieve(FakeCollection(), ["q", "qq", "  "], max_documents=2))
+    assert context == ["doc b", "doc a"]
@@ -0,0 +1,36 @@
+# File: tests/test_search_cache.py
+
+import time
+
+from app.core.search_cache import SearchSummaryCache
+
+
+def _cache(tmp_path, **kwargs):
+    return SearchSummaryCache(db_path=tmp_path / "search_cache.sqlite", **kwargs)
+
+
+def _keys(cache):
+    return {row[0] for row in cache._conn.execute("SELECT key FROM search_summaries")}
+
+
+def test_purge_expired_deletes_only_old_entries(tmp_path):
+    cache = _cache(tmp_path, ttl_seconds=60)
+    cache._put("fresh", "summary", 1.0)
+    cache._put("old", "summary", 1.0)
+    cache._conn.execute("UPDATE search_summaries SET created_at = ? WHERE key = 'old'", (time.time() - 120,))
+
+    assert cache.purge_expired() == 1
+    assert _keys(cache) == {"fresh"}
+
+
+def test_writes_purge_expired_entries_periodically(tmp_path):
+    cache = _cache(tmp_path, ttl_seconds=60, purge_interval=3600)
+    cache._put("old", "summary", 1.0)
+    cache._conn.execute("UPDATE search_summaries SET created_at = ? WHERE key = 'old'", (time.time() - 120,))
+
+    cache._put("new", "summary", 1.0)
+    assert _keys(cache) == {"old", "new"}
+
+    cache._last_purge -= 3601
+    cache._put("newer", "summary", 1.0)
+    assert _keys(cache) == {"new", "newer"}
@@ -0,0 +1,224 @@
+# File: tests/test_streaming.py
+
+import json
+import time
+import asyncio
+import itertools
+
+import pytest
+
+pytest.importorskip("langgraph")
+pytest.importorskip("fastapi")
+pytest.importorskip("chromadb")
+pytest.importorskip("langchain_google_genai")
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableLambda
+from langgraph.graph import StateGraph, END
+
+from app.graph import graph as learning_graph
+from app.graph.feynman_graph import stream_evaluation
+from app.graph.state import AgentState
+from app.routers.simpleChat_router import chat_with_agent
+from app.routers.sse import DELTA_PREFIX
+
+REPLY = 'Newton\'s second law:\n"F = ma" \U0001F680'
+
+
+def _fake_model(payload: dict) -> GenericFakeChatModel:
+    # GenericFakeChatModel streams its message split on whitespace, so the JSON
+    # arrives in many small chunks like real model tokens. Every call gets the same reply.
+    return GenericFakeChatModel(messages=itertools.repeat(AIMessage(content=json.dumps(payload))))
+
+
+def _central_graph():
+    builder = StateGraph(AgentState)
+    builder.add_node("central_response_node", learning_graph.central_response_node)
+    builder.set_entry_point("central_response_node")
+    builder.add_edge("central_response_node", END)
+    return builder.compile()
+
+
+def _decode_sse(lines):
+    deltas, plain = [], []
+    for line in lines:
+        if line.startswith(f"data: {DELTA_PREFIX}"):
+            deltas.append(json.loads(line[len(f"data: {DELTA_PREFIX}"):])["text"])
+        elif line.startswith("data: "):
+            plain.append(line[len("data: "):].rstrip("\n"))
+    return deltas, plain
+
+
+@pytest.fixture
+def fake_learning_model(monkeypatch):
+    model = _fake_model({"response_text": REPLY, "next_action": "continue_learning"})
+    monkeypatch.setattr(learning_graph.llm_registry, "get", lambda *args, **kwargs: model)
+    return model
+
+
+def test_central_response_node_streams_response_text_deltas(fake_learning_model):
+    async def run():
+        deltas, final = [], None
+        async for event in _central_graph().astream_events(
+            {"history_messages": [HumanMessage(content="Explain F = ma")]},
+            {"configurable": {"thread_id": "t", "user_id": 1, "stream_response": True}},
+            version="v2",
+        ):
+            if event["event"] == "on_custom_event" and event["name"] == "response_text_delta":
+                deltas.append(event["data"]["text"])
+            elif event["event"] == "on_chain_end" and event["name"] == "central_response_node":
+                final = event["data"]["output"]
+        return deltas, final
+
+    deltas, final = asyncio.run(run())
+
+    assert len(deltas) > 1
+    assert "".join(deltas) == REPLY
+    assert final["history_messages"][-1].content == REPLY
+
+
+@pytest.mark.parametrize("content", [
+    "Newton's second law says F = ma.",  # not JSON at all
+    json.dumps({"response_text": REPLY, "next_action": "continue_learning"})[:-25],  # cut off
+])
+def test_central_response_node_reports_an_incomplete_reply(monkeypatch, content):
+    model = GenericFakeChatModel(messages=iter([AIMessage(content=content)]))
+    monkeypatch.setattr(learning_graph.llm_registry, "get", lambda *args, **kwargs: model)
+
+    final = asyncio.run(_central_graph().ainvoke(
+        {"history_messages": [HumanMessage(content="Explain F = ma")]},
+        {"configurable": {"thread_id": "t", "user_id": 1, "stream_response": True}},
+    ))
+
+    assert "complete LearningResponse" in final["error"]
+    reply = final["history_messages"][-1].content
+    assert reply and reply != REPLY
+
+
+def test_simplechat_router_does_not_send_the_reply_twice(fake_learning_model):
+    async def run():
+        response = await chat_with_agent(
+            message="Explain F = ma",
+            thread_id="t",
+            current_user={"id": 1, "is_active": True},
+            graph=_central_graph(),
+        )
+        return [line async for line in response.body_iterator]
+
+    deltas, plain = _decode_sse(asyncio.run(run()))
+
+    assert "".join(deltas) == REPLY + "\n"
+    # Nothing of the reply is repeated as a regular message once it was streamed
+    assert not any(part in REPLY for part in plain if part)
+
+
+def test_stream_evaluation_dispatches_feedback_deltas():
+    feedback = "Good, but say what \"m\" stands for."
+    model = _fake_model({"is_mastered": True, "feedback": feedback})
+
+    async def evaluate(_, config):
+        return await stream_evaluation(model, [HumanMessage(content="F is mass times acceleration")], config)
+
+    async def run():
+        deltas, result = [], None
+        async for event in RunnableLambda(evaluate).astream_events({}, version="v2"):
+            if event["event"] == "on_custom_event" and event["name"] == "feedback_delta":
+                deltas.append(event["data"]["text"])
+            elif event["event"] == "on_chain_end" and event["name"] == "evaluate":
+                result = event["data"]["output"]
+        return deltas, result
+
+    deltas, result = asyncio.run(run())
+
+    assert "".join(deltas) == feedback
+    assert result == (True, feedback)
+
+
+SCRAPE_SECONDS = 0.5
+
+
+class _SlowLecturePage:
+    """Playwright page stand-in for a slow lecture site with a captions track."""
+
+    class _Locator:
+        def __init__(self, selector):
+            self._selector = selector
+            self.first = self
+
+        async def count(self):
+            return 1 if self._selector.startswith("track") else 0
+
+        async def get_attribute(self, name):
+            return "/captions/lecture.vtt"
+
+    async def goto(self, url, wait_until=None):
+        await asyncio.sleep(SCRAPE_SECONDS)
+
+    def locator(self, selector):
+        return self._Locator(selector)
+
+    async def close(self):
+        pass
+
+
+class _SlowLectureContext:
+    async def new_page(self):
+        return _SlowLecturePage()
+
+    async def cookies(self, url):
+        return []
+
+
+async def _timed_chat() -> float:
+    started = time.perf_counter()
+    response = await chat_with_agent(
+        message="Explain F = ma",
+        thread_id="t",
+        current_user={"id": 1, "is_active": True},
+        graph=_central_graph(),
+    )
+    deltas, _ = _decode_sse([line async for line in response.body_iterator])
+    assert "".join(deltas) == REPLY + "\n"
+    return time.perf_counter() - started
+
+
+def test_chat_latency_stays_flat_while_transcripts_are_scraped(fake_learning_model, monkeypatch):
+    pytest.importorskip("playwright")
+    from app.routers import lecture_transcript_router
+    from app.services.browser_pool import browser_pool
+    from app.services.caption_fetcher import caption_fetcher
+    from app.services.transcript_jobs import TranscriptJobQueue
+
+    async def fetch_text(url, cookies=None):
+        return "Newton's second law relates force, mass and acceleration."
+
+    monkeypatch.setattr(browser_pool, "_context", _SlowLectureContext())
+    monkeypatch.setattr(caption_fetcher, "fetch_text", fetch_text)
+    queue = TranscriptJobQueue(workers=3)
+    monkeypatch.setattr(lecture_transcript_router, "transcript_jobs", queue)
+
+    async def scrape(number):
+        request = lecture_transcript_router.LectureRequest(
+            lecture_url=f"https://leccap.example.edu/player/latency-test-{number}", ingest=False,
+        )
+        return await lecture_transcript_router.get_transcript_from_url(request, current_user={"id": 1})
+
+    async def run():
+        try:
+            baseline = [await _timed_chat() for _ in range(5)]
+            scrapes = asyncio.gather(*(scrape(number) for number in range(3)))
+            await asyncio.sleep(0.05)
+            during = [await _timed_chat() for _ in range(5)]
+            still_scraping = not scrapes.done()
+            return baseline, during, still_scraping, await scrapes
+        finally:
+            await queue.stop()
+
+    baseline, during, still_scraping, results = asyncio.run(run())
+
+    assert still_scraping
+    assert all(result["success"] and result["status"] == "done" for result in results)
+    # A scrape that blocked the event loop would hold every chat for SCRAPE_SECONDS
+    assert max(during) < max(baseline) + 0.1
+    assert max(during) < SCRAPE_SECONDS / 2
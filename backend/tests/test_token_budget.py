@@ -0,0 +1,46 @@
+# File: tests/test_token_budget.py
+
+from app.graph.token_budget import estimate_tokens, fit_to_budget, truncate_to_tokens
+
+REFERENCE = "entropy and the second law of thermodynamics"
+RELEVANT = "Entropy never decreases in an isolated system, by the second law of thermodynamics."
+RELATED = "Thermodynamics studies heat and work."
+UNRELATED = "Photosynthesis turns light into chemical energy."
+
+
+def test_chunks_are_kept_most_relevant_first():
+    kept = fit_to_budget([UNRELATED, RELATED, RELEVANT], budget=1000, reference=REFERENCE)
+    assert kept == [RELEVANT, RELATED, UNRELATED]
+
+
+def test_without_reference_retrieval_order_is_kept_and_duplicates_dropped():
+    kept = fit_to_budget([UNRELATED, " " + RELATED, "", RELATED, None], budget=1000)
+    assert kept == [UNRELATED, RELATED]
+
+
+def test_budget_boundary():
+    exact = estimate_tokens(RELEVANT) + estimate_tokens(RELATED)
+    assert fit_to_budget([RELEVANT, RELATED], budget=exact, reference=REFERENCE) == [RELEVANT, RELATED]
+    # One token short: the less relevant chunk is skipped (too little left to truncate it)
+    assert fit_to_budget([RELEVANT, RELATED], budget=exact - 1, reference=REFERENCE) == [RELEVANT]
+
+
+def test_oversized_chunk_is_truncated_into_the_budget():
+    long_chunk = " ".join(["entropy grows"] * 200)
+    kept = fit_to_budget([long_chunk], budget=60, reference=REFERENCE, min_partial_tokens=50)
+
+    assert len(kept) == 1
+    assert kept[0].endswith(" …") and long_chunk.startswith(kept[0][:-2])
+    assert estimate_tokens(kept[0]) <= 61  # the ellipsis is one more token
+    # Too little budget left for a useful part: nothing is added
+    assert fit_to_budget([long_chunk], budget=40, reference=REFERENCE, min_partial_tokens=50) == []
+
+
+def test_truncate_leaves_short_text_alone():
+    assert truncate_to_tokens(RELATED, max_tokens=100) == RELATED
+
+
+def test_empty_input():
+    assert fit_to_budget([], budget=100) == []
+    assert fit_to_budget(["", "  "], budget=100, reference=REFERENCE) == []
+    assert estimate_tokens("") == 0
@@ -0,0 +1,60 @@
+# File: tests/test_transcript_jobs.py
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("playwright")
+pytest.importorskip("dotenv")
+
+from app.services import transcript_jobs as transcript_jobs_module
+from app.services.transcript_jobs import TranscriptJobQueue
+
+
+def test_job_status_is_only_visible_to_its_requesters(monkeypatch):
+    release = asyncio.Event()
+
+    async def fake_scrape(lecture_url):
+        await release.wait()
+        return "WEBVTT transcript text"
+
+    monkeypatch.setattr(transcript_jobs_module, "handle_transcript_request", fake_scrape)
+
+    async def run():
+        queue = TranscriptJobQueue(workers=1)
+        try:
+            url = "https://canvas.example.edu/courses/1/pages/ownership-test-lecture"
+            job = await queue.submit(url, user_id=1)
+            joined = await queue.submit(url, user_id=2)
+            assert joined is job
+
+            assert queue.get_job(job.job_id, 1) is job
+            assert queue.get_job(job.job_id, 2) is job
+            assert queue.get_job(job.job_id, 3) is None
+
+            release.set()
+            assert (await queue.wait(job)).status == "done"
+            # Later requests are answered from the store with a job of their own
+            cached = await queue.submit(url, user_id=3)
+            assert cached.from_cache and queue.get_job(cached.job_id, 3) is cached
+            assert queue.get_job(cached.job_id, 1) is None
+
+            assert queue.stats == {
+                "submitted": 3, "store_hits": 1, "deduplicated": 1, "scrapes": 1, "failed": 0,
+                "queued": 0, "in_flight": 0,
+            }
+        finally:
+            await queue.stop()
+
+    asyncio.run(run())
+
+
+def test_stats_endpoint_reports_the_queue(monkeypatch):
+    pytest.importorskip("fastapi")
+    from app.routers import lecture_transcript_router
+
+    queue = TranscriptJobQueue(workers=1)
+    monkeypatch.setattr(lecture_transcript_router, "transcript_jobs", queue)
+
+    stats = asyncio.run(lecture_transcript_router.get_transcript_stats(current_user={"id": 1}))
+    assert stats == queue.stats and stats["submitted"] == 0
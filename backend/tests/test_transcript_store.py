@@ -0,0 +1,22 @@
+# File: tests/test_transcript_store.py
+
+import time
+
+from app.services.transcript_store import TranscriptStore, canonical_lecture_url, transcript_id_for
+
+
+def test_equivalent_lecture_urls_share_a_transcript_id():
+    url = "https://Canvas.example.edu/courses/1/pages/lecture-3/?utm_source=mail&b=2&a=1#top"
+    assert canonical_lecture_url(url) == "https://canvas.example.edu/courses/1/pages/lecture-3?a=1&b=2"
+    assert transcript_id_for(url) == transcript_id_for("https://canvas.example.edu/courses/1/pages/lecture-3?a=1&b=2")
+
+
+def test_expired_transcripts_are_rescraped_but_still_readable(tmp_path):
+    store = TranscriptStore(db_path=tmp_path / "transcripts.sqlite", max_age_seconds=60)
+    record = store.put("https://canvas.example.edu/lecture-3", "lecture-3.txt", "Hello class")
+    store._conn.execute("UPDATE transcripts SET fetched_at = ?", (time.time() - 120,))
+
+    assert store.get("https://canvas.example.edu/lecture-3") is None
+    assert store.get_by_id(record["transcript_id"]) is None
+    assert store.get_by_id(record["transcript_id"], include_expired=True)["content"] == "Hello class"
+    assert store.get_by_id("missing", include_expired=True) is None
@@ -0,0 +1,95 @@
+# File: tests/test_webvtt.py
+
+from app.services.webvtt import WebVTTParser, clean_cue_line, parse_webvtt
+
+
+def _parse(text: str) -> str:
+    return parse_webvtt(text.split("\n"))
+
+
+def test_headers_metadata_blocks_and_timings_are_dropped():
+    vtt = """﻿WEBVTT - Lecture 3
+Kind: captions
+
+NOTE written by hand
+spanning two lines
+
+STYLE
+::cue { color: yellow }
+
+REGION
+id:left
+
+intro
+00:00:01.000 --> 00:00:04.000 align:start position:0%
+Welcome back.
+
+00:00:04.000 --> 00:00:06.000
+Today: entropy.
+"""
+    assert _parse(vtt) == "Welcome back.\nToday: entropy."
+
+
+def test_inline_tags_and_entities_are_removed():
+    assert clean_cue_line("<v Prof. Lee><i>Hello</i> &amp; <c.yellow>welcome</c></v>") == "Hello & welcome"
+    assert clean_cue_line("word<00:00:01.500><c> next</c>   word") == "word next word"
+    assert clean_cue_line("a &lt; b &gt; c &nbsp;") == "a < b > c"
+
+
+def test_rolling_cues_are_merged_without_repeats():
+    # Auto-generated captions repeat the previous line at the top of each cue
+    vtt = """WEBVTT
+
+00:00:00.000 --> 00:00:02.000
+the first law
+
+00:00:02.000 --> 00:00:04.000
+the first law
+says energy is
+
+00:00:04.000 --> 00:00:06.000
+says energy is
+conserved
+"""
+    assert _parse(vtt) == "the first law\nsays energy is\nconserved"
+
+
+def test_overlapping_cues_keep_file_order():
+    vtt = """WEBVTT
+
+1
+00:00:00.000 --> 00:00:05.000
+Speaker one talks
+
+2
+00:00:02.000 --> 00:00:04.000
+<v Two>Speaker two interrupts
+
+3
+00:00:03.000 --> 00:00:06.000
+Speaker one talks
+"""
+    # Only consecutive repeats are dropped; the same line later on is kept
+    assert _parse(vtt) == "Speaker one talks\nSpeaker two interrupts\nSpeaker one talks"
+
+
+def test_incremental_feeding_matches_whole_file_parsing():
+    vtt = "WEBVTT\r\n\r\n00:00:00.000 --> 00:00:01.000\r\nline <b>one</b>\r\nline two\r\n\r\n00:00:01.000 --> 00:00:02.000\r\nline three"
+    parser = WebVTTParser()
+    lines = []
+    for line in vtt.split("\n"):
+        lines.extend(parser.feed_line(line))
+    assert lines == ["line one", "line two"]
+    assert parser.close() == ["line three"]
+    assert _parse(vtt) == "line one\nline two\nline three"
+
+
+def test_srt_and_plain_text_pass_through():
+    srt = "1\n00:00:01,000 --> 00:00:02,000\nHello\n\n2\n00:00:02,000 --> 00:00:03,000\nWorld\n"
+    assert _parse(srt) == "Hello\nWorld"
+    assert _parse("Just a transcript.\nSecond line.") == "Just a transcript.\nSecond line."
+
+
+def test_empty_input():
+    assert _parse("") == ""
+    assert _parse("WEBVTT\n\n") == ""
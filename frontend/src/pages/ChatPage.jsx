@@ -258,17 +258,38 @@ const ChatPage = () => {
       const decoder = new TextDecoder();
       let accumulatedContent = '';
       let currentActiveChat = chatWithInitialBotMessage;
+      // Holds a trailing partial line until the rest of it arrives in the next read
+      let pendingLine = '';
   
       while (true) {
         const { done, value } = await reader.read();
         if (done) break;
   
-        const chunk = decoder.decode(value);
+        const chunk = pendingLine + decoder.decode(value, { stream: true });
         const lines = chunk.split('\n');
+        pendingLine = lines.pop();
   
         for (const line of lines) {
           if (line.startsWith('data: ')) {
             const data = line.slice(6);
+
+            // Token-level piece of the tutor reply, appended without an extra line break
+            if (data.startsWith('__DELTA__')) {
+              try {
+                accumulatedContent += JSON.parse(data.substring(9)).text;
+              } catch (error) {
+                console.error('Error parsing streamed delta:', error);
+                continue;
+              }
+              const updatedMessages = currentActiveChat.messages.map(msg =>
+                msg.id === botMessageId
+                  ? { ...msg, content: accumulatedContent }
+                  : msg
+              );
+              currentActiveChat = { ...currentActiveChat, messages: updatedMessages };
+              setActiveChat(currentActiveChat);
+              continue;
+            }
   
             // Check for the special thread update message
             if (data.startsWith('__THREAD_UPDATE__')) {